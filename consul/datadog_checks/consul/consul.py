@@ -45,6 +45,10 @@ class ConsulCheckInstanceState(object):
         self.local_config = None
         self.last_config_fetch_time = None
         self.last_known_leader = None
+        # X-Consul-Index of the catalog services the cached nodes of the services are valid for
+        self.catalog_services_index = None
+        # {service: [(node_id, service_id)]}
+        self.service_nodes = {}
 
 
 class ConsulCheck(AgentCheck):
@@ -75,6 +79,8 @@ class ConsulCheck(AgentCheck):
         super(ConsulCheck, self).__init__(name, init_config, instances)
 
         self._instance_states = defaultdict(lambda: ConsulCheckInstanceState())
+        # {url: X-Consul-Index of its last response}
+        self._consul_indexes = {}
 
         self.HTTP_CONFIG_REMAPPER = {
             'client_cert_file': {
@@ -119,6 +125,9 @@ class ConsulCheck(AgentCheck):
         else:
             self.service_check(self.CONSUL_CAN_CONNECT, self.OK, tags=service_check_tags)
 
+        # The index changes whenever the data of the endpoint does
+        self._consul_indexes[url] = resp.headers.get('X-Consul-Index')
+
         return resp.json()
 
     # Consul Config Accessors
@@ -242,6 +251,33 @@ class ConsulCheck(AgentCheck):
 
         return self.consul_request(instance, consul_request_url)
 
+    def _get_nodes_with_service(self, instance, instance_state, service, health_checks):
+        """
+        Same as `get_nodes_with_service`, except that when the health checks of the cluster are given,
+        keyed by node and service ID, the nodes the service was found on by a previous run are reused
+        along with these checks instead of requesting them again.
+        """
+        if health_checks is None:
+            return self.get_nodes_with_service(instance, service)
+
+        service_nodes = instance_state.service_nodes.get(service)
+        if service_nodes is None:
+            nodes_with_service = self.get_nodes_with_service(instance, service)
+            instance_state.service_nodes[service] = [
+                (node.get('Node', {}).get('Node'), node.get('Service', {}).get('ID')) for node in nodes_with_service
+            ]
+            return nodes_with_service
+
+        # The checks of a service instance are the checks of its node followed by its own ones
+        return [
+            {
+                'Node': {'Node': node_id},
+                'Service': {'ID': service_id},
+                'Checks': health_checks[node_id, ''] + health_checks[node_id, service_id],
+            }
+            for node_id, service_id in service_nodes
+        ]
+
     def _cull_services_list(self, services, service_whitelist, max_services=MAX_SERVICES):
 
         if service_whitelist:
@@ -307,6 +343,7 @@ class ConsulCheck(AgentCheck):
             instance.get('network_latency_checks', self.init_config.get('network_latency_checks'))
         )
 
+        health_state = None
         try:
             # Make service checks from health checks for all services in catalog
             health_state = self.consul_request(instance, '/v1/health/state/any')
@@ -343,6 +380,7 @@ class ConsulCheck(AgentCheck):
             # Collect node by service, and service by node counts for a whitelist of services
 
             services = self.get_services_in_cluster(instance)
+            services_index = self._consul_indexes.get(urljoin(instance.get('url'), '/v1/catalog/services'))
             service_whitelist = instance.get('service_whitelist', self.init_config.get('service_whitelist', []))
             max_services = instance.get('max_services', self.init_config.get('max_services', self.MAX_SERVICES))
 
@@ -350,6 +388,19 @@ class ConsulCheck(AgentCheck):
 
             services = self._cull_services_list(services, service_whitelist, max_services)
 
+            # The nodes of the services are cached until the catalog changes, their
+            # statuses being taken from the health checks of the whole cluster
+            health_checks = None
+            catalog_cache = is_affirmative(instance.get('catalog_cache', self.init_config.get('catalog_cache', False)))
+            if catalog_cache and health_state is not None:
+                if services_index is None or services_index != instance_state.catalog_services_index:
+                    instance_state.service_nodes = {}
+                instance_state.catalog_services_index = services_index
+
+                health_checks = defaultdict(list)
+                for check in health_state:
+                    health_checks[check['Node'], check.get('ServiceID', '')].append(check)
+
             # {node_id: {"up: 0, "passing": 0, "warning": 0, "critical": 0}
             nodes_to_service_status = defaultdict(lambda: defaultdict(int))
 
@@ -363,7 +414,7 @@ class ConsulCheck(AgentCheck):
 
                 service_tags = self._get_service_tags(service, services[service])
 
-                nodes_with_service = self.get_nodes_with_service(instance, service)
+                nodes_with_service = self._get_nodes_with_service(instance, instance_state, service, health_checks)
 
                 # {'up': 0, 'passing': 0, 'warning': 0, 'critical': 0}
                 node_status = defaultdict(int)
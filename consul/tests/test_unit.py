@@ -322,3 +322,56 @@ def test_network_latency_checks(aggregator):
     node = [m for m in latency if '.node.latency.' in m[0]]
     assert 16 == len(node)
     assert 0.26577747932995816 == node[0][2]
+
+
+def test_catalog_cache(aggregator):
+    consul_check = ConsulCheck(common.CHECK_NAME, {}, [{}])
+    my_mocks = consul_mocks._get_consul_mocks()
+    my_mocks['get_nodes_with_service'] = mock.MagicMock(side_effect=consul_mocks.mock_get_nodes_with_service)
+    consul_mocks.mock_check(consul_check, my_mocks)
+
+    health_state = [
+        {'Node': 'node-1', 'CheckID': 'serfHealth', 'Status': 'passing', 'ServiceID': '', 'ServiceName': ''}
+    ]
+    for service in consul_mocks.mock_get_services_in_cluster(None):
+        health_state.append(
+            {
+                'Node': 'node-1',
+                'CheckID': 'service:{}'.format(service),
+                'Status': 'critical' if service == 'service-1' else 'passing',
+                'ServiceID': service,
+                'ServiceName': service,
+            }
+        )
+    consul_check.consul_request = mock.MagicMock(return_value=health_state)
+
+    services_url = 'http://localhost:8500/v1/catalog/services'
+    consul_check._consul_indexes[services_url] = '42'
+    config = dict(consul_mocks.MOCK_CONFIG, catalog_cache=True)
+
+    # The nodes of the services are requested by the first run only
+    consul_check.check(config)
+    assert consul_check.get_nodes_with_service.call_count == 6
+    aggregator.reset()
+    consul_check.check(config)
+    assert consul_check.get_nodes_with_service.call_count == 6
+
+    # Their statuses come from the health checks of the cluster
+    expected_tags = [
+        'consul_datacenter:dc1',
+        'consul_service_id:service-1',
+        'consul_service-1_service_tag:az-us-east-1a',
+    ]
+    aggregator.assert_metric('consul.catalog.nodes_up', value=1, tags=expected_tags)
+    aggregator.assert_metric('consul.catalog.nodes_passing', value=0, tags=expected_tags)
+    aggregator.assert_metric('consul.catalog.nodes_critical', value=1, tags=expected_tags)
+
+    expected_tags = ['consul_datacenter:dc1', 'consul_node_id:node-1']
+    aggregator.assert_metric('consul.catalog.services_up', value=6, tags=expected_tags)
+    aggregator.assert_metric('consul.catalog.services_passing', value=5, tags=expected_tags)
+    aggregator.assert_metric('consul.catalog.services_critical', value=1, tags=expected_tags)
+
+    # They are requested again once the catalog changes
+    consul_check._consul_indexes[services_url] = '43'
+    consul_check.check(config)
+    assert consul_check.get_nodes_with_service.call_count == 12
@@ -1,8 +1,22 @@
 # (C) Datadog, Inc. 2018
 # All rights reserved
 # Licensed under a 3-clause BSD style license (see LICENSE)
+import threading
+import time
+import traceback
+
+from six.moves import queue, range
+
+from ..config import is_affirmative
 from . import AgentCheck
 
+# Number of threads running the probes of the instances of a network check, when they run concurrently
+DEFAULT_PROBE_THREADS = 16
+
+# Number of seconds after which a probe still running is reported as down. Probes can't be interrupted,
+# one that hangs holds its thread until it completes: they must rely on the timeouts of the checks.
+DEFAULT_PROBE_TIMEOUT = 60
+
 
 class Status:
     DOWN = "DOWN"
@@ -25,21 +39,92 @@ class NetworkCheck(AgentCheck):
         Status.DOWN: AgentCheck.CRITICAL,
     }
 
+    # Name of the service check telling whether the target is up, passed to `report_as_service_check`
+    SC_STATUS = None
+
+    # {check class: ProbeExecutor}
+    _probe_executors = {}
+    _probe_executors_lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        super(NetworkCheck, self).__init__(*args, **kwargs)
+
+        # {instance name: Probe} of the probes run concurrently
+        self._probes = {}
+        # Probes share the state of the check, e.g. its HTTP session, so they don't overlap
+        self._probe_lock = threading.Lock()
+
     def check(self, instance):
+        if is_affirmative(instance.get('concurrent_probes', self.init_config.get('concurrent_probes', False))):
+            self._check_concurrently(instance)
+            return
+
         try:
             statuses = self._check(instance)
         except Exception:
             self.log.exception(u"Failed to run instance '%s'.", instance.get('name', u""))
         else:
-            if isinstance(statuses, tuple):
-                # Assume the check only returns one service check
-                status, msg = statuses
-                self.report_as_service_check(None, status, instance, msg)
+            self._report_statuses(instance, statuses)
+
+    def _check_concurrently(self, instance):
+        """
+        Runs the probe of the instance in the threads shared by the instances of the check, so that probes waiting
+        for their timeouts don't hold check runs. Each run reports the statuses of the last probe that completed,
+        if any, and submits a new one unless the previous one is still running.
+        """
+        name = instance.get('name', u"")
+        probe = self._probes.get(name)
+        if probe is not None:
+            if probe.start is None:
+                # All the threads are busy, the time spent waiting for one doesn't count
+                self.log.debug(u"The probe of instance '%s' is waiting for a thread.", name)
+                return
+
+            if not probe.done.is_set():
+                probe_timeout = float(
+                    instance.get('probe_timeout', self.init_config.get('probe_timeout', DEFAULT_PROBE_TIMEOUT))
+                )
+                elapsed = time.time() - probe.start
+                if elapsed > probe_timeout:
+                    self.report_as_service_check(
+                        self.SC_STATUS,
+                        Status.DOWN,
+                        instance,
+                        "Probe still running after {} seconds".format(int(elapsed)),
+                    )
+                return
+
+            del self._probes[name]
+            if probe.error is not None:
+                self.log.error(u"Failed to run instance '%s'.\n%s", name, probe.error)
+            else:
+                self._report_statuses(instance, probe.statuses)
+
+        self._probes[name] = self._get_probe_executor().submit(self._run_probe, instance)
+
+    def _run_probe(self, instance):
+        with self._probe_lock:
+            return self._check(instance)
+
+    def _get_probe_executor(self):
+        with self._probe_executors_lock:
+            executor = self._probe_executors.get(type(self))
+            if executor is None:
+                threads = int(self.init_config.get('probe_threads', DEFAULT_PROBE_THREADS))
+                executor = self._probe_executors[type(self)] = ProbeExecutor(threads, type(self).__name__)
+
+        return executor
 
-            elif isinstance(statuses, list):
-                for status in statuses:
-                    sc_name, status, msg = status
-                    self.report_as_service_check(sc_name, status, instance, msg)
+    def _report_statuses(self, instance, statuses):
+        if isinstance(statuses, tuple):
+            # Assume the check only returns one service check
+            status, msg = statuses
+            self.report_as_service_check(None, status, instance, msg)
+
+        elif isinstance(statuses, list):
+            for status in statuses:
+                sc_name, status, msg = status
+                self.report_as_service_check(sc_name, status, instance, msg)
 
     def _check(self, instance):
         """This function should be implemented by inherited classes"""
@@ -50,6 +135,54 @@ class NetworkCheck(AgentCheck):
         raise NotImplementedError
 
 
+class Probe(object):
+    """
+    Probe of an instance submitted to a `ProbeExecutor`
+    """
+
+    def __init__(self, func, args):
+        self.func = func
+        self.args = args
+        # Time at which the probe started running, None while it's queued
+        self.start = None
+        self.done = threading.Event()
+        self.statuses = None
+        # Formatted traceback of the exception raised by the probe, if any
+        self.error = None
+
+    def run(self):
+        self.start = time.time()
+        try:
+            self.statuses = self.func(*self.args)
+        except Exception:
+            self.error = traceback.format_exc()
+        finally:
+            self.done.set()
+
+
+class ProbeExecutor(object):
+    """
+    Runs probes in a fixed number of daemon threads, which live as long as the process.
+    A probe keeps its thread until it completes, the probes submitted meanwhile wait for a free one.
+    """
+
+    def __init__(self, threads, name):
+        self._queue = queue.Queue()
+        for idx in range(threads):
+            thread = threading.Thread(target=self._work, name='ProbeExecutor-{}-{}'.format(name, idx))
+            thread.daemon = True
+            thread.start()
+
+    def submit(self, func, *args):
+        probe = Probe(func, args)
+        self._queue.put(probe)
+        return probe
+
+    def _work(self):
+        while True:
+            self._queue.get().run()
+
+
 # Deprecated since we aren't reporting statuses as events anymore
 # Keep the class here so that imports don't fail
 class EventType:
@@ -2,12 +2,15 @@
 # All rights reserved
 # Licensed under a 3-clause BSD style license (see LICENSE)
 
+from datetime import timedelta
 from fnmatch import fnmatchcase
+from functools import partial
 from math import isinf, isnan
 from os.path import isfile
+from time import time
 
 import requests
-from prometheus_client.parser import text_fd_to_metric_families
+from requests.adapters import HTTPAdapter
 from six import PY3, iteritems, itervalues, string_types
 from urllib3 import disable_warnings
 from urllib3.exceptions import InsecureRequestWarning
@@ -15,7 +18,11 @@ from urllib3.exceptions import InsecureRequestWarning
 from ...config import is_affirmative
 from ...errors import CheckException
 from ...utils.common import to_string
+from ...utils.lru import LRUCache
+from ...utils.replay import PayloadReplayCache
 from .. import AgentCheck
+from ..libs.thread_pool import Pool
+from .parser import protobuf_to_metric_families, text_fd_to_metric_families
 
 if PY3:
     long = int
@@ -27,6 +34,11 @@ class OpenMetricsScraperMixin(object):
     # need to be within a check in the end
 
     REQUESTS_CHUNK_SIZE = 1024 * 10  # use 10kb as chunk size when using the Stream feature in requests.get
+    # Accept header negotiating the delimited protobuf format, falling back to the text format
+    PROTOBUF_ACCEPT_HEADER = (
+        'application/vnd.google.protobuf; proto=io.prometheus.client.MetricFamily; encoding=delimited;q=0.7,'
+        'text/plain;version=0.0.4;q=0.3'
+    )
     # indexes in the sample tuple of core.Metric
     SAMPLE_NAME = 0
     SAMPLE_LABELS = 1
@@ -35,6 +47,9 @@ class OpenMetricsScraperMixin(object):
     MINUS_INF = float("-inf")
 
     TELEMETRY_GAUGE_MESSAGE_SIZE = "payload.size"
+    TELEMETRY_GAUGE_REQUEST_LATENCY = "request.latency"
+    TELEMETRY_GAUGE_SCRAPE_DURATION = "scrape.duration"
+    TELEMETRY_COUNTER_CONNECTIONS_OPENED_COUNT = "connections.opened.count"
     TELEMETRY_COUNTER_METRICS_BLACKLIST_COUNT = "metrics.blacklist.count"
     TELEMETRY_COUNTER_METRICS_INPUT_COUNT = "metrics.input.count"
     TELEMETRY_COUNTER_METRICS_IGNORE_COUNT = "metrics.ignored.count"
@@ -44,10 +59,18 @@ class OpenMetricsScraperMixin(object):
 
     KUBERNETES_TOKEN_PATH = '/var/run/secrets/kubernetes.io/serviceaccount/token'
 
+    # Maximum number of formatted `label:value` tag strings kept per scraper
+    LABEL_TAG_CACHE_SIZE = 50000
+
     def __init__(self, *args, **kwargs):
         # Initialize AgentCheck's base class
         super(OpenMetricsScraperMixin, self).__init__(*args, **kwargs)
 
+        # `_prefetch_pool` holds the worker threads sending the requests of `process_concurrently`,
+        # they are kept across runs
+        self._prefetch_pool = None
+        self._prefetch_pool_size = 0
+
     def create_scraper_configuration(self, instance=None):
 
         # We can choose to create a default mixin configuration for an empty instance
@@ -114,31 +137,38 @@ class OpenMetricsScraperMixin(object):
         #         'labels_to_get': ['node', 'host_ip']
         #     }
         # }
+        # `label_to_match` can also be a list of labels to join on all of them at once, e.g. ['namespace', 'pod']
         config['label_joins'] = default_instance.get('label_joins', {})
         config['label_joins'].update(instance.get('label_joins', {}))
 
+        # `_label_joins_index` holds the compiled `label_joins`, built on first use, see `_get_label_joins_index`
+        config['_label_joins_index'] = None
+
         # `_label_mapping` holds the additionals label info to add for a specific
         # label value, example:
         # self._label_mapping = {
         #     'pod': {
-        #         'dd-agent-9s1l1': [("node","yolo"),("host_ip","yey")]
+        #         'dd-agent-9s1l1': {"node": "yolo", "host_ip": "yey"}
+        #     },
+        #     ('namespace', 'pod'): {
+        #         ('default', 'dd-agent-9s1l1'): {"node": "yolo"}
         #     }
         # }
         config['_label_mapping'] = {}
 
-        # `_active_label_mapping` holds a dictionary of label values found during the run
-        # to cleanup the label_mapping of unused values, example:
-        # self._active_label_mapping = {
+        # `_label_mapping_generation` holds the last run during which each entry of `_label_mapping`
+        # was stored or joined, entries left untouched during a run are evicted at the end of it, example:
+        # self._label_mapping_generation = {
         #     'pod': {
-        #         'dd-agent-9s1l1': True
+        #         'dd-agent-9s1l1': 42
         #     }
         # }
-        config['_active_label_mapping'] = {}
+        config['_label_mapping_generation'] = {}
+        config['_label_joins_generation'] = 0
 
-        # `_watched_labels` holds the list of label to watch for enrichment
-        config['_watched_labels'] = set()
-
-        config['_dry_run'] = True
+        # `_pending_label_joins` holds the metrics, with their transformers, whose labels to join
+        # were not yet known when they were processed. They are processed again at the end of the run.
+        config['_pending_label_joins'] = []
 
         # Some metrics are ignored because they are duplicates or introduce a
         # very high cardinality. Metrics included in this list will be silently
@@ -242,11 +272,19 @@ class OpenMetricsScraperMixin(object):
         # Additional tags to be sent with each metric
         config['_metric_tags'] = []
 
+        # `_label_tags` holds the compiled label to tag conversion, built on first use
+        # from `labels_mapper` and `exclude_labels`, see `_get_label_tags`
+        config['_label_tags'] = None
+
         # List of strings to filter the input text payload on. If any line contains
         # one of these strings, it will be filtered out before being parsed.
         # INTERNAL FEATURE, might be removed in future versions
         config['_text_filter_blacklist'] = []
 
+        # Whether or not to ask the endpoint for the delimited protobuf format rather than the text one.
+        # Endpoints that don't support it answer with the text format, which is then parsed as usual.
+        config['protobuf'] = is_affirmative(instance.get('protobuf', default_instance.get('protobuf', False)))
+
         # Whether or not to use the service account bearer token for authentication
         # if 'bearer_token_path' is not set, we use /var/run/secrets/kubernetes.io/serviceaccount/token
         # as a default path to get the token.
@@ -262,22 +300,71 @@ class OpenMetricsScraperMixin(object):
         # The service account bearer token to be used for authentication
         config['_bearer_token'] = self._get_bearer_token(config['bearer_token_auth'], config['bearer_token_path'])
 
+        # Service account tokens are rotated, so the token file is read again every
+        # `bearer_token_refresh_interval` seconds. Set to 0 to disable the refresh.
+        config['bearer_token_refresh_interval'] = int(
+            instance.get('bearer_token_refresh_interval', default_instance.get('bearer_token_refresh_interval', 60))
+        )
+        config['_bearer_token_last_refresh'] = time()
+
+        # Whether or not to keep a pooled, keep-alive HTTP session open to the endpoint
+        # between runs instead of paying a new TCP and TLS handshake on every scrape.
+        config['persist_connections'] = is_affirmative(
+            instance.get('persist_connections', default_instance.get('persist_connections', False))
+        )
+
+        # `_session` holds the persistent requests.Session, lazily created on the first scrape
+        config['_session'] = None
+
+        # `_connections_opened` holds the number of connections opened by the session so far
+        config['_connections_opened'] = 0
+
+        # Whether or not to replay the submissions of the last run instead of parsing the payload again
+        # when it is unchanged, which is told by the server with conditional requests or by a hash of the body.
+        config['replay_unchanged_payloads'] = is_affirmative(
+            instance.get('replay_unchanged_payloads', default_instance.get('replay_unchanged_payloads', False))
+        )
+
+        # `_payload_cache` holds the PayloadReplayCache of the endpoint
+        config['_payload_cache'] = PayloadReplayCache() if config['replay_unchanged_payloads'] else None
+
+        # `_prefetched_response` holds the `(response, error)` pair fetched ahead of time by `process_concurrently`
+        config['_prefetched_response'] = None
+
         config['telemetry'] = is_affirmative(instance.get('telemetry', default_instance.get('telemetry', False)))
 
         return config
 
-    def parse_metric_family(self, response, scraper_config):
+    def parse_metric_family(self, response, scraper_config, metric_transformers=None):
         """
         Parse the MetricFamily from a valid requests.Response object to provide a MetricFamily object (see [0])
         The text format uses iter_lines() generator.
+
+        The protobuf format directly parses the response.content property when the content-type is
+        `application/vnd.google.protobuf`, see `protobuf_to_metric_families`.
+
+        If `metric_transformers` is given, families that would not be submitted nor used for label joins
+        are skipped by the parser, without their samples being parsed.
         :param response: requests.Response
+        :param metric_transformers: dict of <metric name>:<function>, as passed to `process`
         :return: core.Metric
         """
-        input_gen = response.iter_lines(chunk_size=self.REQUESTS_CHUNK_SIZE, decode_unicode=True)
-        if scraper_config['_text_filter_blacklist']:
-            input_gen = self._text_filter_input(input_gen, scraper_config)
+        family_filter = on_skip = None
+        if metric_transformers is not None:
+            family_filter = partial(
+                self._is_family_relevant, scraper_config=scraper_config, metric_transformers=metric_transformers
+            )
+            on_skip = partial(self._skip_metric_family, scraper_config=scraper_config)
 
-        for metric in text_fd_to_metric_families(input_gen):
+        if 'application/vnd.google.protobuf' in response.headers.get('Content-Type', ''):
+            families = protobuf_to_metric_families(response.content, family_filter=family_filter, on_skip=on_skip)
+        else:
+            input_gen = response.iter_lines(chunk_size=self.REQUESTS_CHUNK_SIZE, decode_unicode=True)
+            if scraper_config['_text_filter_blacklist']:
+                input_gen = self._text_filter_input(input_gen, scraper_config)
+            families = text_fd_to_metric_families(input_gen, family_filter=family_filter, on_skip=on_skip)
+
+        for metric in families:
             self._send_telemetry_counter(
                 self.TELEMETRY_COUNTER_METRICS_INPUT_COUNT, len(metric.samples), scraper_config
             )
@@ -287,6 +374,37 @@ class OpenMetricsScraperMixin(object):
             metric.name = self._remove_metric_prefix(metric.name, scraper_config)
             yield metric
 
+    def _is_family_relevant(self, name, metric_type, scraper_config, metric_transformers):
+        """
+        Tells from its name and type only whether a metric family would be used by `process_metric`
+        """
+        metric_type = scraper_config['type_overrides'].get(name, metric_type)
+        if metric_type not in self.METRIC_TYPES:
+            return False
+
+        name = self._remove_metric_prefix(name, scraper_config)
+        if name in scraper_config['label_joins']:
+            return True
+        if name in scraper_config['ignore_metrics']:
+            return False
+
+        return name in scraper_config['metrics_mapper'] or name in metric_transformers
+
+    def _skip_metric_family(self, name, metric_type, sample_count, scraper_config):
+        """
+        Accounts for a family skipped by the parser the same way `process_metric` would have
+        """
+        self._send_telemetry_counter(self.TELEMETRY_COUNTER_METRICS_INPUT_COUNT, sample_count, scraper_config)
+        metric_type = scraper_config['type_overrides'].get(name, metric_type)
+        if metric_type not in self.METRIC_TYPES:
+            return
+
+        if self._remove_metric_prefix(name, scraper_config) in scraper_config['ignore_metrics']:
+            self._send_telemetry_counter(self.TELEMETRY_COUNTER_METRICS_IGNORE_COUNT, sample_count, scraper_config)
+        else:
+            # Unhandled metrics go through processing without being submitted
+            self._send_telemetry_counter(self.TELEMETRY_COUNTER_METRICS_PROCESS_COUNT, sample_count, scraper_config)
+
     def _text_filter_input(self, input_gen, scraper_config):
         """
         Filters out the text input line by line to avoid parsing and processing
@@ -308,10 +426,11 @@ class OpenMetricsScraperMixin(object):
         prometheus_metrics_prefix = scraper_config['prometheus_metrics_prefix']
         return metric[len(prometheus_metrics_prefix) :] if metric.startswith(prometheus_metrics_prefix) else metric
 
-    def scrape_metrics(self, scraper_config):
+    def scrape_metrics(self, scraper_config, metric_transformers=None):
         """
         Poll the data from prometheus and return the metrics as a generator.
         """
+        start_time = time()
         response = self.poll(scraper_config)
         if scraper_config['telemetry']:
             if 'content-length' in response.headers:
@@ -319,28 +438,61 @@ class OpenMetricsScraperMixin(object):
             else:
                 content_len = len(response.content)
             self._send_telemetry_gauge(self.TELEMETRY_GAUGE_MESSAGE_SIZE, content_len, scraper_config)
+            self._send_request_telemetry(response, scraper_config)
         try:
-            # no dry run if no label joins
-            if not scraper_config['label_joins']:
-                scraper_config['_dry_run'] = False
-            elif not scraper_config['_watched_labels']:
-                # build the _watched_labels set
-                for val in itervalues(scraper_config['label_joins']):
-                    scraper_config['_watched_labels'].add(val['label_to_match'])
-
-            for metric in self.parse_metric_family(response, scraper_config):
-                yield metric
+            payload_cache = scraper_config['_payload_cache']
+            if payload_cache is not None:
+                unchanged, response = payload_cache.read(response)
+                if unchanged:
+                    self.log.debug(
+                        'Payload of %s is unchanged, replaying the last run', scraper_config['prometheus_url']
+                    )
+                    payload_cache.replay()
+                    return
+                # Telemetry describes the processing of the current payload, it is not replayed
+                payload_cache.start_recording(
+                    self, ignored_prefix=self._telemetry_metric_name_with_namespace('', scraper_config)
+                )
 
-            # Set dry run off
-            scraper_config['_dry_run'] = False
-            # Garbage collect unused mapping and reset active labels
-            for metric, mapping in list(iteritems(scraper_config['_label_mapping'])):
-                for key in list(mapping):
-                    if key not in scraper_config['_active_label_mapping'][metric]:
-                        del scraper_config['_label_mapping'][metric][key]
-            scraper_config['_active_label_mapping'] = {}
+            # Metrics left over by a run that was interrupted are dropped
+            scraper_config['_pending_label_joins'] = []
+            scraper_config['_label_joins_generation'] += 1
+            for metric in self.parse_metric_family(response, scraper_config, metric_transformers=metric_transformers):
+                yield metric
         finally:
             response.close()
+            self._send_telemetry_gauge(self.TELEMETRY_GAUGE_SCRAPE_DURATION, time() - start_time, scraper_config)
+
+    def _send_request_telemetry(self, response, scraper_config):
+        """
+        Sends the time spent until the response headers were received, which covers connection setup,
+        TLS handshake and server time, and the number of connections the persistent session had to open.
+        """
+        elapsed = getattr(response, 'elapsed', None)
+        if isinstance(elapsed, timedelta):
+            self._send_telemetry_gauge(self.TELEMETRY_GAUGE_REQUEST_LATENCY, elapsed.total_seconds(), scraper_config)
+
+        session = scraper_config['_session']
+        if session is None:
+            return
+
+        connections_opened = 0
+        # The same adapter is mounted for several prefixes, count its connections once
+        adapters = {id(adapter): adapter for adapter in itervalues(session.adapters)}
+        for adapter in itervalues(adapters):
+            pools = adapter.poolmanager.pools
+            # The container of the pools can't be iterated over, only its keys can
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    connections_opened += pool.num_connections
+
+        self._send_telemetry_counter(
+            self.TELEMETRY_COUNTER_CONNECTIONS_OPENED_COUNT,
+            connections_opened - scraper_config['_connections_opened'],
+            scraper_config,
+        )
+        scraper_config['_connections_opened'] = connections_opened
 
     def process(self, scraper_config, metric_transformers=None):
         """
@@ -350,8 +502,84 @@ class OpenMetricsScraperMixin(object):
         Note that if the instance has a 'tags' attribute, it will be pushed
         automatically as additional custom tags and added to the metrics
         """
-        for metric in self.scrape_metrics(scraper_config):
-            self.process_metric(metric, scraper_config, metric_transformers=metric_transformers)
+        payload_cache = scraper_config['_payload_cache']
+        try:
+            for metric in self.scrape_metrics(scraper_config, metric_transformers=metric_transformers):
+                self.process_metric(metric, scraper_config, metric_transformers=metric_transformers)
+
+            self._process_pending_label_joins(scraper_config)
+        except Exception:
+            if payload_cache is not None:
+                payload_cache.discard()
+            raise
+
+        if payload_cache is not None:
+            payload_cache.commit()
+
+    def process_concurrently(self, scrapers, max_workers=None):
+        """
+        Processes several endpoints, fetching their payloads concurrently.
+
+        Only the HTTP requests run in worker threads: once every endpoint has answered, their payloads
+        are streamed into the parser and their metrics submitted one after the other, in order, from the
+        calling thread. An endpoint that fails doesn't prevent the others from being processed, the first
+        error is raised once they all have been.
+
+        :param scrapers: list of `(scraper_config, metric_transformers)` tuples
+        :param max_workers: maximum number of concurrent requests, defaults to one per endpoint
+        """
+        if not scrapers:
+            return
+
+        pool = self._get_prefetch_pool(min(max_workers or len(scrapers), len(scrapers)))
+        results = [pool.apply_async(self._prefetch_response, (scraper_config,)) for scraper_config, _ in scrapers]
+        for (scraper_config, _), result in zip(scrapers, results):
+            scraper_config['_prefetched_response'] = result.get()
+
+        first_error = None
+        for scraper_config, metric_transformers in scrapers:
+            try:
+                self.process(scraper_config, metric_transformers=metric_transformers)
+            except Exception as e:
+                self.log.error("Error processing endpoint {}: {}".format(scraper_config['prometheus_url'], e))
+                if first_error is None:
+                    first_error = e
+            finally:
+                # Release the connection of a response that was prefetched but never consumed
+                prefetched = scraper_config['_prefetched_response']
+                if prefetched is not None:
+                    response, _ = prefetched
+                    if response is not None:
+                        response.close()
+                scraper_config['_prefetched_response'] = None
+
+        if first_error is not None:
+            raise first_error
+
+    def _get_prefetch_pool(self, size):
+        """
+        Returns the pool of at least `size` worker threads sending the requests of `process_concurrently`
+        """
+        if self._prefetch_pool is None or self._prefetch_pool_size < size:
+            if self._prefetch_pool is not None:
+                # Its workers are idle, they exit as soon as they get the sentinels
+                self._prefetch_pool.terminate()
+            # Daemon threads, as the pool is never joined
+            self._prefetch_pool = Pool(size, name='OpenMetricsPrefetch', daemon=True)
+            self._prefetch_pool_size = size
+
+        return self._prefetch_pool
+
+    def _prefetch_response(self, scraper_config):
+        """
+        Runs in a worker thread: sends the request, the body of the response is then streamed into
+        the parser by the calling thread. Errors are returned rather than raised so that `poll` can
+        report them from the calling thread.
+        """
+        try:
+            return self.send_request(scraper_config['prometheus_url'], scraper_config), None
+        except Exception as e:
+            return None, e
 
     def _telemetry_metric_name_with_namespace(self, metric_name, scraper_config):
         return '{}.{}.{}'.format(scraper_config['namespace'], 'telemetry', metric_name)
@@ -376,51 +604,120 @@ class OpenMetricsScraperMixin(object):
                 tags.extend(extra_tags)
             self.count(metric_name_with_namespace, val, tags=tags)
 
+    def _get_label_joins_index(self, scraper_config):
+        """
+        Returns the compiled `label_joins` of the scraper, made of:
+            - `sources`: the (match key, labels to get) of each metric to store labels from
+            - `watched`: the match keys to join on, a match key being a label name or a tuple of label names
+
+        It is compiled again if `label_joins` is replaced in the configuration.
+        """
+        index = scraper_config['_label_joins_index']
+        if index is None or index['label_joins'] is not scraper_config['label_joins']:
+            sources = {}
+            watched = []
+            for metric_name, join in iteritems(scraper_config['label_joins']):
+                match_key = join['label_to_match']
+                if not isinstance(match_key, string_types):
+                    match_key = tuple(match_key) if len(match_key) > 1 else match_key[0]
+                sources[metric_name] = (match_key, frozenset(join['labels_to_get']))
+                if match_key not in watched:
+                    watched.append(match_key)
+
+            index = {'label_joins': scraper_config['label_joins'], 'sources': sources, 'watched': watched}
+            scraper_config['_label_joins_index'] = index
+
+        return index
+
+    @staticmethod
+    def _get_label_join_value(match_key, labels):
+        """
+        Returns the value(s) of the label(s) of `match_key`, None if any is missing
+        """
+        if isinstance(match_key, tuple):
+            try:
+                return tuple([labels[label_name] for label_name in match_key])
+            except KeyError:
+                return None
+        return labels.get(match_key)
+
     def _store_labels(self, metric, scraper_config):
         # If targeted metric, store labels
-        if metric.name in scraper_config['label_joins']:
-            matching_label = scraper_config['label_joins'][metric.name]['label_to_match']
-            for sample in metric.samples:
-                # metadata-only metrics that are used for label joins are always equal to 1
-                # this is required for metrics where all combinations of a state are sent
-                # but only the active one is set to 1 (others are set to 0)
-                # example: kube_pod_status_phase in kube-state-metrics
-                if sample[self.SAMPLE_VALUE] != 1:
+        source = self._get_label_joins_index(scraper_config)['sources'].get(metric.name)
+        if source is None:
+            return
+
+        match_key, labels_to_get = source
+        mapping = scraper_config['_label_mapping'].setdefault(match_key, {})
+        generations = scraper_config['_label_mapping_generation'].setdefault(match_key, {})
+        generation = scraper_config['_label_joins_generation']
+        for sample in metric.samples:
+            # metadata-only metrics that are used for label joins are always equal to 1
+            # this is required for metrics where all combinations of a state are sent
+            # but only the active one is set to 1 (others are set to 0)
+            # example: kube_pod_status_phase in kube-state-metrics
+            if sample[self.SAMPLE_VALUE] != 1:
+                continue
+            labels = sample[self.SAMPLE_LABELS]
+            matching_value = self._get_label_join_value(match_key, labels)
+            if matching_value is None:
+                continue
+
+            label_dict = {name: value for name, value in iteritems(labels) if name in labels_to_get}
+            if mapping.get(matching_value):
+                mapping[matching_value].update(label_dict)
+            else:
+                mapping[matching_value] = label_dict
+            generations[matching_value] = generation
+
+    def _join_labels(self, metric, scraper_config):
+        """
+        Enriches the samples with the labels stored for their watched labels.
+        Returns False if some watched label values are not known yet.
+        """
+        watched = self._get_label_joins_index(scraper_config)['watched']
+        if not watched:
+            return True
+
+        label_mapping = scraper_config['_label_mapping']
+        label_mapping_generation = scraper_config['_label_mapping_generation']
+        generation = scraper_config['_label_joins_generation']
+        joined = True
+        for sample in metric.samples:
+            labels = sample[self.SAMPLE_LABELS]
+            for match_key in watched:
+                matching_value = self._get_label_join_value(match_key, labels)
+                if matching_value is None:
                     continue
-                label_dict = dict()
-                matching_value = None
-                for label_name, label_value in iteritems(sample[self.SAMPLE_LABELS]):
-                    if label_name == matching_label:
-                        matching_value = label_value
-                    elif label_name in scraper_config['label_joins'][metric.name]['labels_to_get']:
-                        label_dict[label_name] = label_value
                 try:
-                    if scraper_config['_label_mapping'][matching_label].get(matching_value):
-                        scraper_config['_label_mapping'][matching_label][matching_value].update(label_dict)
-                    else:
-                        scraper_config['_label_mapping'][matching_label][matching_value] = label_dict
+                    joined_labels = label_mapping[match_key][matching_value]
                 except KeyError:
-                    if matching_value is not None:
-                        scraper_config['_label_mapping'][matching_label] = {matching_value: label_dict}
+                    joined = False
+                    continue
+                # Set this label value as active
+                label_mapping_generation[match_key][matching_value] = generation
+                labels.update(joined_labels)
 
-    def _join_labels(self, metric, scraper_config):
-        # Filter metric to see if we can enrich with joined labels
-        if scraper_config['label_joins']:
-            for sample in metric.samples:
-                watched_labels = scraper_config['_watched_labels'].intersection(set(sample[self.SAMPLE_LABELS].keys()))
-                for label_name in watched_labels:
-                    # Set this label value as active
-                    if label_name not in scraper_config['_active_label_mapping']:
-                        scraper_config['_active_label_mapping'][label_name] = {}
-                    scraper_config['_active_label_mapping'][label_name][sample[self.SAMPLE_LABELS][label_name]] = True
-                    # If mapping found add corresponding labels
-                    try:
-                        for name, val in iteritems(
-                            scraper_config['_label_mapping'][label_name][sample[self.SAMPLE_LABELS][label_name]]
-                        ):
-                            sample[self.SAMPLE_LABELS][name] = val
-                    except KeyError:
-                        pass
+        return joined
+
+    def _process_pending_label_joins(self, scraper_config):
+        """
+        Submits the metrics that were waiting for labels to join, now that the whole payload has been
+        processed, then evicts the stored labels that were neither stored nor joined during this run.
+        """
+        pending = scraper_config['_pending_label_joins']
+        scraper_config['_pending_label_joins'] = []
+        for metric, metric_transformers in pending:
+            # Labels still unknown will never be joined for this run
+            self._join_labels(metric, scraper_config)
+            self._submit_processed_metric(metric, scraper_config, metric_transformers=metric_transformers)
+
+        generation = scraper_config['_label_joins_generation']
+        for match_key, generations in iteritems(scraper_config['_label_mapping_generation']):
+            mapping = scraper_config['_label_mapping'][match_key]
+            for matching_value in [value for value, gen in iteritems(generations) if gen != generation]:
+                del generations[matching_value]
+                del mapping[matching_value]
 
     def process_metric(self, metric, scraper_config, metric_transformers=None):
         """
@@ -445,12 +742,14 @@ class OpenMetricsScraperMixin(object):
         if self._filter_metric(metric, scraper_config):
             return  # Ignore the metric
 
-        # Filter metric to see if we can enrich with joined labels
-        self._join_labels(metric, scraper_config)
-
-        if scraper_config['_dry_run']:
+        # Filter metric to see if we can enrich with joined labels, otherwise wait until the end of the run
+        if not self._join_labels(metric, scraper_config):
+            scraper_config['_pending_label_joins'].append((metric, metric_transformers))
             return
 
+        self._submit_processed_metric(metric, scraper_config, metric_transformers=metric_transformers)
+
+    def _submit_processed_metric(self, metric, scraper_config, metric_transformers=None):
         try:
             self.submit_openmetric(scraper_config['metrics_mapper'][metric.name], metric, scraper_config)
         except KeyError:
@@ -499,7 +798,14 @@ class OpenMetricsScraperMixin(object):
         service_check_tags.extend(scraper_config['custom_tags'])
 
         try:
-            response = self.send_request(endpoint, scraper_config, headers)
+            prefetched = scraper_config.get('_prefetched_response')
+            if prefetched is None:
+                response = self.send_request(endpoint, scraper_config, headers)
+            else:
+                scraper_config['_prefetched_response'] = None
+                response, error = prefetched
+                if error is not None:
+                    raise error
         except requests.exceptions.SSLError:
             self.log.error("Invalid SSL settings for requesting {} endpoint".format(endpoint))
             raise
@@ -524,14 +830,68 @@ class OpenMetricsScraperMixin(object):
             headers = {}
         if 'accept-encoding' not in headers:
             headers['accept-encoding'] = 'gzip'
+        if scraper_config['protobuf'] and 'accept' not in headers:
+            headers['accept'] = self.PROTOBUF_ACCEPT_HEADER
+        if scraper_config['_payload_cache'] is not None:
+            headers.update(scraper_config['_payload_cache'].conditional_headers())
         headers.update(scraper_config['extra_headers'])
 
         # Add the bearer token to headers
-        bearer_token = scraper_config['_bearer_token']
+        bearer_token = self._refresh_bearer_token(scraper_config)
         if bearer_token is not None:
             auth_header = {'Authorization': 'Bearer {}'.format(bearer_token)}
             headers.update(auth_header)
 
+        if scraper_config['persist_connections']:
+            session = self._get_session(scraper_config)
+            return session.get(endpoint, headers=headers, stream=True, timeout=scraper_config['prometheus_timeout'])
+
+        cert, verify = self._get_tls_settings(scraper_config)
+
+        # Determine the authentication settings
+        username = scraper_config['username']
+        password = scraper_config['password']
+        auth = (username, password) if username is not None and password is not None else None
+
+        return requests.get(
+            endpoint,
+            headers=headers,
+            stream=True,
+            timeout=scraper_config['prometheus_timeout'],
+            cert=cert,
+            verify=verify,
+            auth=auth,
+        )
+
+    def _get_session(self, scraper_config):
+        """
+        Returns the persistent session for this endpoint, creating it on first use.
+        The session owns a single connection pool so that connections are kept alive between scrapes.
+        """
+        session = scraper_config['_session']
+        if session is not None:
+            return session
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        session.cert, session.verify = self._get_tls_settings(scraper_config)
+
+        username = scraper_config['username']
+        password = scraper_config['password']
+        if username is not None and password is not None:
+            session.auth = (username, password)
+
+        scraper_config['_session'] = session
+        scraper_config['_connections_opened'] = 0
+        return session
+
+    def _get_tls_settings(self, scraper_config):
+        """
+        Returns the `cert` and `verify` arguments to pass to requests
+        """
         # Determine the SSL verification settings
         cert = None
         if isinstance(scraper_config['ssl_cert'], string_types):
@@ -550,20 +910,7 @@ class OpenMetricsScraperMixin(object):
         elif verify is False:
             disable_warnings(InsecureRequestWarning)
 
-        # Determine the authentication settings
-        username = scraper_config['username']
-        password = scraper_config['password']
-        auth = (username, password) if username is not None and password is not None else None
-
-        return requests.get(
-            endpoint,
-            headers=headers,
-            stream=True,
-            timeout=scraper_config['prometheus_timeout'],
-            cert=cert,
-            verify=verify,
-            auth=auth,
-        )
+        return cert, verify
 
     def get_hostname_for_sample(self, sample, scraper_config):
         """
@@ -772,17 +1119,82 @@ class OpenMetricsScraperMixin(object):
         custom_tags = scraper_config['custom_tags']
         _tags = list(custom_tags)
         _tags.extend(scraper_config['_metric_tags'])
-        for label_name, label_value in iteritems(sample[self.SAMPLE_LABELS]):
-            if label_name not in scraper_config['exclude_labels']:
-                tag_name = scraper_config['labels_mapper'].get(label_name, label_name)
-                _tags.append('{}:{}'.format(to_string(tag_name), to_string(label_value)))
+
+        label_tags = self._get_label_tags(scraper_config)
+        tag_prefixes = label_tags['tag_prefixes']
+        tag_cache = label_tags['cache']
+        for label in iteritems(sample[self.SAMPLE_LABELS]):
+            tag = tag_cache.get(label)
+            if tag is None:
+                label_name = label[0]
+                if label_name not in tag_prefixes:
+                    tag_prefixes[label_name] = self._label_tag_prefix(label_name, scraper_config)
+                tag_prefix = tag_prefixes[label_name]
+                # Excluded labels
+                if tag_prefix is None:
+                    continue
+                tag = tag_prefix + to_string(label[1])
+                tag_cache.set(label, tag)
+            _tags.append(tag)
+
         return self._finalize_tags_to_submit(
             _tags, metric_name, val, sample, custom_tags=custom_tags, hostname=hostname
         )
 
+    def _get_label_tags(self, scraper_config):
+        """
+        Returns the compiled label to tag conversion of the scraper, made of:
+            - `tag_prefixes`: the `tag_name:` prefix of each label name seen so far, None if the label is excluded
+            - `cache`: a bounded LRU cache of the formatted tags, by (label name, label value)
+
+        It is compiled again if `labels_mapper` or `exclude_labels` are replaced in the configuration.
+        """
+        label_tags = scraper_config['_label_tags']
+        if (
+            label_tags is None
+            or label_tags['labels_mapper'] is not scraper_config['labels_mapper']
+            or label_tags['exclude_labels'] is not scraper_config['exclude_labels']
+        ):
+            label_tags = {
+                'labels_mapper': scraper_config['labels_mapper'],
+                'exclude_labels': scraper_config['exclude_labels'],
+                'tag_prefixes': {},
+                'cache': LRUCache(self.LABEL_TAG_CACHE_SIZE),
+            }
+            scraper_config['_label_tags'] = label_tags
+
+        return label_tags
+
+    def _label_tag_prefix(self, label_name, scraper_config):
+        if label_name in scraper_config['exclude_labels']:
+            return None
+        tag_name = scraper_config['labels_mapper'].get(label_name, label_name)
+        return '{}:'.format(to_string(tag_name))
+
     def _is_value_valid(self, val):
         return not (isnan(val) or isinf(val))
 
+    def _refresh_bearer_token(self, scraper_config):
+        """
+        Returns the bearer token, reading it again from disk if the refresh interval has elapsed
+        """
+        refresh_interval = scraper_config['bearer_token_refresh_interval']
+        if scraper_config['_bearer_token'] is None or refresh_interval <= 0:
+            return scraper_config['_bearer_token']
+
+        now = time()
+        if now - scraper_config['_bearer_token_last_refresh'] >= refresh_interval:
+            try:
+                scraper_config['_bearer_token'] = self._get_bearer_token(
+                    scraper_config['bearer_token_auth'], scraper_config['bearer_token_path']
+                )
+            except Exception as err:
+                # Keep using the current token, it may still be valid
+                self.log.warning("Unable to refresh bearer token, using the previous one - error: {}".format(err))
+            scraper_config['_bearer_token_last_refresh'] = now
+
+        return scraper_config['_bearer_token']
+
     def _get_bearer_token(self, bearer_token_auth, bearer_token_path):
         if bearer_token_auth is False:
             return None
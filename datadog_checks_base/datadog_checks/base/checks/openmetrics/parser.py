@@ -0,0 +1,328 @@
+# (C) Datadog, Inc. 2019
+# All rights reserved
+# Licensed under a 3-clause BSD style license (see LICENSE)
+"""
+Streaming parsers for the Prometheus text and delimited protobuf exposition formats.
+
+They yield the same `prometheus_client.core.Metric` objects as
+`prometheus_client.parser.text_fd_to_metric_families`, but let the caller decide
+whether a metric family is relevant from its name and type alone. Sample lines of
+irrelevant families are only scanned for their name: their labels and values are
+never parsed, which is where most of the parsing time and memory goes.
+"""
+from math import isinf, isnan
+
+from google.protobuf.internal.decoder import _DecodeVarint32  # pylint: disable=E0611,E0401
+from prometheus_client.core import Metric
+
+from ...utils.prometheus import metrics_pb2
+
+# Suffixes of the sample names that belong to a family, by family type
+TYPE_SAMPLE_SUFFIXES = {
+    'counter': ('',),
+    'gauge': ('',),
+    'summary': ('_count', '_sum', ''),
+    'histogram': ('_count', '_sum', '_bucket'),
+}
+DEFAULT_SAMPLE_SUFFIXES = ('',)
+
+# Names of the metrics_pb2.MetricType values
+PROTOBUF_TYPES = {
+    metrics_pb2.COUNTER: 'counter',
+    metrics_pb2.GAUGE: 'gauge',
+    metrics_pb2.SUMMARY: 'summary',
+    metrics_pb2.UNTYPED: 'untyped',
+    metrics_pb2.HISTOGRAM: 'histogram',
+}
+
+
+def text_fd_to_metric_families(fd, family_filter=None, on_skip=None):
+    """
+    Parse Prometheus text format from an iterable of lines.
+
+    :param fd: iterable of text lines
+    :param family_filter: optional callable `(name, type) -> bool` evaluated once per family, as soon as its
+        `# TYPE` line (or its first sample for untyped families) is read. Families for which it returns
+        False are skipped without parsing their samples.
+    :param on_skip: optional callable `(name, type, sample_count)` called for every skipped family
+    :return: generator of core.Metric
+    """
+    name = ''
+    documentation = ''
+    typ = 'untyped'
+    samples = []
+    allowed_names = ()
+    # Whether the samples of the current family should be parsed
+    relevant = True
+
+    for line in fd:
+        line = line.strip()
+
+        if not line:
+            continue
+
+        if line[0] == '#':
+            parts = line.split(None, 3)
+            if len(parts) < 2:
+                continue
+            if parts[1] == 'HELP':
+                if parts[2] != name:
+                    if name != '':
+                        for metric in _flush(name, documentation, typ, samples, relevant, on_skip):
+                            yield metric
+                    # New metric
+                    name = parts[2]
+                    typ = 'untyped'
+                    samples = []
+                    allowed_names = (name,)
+                    relevant = True
+                if len(parts) == 4:
+                    documentation = _replace_help_escaping(parts[3])
+                else:
+                    documentation = ''
+            elif parts[1] == 'TYPE':
+                if parts[2] != name:
+                    if name != '':
+                        for metric in _flush(name, documentation, typ, samples, relevant, on_skip):
+                            yield metric
+                    # New metric
+                    name = parts[2]
+                    documentation = ''
+                    samples = []
+                typ = parts[3]
+                allowed_names = tuple(
+                    name + suffix for suffix in TYPE_SAMPLE_SUFFIXES.get(typ, DEFAULT_SAMPLE_SUFFIXES)
+                )
+                relevant = family_filter is None or family_filter(name, typ)
+            # Ignore other comment tokens
+            continue
+
+        sample_name = _sample_name(line)
+        if sample_name in allowed_names:
+            if relevant:
+                samples.append(_parse_sample(line))
+            else:
+                # Only the count is kept for skipped families
+                samples.append(None)
+            continue
+
+        if name != '':
+            for metric in _flush(name, documentation, typ, samples, relevant, on_skip):
+                yield metric
+
+        # New metric, yield immediately as untyped singleton
+        name = ''
+        documentation = ''
+        typ = 'untyped'
+        samples = []
+        allowed_names = ()
+        relevant = True
+
+        if family_filter is None or family_filter(sample_name, 'untyped'):
+            yield _build_metric(sample_name, '', 'untyped', [_parse_sample(line)])
+        elif on_skip is not None:
+            on_skip(sample_name, 'untyped', 1)
+
+    if name != '':
+        for metric in _flush(name, documentation, typ, samples, relevant, on_skip):
+            yield metric
+
+
+def _flush(name, documentation, typ, samples, relevant, on_skip):
+    if relevant:
+        yield _build_metric(name, documentation, typ, samples)
+    elif on_skip is not None:
+        on_skip(name, typ, len(samples))
+
+
+def _build_metric(name, documentation, typ, samples):
+    metric = Metric(name, documentation, typ)
+    metric.samples = samples
+    return metric
+
+
+def _sample_name(text):
+    """
+    Extract the sample name without parsing the labels nor the value
+    """
+    end = len(text)
+    for separator in ('{', ' ', '\t'):
+        i = text.find(separator, 0, end)
+        if i != -1:
+            end = i
+    return text[:end].strip()
+
+
+def _replace_help_escaping(s):
+    return s.replace('\\n', '\n').replace('\\\\', '\\')
+
+
+def _replace_escaping(s):
+    return s.replace('\\n', '\n').replace('\\\\', '\\').replace('\\"', '"')
+
+
+def _parse_labels(labels_string):
+    labels = {}
+    # Return if we don't have valid labels
+    if '=' not in labels_string:
+        return labels
+
+    escaping = '\\' in labels_string
+
+    sub_labels = labels_string
+    try:
+        # Process one label at a time
+        while sub_labels:
+            # The label name is before the equal
+            value_start = sub_labels.index('=')
+            label_name = sub_labels[:value_start]
+            sub_labels = sub_labels[value_start + 1 :].lstrip()
+            # Find the first quote after the equal
+            quote_start = sub_labels.index('"') + 1
+            value_substr = sub_labels[quote_start:]
+
+            # Find the last unescaped quote
+            i = 0
+            while i < len(value_substr):
+                i = value_substr.index('"', i)
+                if value_substr[i - 1] != '\\':
+                    break
+                i += 1
+
+            # The label value is in between the first and last quote
+            quote_end = i + 1
+            label_value = sub_labels[quote_start:quote_end]
+            if escaping:
+                label_value = _replace_escaping(label_value)
+            labels[label_name.strip()] = label_value.strip()
+
+            # Remove the processed label from the sub-slice for next iteration
+            sub_labels = sub_labels[quote_end + 1 :]
+            next_comma = sub_labels.find(',') + 1
+            sub_labels = sub_labels[next_comma:].lstrip()
+
+        return labels
+    except ValueError:
+        raise ValueError('Invalid labels: {}'.format(labels_string))
+
+
+def _parse_value(s):
+    # If we have multiple values (e.g. a timestamp) only consider the first
+    s = s.lstrip()
+    separator = ' ' if ' ' in s else '\t'
+    i = s.find(separator)
+    if i == -1:
+        return s
+    return s[:i]
+
+
+def _parse_sample(text):
+    label_start = text.find('{')
+    label_end = text.rfind('}')
+    if label_start != -1 and label_end != -1:
+        try:
+            # The name is before the labels, the value after the label end (ignoring curly brace and space)
+            return (
+                text[:label_start].strip(),
+                _parse_labels(text[label_start + 1 : label_end]),
+                float(_parse_value(text[label_end + 2 :])),
+            )
+        except ValueError:
+            pass
+
+    # We don't have labels
+    separator = ' ' if ' ' in text else '\t'
+    name_end = text.index(separator)
+    return text[:name_end], {}, float(_parse_value(text[name_end:]))
+
+
+def protobuf_to_metric_families(buf, family_filter=None, on_skip=None):
+    """
+    Parse the delimited protobuf format, i.e. Prometheus messages of type MetricFamily [0] delimited by a varint32 [1].
+
+    Samples are built the way the text format would have exposed them: summaries get their `quantile`
+    samples, histograms their `_bucket` samples (including the implicit `+Inf` one), along with the
+    `_sum` and `_count` samples. Values are read as is, without any string round-trip.
+
+    [0] https://github.com/prometheus/client_model/blob/086fe7ca28bde6cec2acd5223423c1475a362858/metrics.proto#L76-%20%20L81  # noqa: E501
+    [1] https://developers.google.com/protocol-buffers/docs/reference/java/com/google/protobuf/AbstractMessageLite#writeDelimitedTo(java.io.OutputStream)  # noqa: E501
+
+    :param buf: binary payload
+    :param family_filter: optional callable `(name, type) -> bool`, see `text_fd_to_metric_families`
+    :param on_skip: optional callable `(name, type, sample_count)` called for every skipped family
+    :return: generator of core.Metric
+    """
+    n = 0
+    while n < len(buf):
+        msg_len, n = _DecodeVarint32(buf, n)
+        message = metrics_pb2.MetricFamily()
+        message.ParseFromString(buf[n : n + msg_len])
+        n += msg_len
+
+        typ = PROTOBUF_TYPES.get(message.type, 'untyped')
+        if family_filter is None or family_filter(message.name, typ):
+            yield _build_metric(message.name, message.help, typ, _protobuf_samples(message.name, typ, message.metric))
+        elif on_skip is not None:
+            on_skip(message.name, typ, _protobuf_sample_count(typ, message.metric))
+
+
+def _protobuf_samples(name, typ, metrics):
+    samples = []
+    for metric in metrics:
+        labels = {label.name: label.value for label in metric.label}
+
+        if typ == 'counter':
+            samples.append((name, labels, metric.counter.value))
+        elif typ == 'gauge':
+            samples.append((name, labels, metric.gauge.value))
+        elif typ == 'summary':
+            for quantile in metric.summary.quantile:
+                quantile_labels = dict(labels)
+                quantile_labels['quantile'] = _float_to_string(quantile.quantile)
+                samples.append((name, quantile_labels, quantile.value))
+            samples.append((name + '_sum', labels, metric.summary.sample_sum))
+            samples.append((name + '_count', labels, float(metric.summary.sample_count)))
+        elif typ == 'histogram':
+            histogram = metric.histogram
+            has_inf_bucket = False
+            for bucket in histogram.bucket:
+                bucket_labels = dict(labels)
+                bucket_labels['le'] = _float_to_string(bucket.upper_bound)
+                has_inf_bucket = isinf(bucket.upper_bound)
+                samples.append((name + '_bucket', bucket_labels, float(bucket.cumulative_count)))
+            if not has_inf_bucket:
+                # The `+Inf` bucket is implicit in the protobuf format, it holds all the observations
+                bucket_labels = dict(labels)
+                bucket_labels['le'] = '+Inf'
+                samples.append((name + '_bucket', bucket_labels, float(histogram.sample_count)))
+            samples.append((name + '_sum', labels, histogram.sample_sum))
+            samples.append((name + '_count', labels, float(histogram.sample_count)))
+        else:
+            samples.append((name, labels, metric.untyped.value))
+
+    return samples
+
+
+def _protobuf_sample_count(typ, metrics):
+    """
+    Count the samples of a family the way the text format would have exposed them
+    """
+    if typ == 'summary':
+        return sum(len(metric.summary.quantile) + 2 for metric in metrics)
+    if typ == 'histogram':
+        count = 0
+        for metric in metrics:
+            buckets = metric.histogram.bucket
+            count += len(buckets) + 2
+            if not buckets or not isinf(buckets[-1].upper_bound):
+                count += 1
+        return count
+    return len(metrics)
+
+
+def _float_to_string(value):
+    if isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if isnan(value):
+        return 'NaN'
+    return repr(float(value))
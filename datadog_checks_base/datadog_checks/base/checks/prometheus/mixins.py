@@ -15,6 +15,7 @@ from urllib3 import disable_warnings
 from urllib3.exceptions import InsecureRequestWarning
 
 from ...utils.prometheus import metrics_pb2
+from ...utils.replay import PayloadReplayCache
 from .. import AgentCheck
 
 if PY3:
@@ -164,6 +165,13 @@ class PrometheusScraperMixin(object):
         # INTERNAL FEATURE, might be removed in future versions
         self._text_filter_blacklist = []
 
+        # Whether or not to replay the submissions of the last run instead of parsing the payload again
+        # when it is unchanged, which is told by the server with conditional requests or by a hash of the body.
+        self.replay_unchanged_payloads = False
+
+        # `_payload_caches` holds the PayloadReplayCache of each endpoint
+        self._payload_caches = {}
+
     def parse_metric_family(self, response):
         """
         Parse the MetricFamily from a valid requests.Response object to provide a MetricFamily object (see [0])
@@ -359,8 +367,19 @@ class PrometheusScraperMixin(object):
         """
         Poll the data from prometheus and return the metrics as a generator.
         """
-        response = self.poll(endpoint)
+        payload_cache = self._get_payload_cache(endpoint)
+        if payload_cache is None:
+            response = self.poll(endpoint)
+        else:
+            response = self.poll(endpoint, headers=payload_cache.conditional_headers())
         try:
+            if payload_cache is not None:
+                unchanged, response = payload_cache.read(response)
+                if unchanged:
+                    self.log.debug('Payload of %s is unchanged, replaying the last run', endpoint)
+                    payload_cache.replay()
+                    return
+
             # no dry run if no label joins
             if not self.label_joins:
                 self._dry_run = False
@@ -369,6 +388,11 @@ class PrometheusScraperMixin(object):
                 for val in itervalues(self.label_joins):
                     self._watched_labels.add(val['label_to_match'])
 
+            # Nothing is submitted during a dry run, so there would be nothing to replay
+            if payload_cache is not None and not self._dry_run:
+                # The scraper either is the check or submits through it
+                payload_cache.start_recording(self if isinstance(self, AgentCheck) else self.check)
+
             for metric in self.parse_metric_family(response):
                 yield metric
 
@@ -395,8 +419,17 @@ class PrometheusScraperMixin(object):
         if instance:
             kwargs['custom_tags'] = instance.get('tags', [])
 
-        for metric in self.scrape_metrics(endpoint):
-            self.process_metric(metric, **kwargs)
+        payload_cache = self._get_payload_cache(endpoint)
+        try:
+            for metric in self.scrape_metrics(endpoint):
+                self.process_metric(metric, **kwargs)
+        except Exception:
+            if payload_cache is not None:
+                payload_cache.discard()
+            raise
+
+        if payload_cache is not None:
+            payload_cache.commit()
 
     def store_labels(self, message):
         # If targeted metric, store labels
@@ -491,6 +524,15 @@ class PrometheusScraperMixin(object):
         except AttributeError as err:
             self.log.debug("Unable to handle metric: {} - error: {}".format(message.name, err))
 
+    def _get_payload_cache(self, endpoint):
+        if not self.replay_unchanged_payloads:
+            return None
+
+        payload_cache = self._payload_caches.get(endpoint)
+        if payload_cache is None:
+            payload_cache = self._payload_caches[endpoint] = PayloadReplayCache()
+        return payload_cache
+
     def poll(self, endpoint, pFormat=PrometheusFormat.PROTOBUF, headers=None):
         """
         Polls the metrics from the prometheus metrics endpoint provided.
@@ -328,6 +328,11 @@ class RequestsWrapper(object):
 
     @contextmanager
     def handle_tls_warning(self):
+        # The warnings filters are global, only requests that alter them need to be serialized
+        if not self.ignore_tls_warning:
+            yield
+            return
+
         with self.warning_lock:
 
             with warnings.catch_warnings():
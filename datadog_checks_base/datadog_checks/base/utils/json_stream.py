@@ -0,0 +1,170 @@
+# (C) Datadog, Inc. 2019
+# All rights reserved
+# Licensed under a 3-clause BSD style license (see LICENSE)
+"""
+Incremental parsing of the arrays of large JSON documents, e.g. the listings of REST APIs.
+
+The items of the array are decoded and yielded one at a time as the document is read, so only
+a single item and a chunk of the raw document are held in memory at once.
+"""
+import codecs
+import json
+import re
+
+from six import integer_types
+
+# Size of the chunks the body of the responses are read by
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+DECODER = json.JSONDecoder()
+# Characters that may follow the decoded part of a number split across chunks
+NUMBER_TAIL = re.compile(r'[0-9.eE+-]*')
+NUMBER_TYPES = integer_types + (float,)
+
+
+def iter_json_array(chunks, path=()):
+    """
+    Yields the items of the array found under `path` in a JSON document, one at a time.
+
+    Nothing is yielded when a key of the path is missing or when the value is not an array, e.g. null
+    for an empty listing. The document is only read until the end of the array.
+
+    :param chunks: iterable of the bytes or text chunks of the document, e.g. `response.iter_content(chunk_size)`
+    :param path: sequence of the keys leading to the array from the top-level object, e.g. ('apps', 'app'),
+        empty for a top-level array
+    :raises ValueError: if the document isn't valid JSON
+    """
+    reader = _Reader(chunks)
+
+    for key in path:
+        if not reader.find_key(key):
+            return
+
+    if reader.peek() != '[':
+        reader.decode_value()
+        return
+    reader.pos += 1
+
+    if reader.peek() == ']':
+        return
+
+    while True:
+        yield reader.decode_value()
+
+        char = reader.peek()
+        reader.pos += 1
+        if char == ']':
+            return
+        elif char != ',':
+            raise ValueError('Expecting \',\' delimiter or \']\', got {!r}'.format(char))
+
+
+def iter_response_json_array(response, path=(), chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Same as `iter_json_array` for the body of a `requests` response, which should be sent with `stream=True`.
+    The response is closed once the array is read.
+    """
+    try:
+        for item in iter_json_array(response.iter_content(chunk_size), path):
+            yield item
+    finally:
+        response.close()
+
+
+class _Reader(object):
+    """
+    Reads the values of a JSON document from a sliding buffer of its chunks
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = u''
+        self.pos = 0
+        self.exhausted = False
+
+    def read_more(self):
+        """
+        Appends the next chunk to the buffer, dropping what was already read.
+        Returns False at the end of the document.
+        """
+        while not self.exhausted:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                self.exhausted = True
+                chunk = self.text_decoder.decode(b'', True)
+            elif isinstance(chunk, bytes):
+                chunk = self.text_decoder.decode(chunk)
+
+            if chunk:
+                self.buffer = self.buffer[self.pos :] + chunk
+                self.pos = 0
+                return True
+
+        return False
+
+    def peek(self):
+        """
+        Returns the next character that isn't whitespace, without consuming it, or '' at the end of the document
+        """
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.read_more():
+                return ''
+
+    def decode_value(self):
+        """
+        Decodes the next value, reading as many chunks as needed
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = DECODER.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                if self.read_more():
+                    continue
+                raise
+
+            # A number may go on in the next chunk, even after what was decoded of it, e.g. `1.` or `2e`
+            if (
+                end == len(self.buffer)
+                or (isinstance(value, NUMBER_TYPES) and NUMBER_TAIL.match(self.buffer, end).end() == len(self.buffer))
+            ) and self.read_more():
+                continue
+
+            self.pos = end
+            return value
+
+    def find_key(self, key):
+        """
+        Moves to the value of `key` in the next object. Returns False if there is no such key,
+        the whole object (or whatever the value is instead) being read.
+        """
+        if self.peek() != '{':
+            self.decode_value()
+            return False
+        self.pos += 1
+
+        if self.peek() == '}':
+            self.pos += 1
+            return False
+
+        while True:
+            name = self.decode_value()
+            if self.peek() != ':':
+                raise ValueError('Expecting \':\' delimiter after key {!r}'.format(name))
+            self.pos += 1
+
+            if name == key:
+                return True
+            self.decode_value()
+
+            char = self.peek()
+            self.pos += 1
+            if char == '}':
+                return False
+            elif char != ',':
+                raise ValueError('Expecting \',\' delimiter or \'}}\', got {!r}'.format(char))
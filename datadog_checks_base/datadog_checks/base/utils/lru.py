@@ -0,0 +1,66 @@
+# (C) Datadog, Inc. 2019
+# All rights reserved
+# Licensed under a 3-clause BSD style license (see LICENSE)
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """
+    LRUCache is a bounded mapping that evicts the least recently used entry
+    once `maxsize` entries are stored. It is meant to memoize the results of
+    pure functions of a key in check hot paths, e.g. the formatting of tags.
+    """
+
+    __slots__ = ('maxsize', 'hits', 'misses', '_data')
+
+    def __init__(self, maxsize):
+        """
+        :param maxsize: maximum number of entries to keep, must be positive
+        """
+        if maxsize < 1:
+            raise ValueError('LRUCache maxsize must be positive, got {}'.format(maxsize))
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        try:
+            # Re-insert to mark the entry as the most recently used one
+            value = self._data.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+
+        self._data[key] = value
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        data = self._data
+        data.pop(key, None)
+        if len(data) >= self.maxsize:
+            # Evict the least recently used entry
+            data.popitem(last=False)
+        data[key] = value
+
+    def get_or_compute(self, key, compute):
+        """
+        Returns the cached value for `key`, calling `compute(key)` and caching its result on a miss
+        """
+        missing = self._data
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute(key)
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        self._data.clear()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,218 @@
+# (C) Datadog, Inc. 2019
+# All rights reserved
+# Licensed under a 3-clause BSD style license (see LICENSE)
+import hashlib
+from tempfile import SpooledTemporaryFile
+
+import requests
+from six import string_types
+
+_MISSING = object()
+
+# Size of the chunks the body of the responses are read by
+CHUNK_SIZE = 64 * 1024
+
+# Size up to which the body of a response is kept in memory while it is read, larger ones are spooled to disk
+SPOOL_MAX_SIZE = 1024 * 1024
+
+
+class SubmissionRecorder(object):
+    """
+    SubmissionRecorder records the metrics and service checks submitted by a check
+    so that they can be submitted again as is later on.
+
+    Only the submissions that stay correct when repeated can be replayed: gauges,
+    rates, monotonic counts (the agent computes a null delta) and service checks.
+    Any other submission, e.g. a count whose values would be added up, makes the
+    recording unusable.
+    """
+
+    REPLAYABLE_METHODS = ('gauge', 'rate', 'monotonic_count', 'service_check')
+    UNREPLAYABLE_METHODS = (
+        'count',
+        'increment',
+        'decrement',
+        'histogram',
+        'historate',
+        'submit_histogram_bucket',
+        'event',
+    )
+
+    def __init__(self, check, ignored_prefix=None):
+        """
+        :param check: the AgentCheck whose submissions are recorded
+        :param ignored_prefix: optional prefix of the names that are neither recorded nor invalidate
+            the recording, e.g. for telemetry metrics that describe the processing itself
+        """
+        self.check = check
+        self.ignored_prefix = ignored_prefix
+        self.submissions = []
+        self.replayable = True
+        self._shadowed = {}
+
+    def start(self):
+        """
+        Starts recording, by shadowing the submission methods of the check
+        """
+        for method_name in self.REPLAYABLE_METHODS + self.UNREPLAYABLE_METHODS:
+            # Keep track of any attribute already set on the instance, e.g. by tests
+            self._shadowed[method_name] = self.check.__dict__.get(method_name, _MISSING)
+
+        for method_name in self.REPLAYABLE_METHODS:
+            setattr(self.check, method_name, self._recording(method_name, getattr(self.check, method_name)))
+        for method_name in self.UNREPLAYABLE_METHODS:
+            setattr(self.check, method_name, self._invalidating(getattr(self.check, method_name)))
+
+    def stop(self):
+        for method_name, shadowed in self._shadowed.items():
+            if shadowed is _MISSING:
+                delattr(self.check, method_name)
+            else:
+                setattr(self.check, method_name, shadowed)
+        self._shadowed = {}
+
+    def replay(self):
+        for method_name, args, kwargs in self.submissions:
+            getattr(self.check, method_name)(*args, **kwargs)
+
+    def _is_ignored(self, args, kwargs):
+        if self.ignored_prefix is None:
+            return False
+
+        name = args[0] if args else kwargs.get('name')
+        return isinstance(name, string_types) and name.startswith(self.ignored_prefix)
+
+    def _recording(self, method_name, method):
+        def record(*args, **kwargs):
+            if not self._is_ignored(args, kwargs):
+                # Tags lists may be reused and mutated by the caller
+                self.submissions.append(
+                    (
+                        method_name,
+                        tuple(list(arg) if isinstance(arg, list) else arg for arg in args),
+                        {key: list(arg) if isinstance(arg, list) else arg for key, arg in kwargs.items()},
+                    )
+                )
+            return method(*args, **kwargs)
+
+        return record
+
+    def _invalidating(self, method):
+        def invalidate(*args, **kwargs):
+            if not self._is_ignored(args, kwargs):
+                self.replayable = False
+            return method(*args, **kwargs)
+
+        return invalidate
+
+
+class PayloadReplayCache(object):
+    """
+    PayloadReplayCache tells whether the payload served by an endpoint changed since
+    the last run, either from a `304 Not Modified` answer to the conditional headers
+    it provides or from a hash of the body. When it didn't, the submissions recorded
+    while processing it last time can be replayed instead of parsing it again.
+    """
+
+    def __init__(self):
+        self.etag = None
+        self.last_modified = None
+        self.digest = None
+        self._recorder = None
+        self._last_recording = None
+
+    def conditional_headers(self):
+        """
+        Returns the headers that let the server answer with a `304 Not Modified`
+        """
+        headers = {}
+        # A `304 Not Modified` is only useful if there is something to replay
+        if self._last_recording is None:
+            return headers
+
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def read(self, response):
+        """
+        Tells whether the payload is the one processed during the last run, in which case the last
+        recording can be replayed.
+
+        The body is hashed chunk by chunk as it is read into a spooled file, which only holds up to
+        `SPOOL_MAX_SIZE` bytes in memory, and `response` is closed. Returns the `(unchanged, response)`
+        pair, the new response streaming the body back from the spooled file to the parser.
+        """
+        if response.status_code == 304:
+            return self._last_recording is not None, response
+
+        self.etag = response.headers.get('ETag')
+        self.last_modified = response.headers.get('Last-Modified')
+
+        spool = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        try:
+            hasher = hashlib.sha1()
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                hasher.update(chunk)
+                spool.write(chunk)
+            spool.seek(0)
+        except Exception:
+            spool.close()
+            raise
+        finally:
+            response.close()
+
+        digest = hasher.digest()
+        unchanged = self._last_recording is not None and digest == self.digest
+        self.digest = digest
+        return unchanged, _spooled_response(response, spool)
+
+    def start_recording(self, check, ignored_prefix=None):
+        self._recorder = SubmissionRecorder(check, ignored_prefix=ignored_prefix)
+        self._recorder.start()
+
+    def commit(self):
+        """
+        Stops recording, the recording can be replayed if the next payload is unchanged
+        """
+        recorder = self._recorder
+        if recorder is None:
+            return
+
+        recorder.stop()
+        self._recorder = None
+        self._last_recording = recorder if recorder.replayable else None
+
+    def discard(self):
+        """
+        Stops recording and forgets about the last payload, e.g. when its processing failed
+        """
+        if self._recorder is not None:
+            self._recorder.stop()
+            self._recorder = None
+
+        self.etag = None
+        self.last_modified = None
+        self.digest = None
+        self._last_recording = None
+
+    def replay(self):
+        self._last_recording.replay()
+
+
+def _spooled_response(response, spool):
+    """
+    Returns a response with the status and headers of `response` whose body is read from `spool`
+    """
+    spooled = requests.Response()
+    spooled.raw = spool
+    spooled.status_code = response.status_code
+    spooled.headers = response.headers
+    spooled.encoding = response.encoding
+    spooled.url = response.url
+    spooled.reason = response.reason
+    spooled.elapsed = response.elapsed
+    spooled.request = response.request
+    return spooled
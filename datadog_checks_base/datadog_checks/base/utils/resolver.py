@@ -0,0 +1,62 @@
+# (C) Datadog, Inc. 2019
+# All rights reserved
+# Licensed under a 3-clause BSD style license (see LICENSE)
+"""
+Cache of host name resolutions shared by all the checks of the process, so that checks probing the same
+hosts at every run don't send as many queries to the resolvers of the system.
+
+The system resolver doesn't expose the TTL of the records, so resolutions are cached for the number of
+seconds given by the callers, which should not exceed the TTL of the records of the hosts they resolve.
+"""
+
+import socket
+import threading
+import time
+
+from .lru import LRUCache
+
+# Maximum number of host names whose resolution is cached
+DEFAULT_CACHE_SIZE = 4096
+
+# {host: (time of the resolution, address, error)}
+_cache = LRUCache(DEFAULT_CACHE_SIZE)
+_cache_lock = threading.Lock()
+
+
+def gethostbyname(host, ttl=0, negative_ttl=0):
+    """
+    Same as `socket.gethostbyname`, with results cached across calls.
+
+    :param ttl: number of seconds an address is reused for, 0 to resolve the host name again
+    :param negative_ttl: number of seconds the error of a failed resolution is raised again for,
+        0 to resolve the host name again
+    :raises socket.error: if the host name can't be resolved
+    """
+    with _cache_lock:
+        entry = _cache.get(host)
+
+    if entry is not None:
+        resolved_at, address, error = entry
+        age = time.time() - resolved_at
+        if error is None and age < ttl:
+            return address
+        elif error is not None and age < negative_ttl:
+            # A new exception, as raising the same one again would grow its traceback
+            raise type(error)(*error.args)
+
+    try:
+        address = socket.gethostbyname(host)
+    except socket.error as e:
+        with _cache_lock:
+            _cache.set(host, (time.time(), None, e))
+        raise
+
+    with _cache_lock:
+        _cache.set(host, (time.time(), address, None))
+
+    return address
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
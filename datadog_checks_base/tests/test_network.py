@@ -0,0 +1,116 @@
+# (C) Datadog, Inc. 2019
+# All rights reserved
+# Licensed under a 3-clause BSD style license (see LICENSE)
+import threading
+
+from datadog_checks.base.checks.network import NetworkCheck, Status
+
+
+class ProbeCheck(NetworkCheck):
+    SC_STATUS = 'probe.can_connect'
+
+    def __init__(self, *args, **kwargs):
+        super(ProbeCheck, self).__init__(*args, **kwargs)
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.probed = threading.Event()
+
+    def _check(self, instance):
+        self.started.set()
+        self.release.wait(5)
+        self.probed.set()
+        if instance.get('fail'):
+            raise Exception('probe failed')
+        return Status.UP, 'UP'
+
+    def report_as_service_check(self, sc_name, status, instance, msg=None):
+        self.service_check(
+            self.SC_STATUS, self.STATUS_TO_SERVICE_CHECK[status], tags=['instance:{}'.format(instance['name'])]
+        )
+
+
+def test_check_synchronously(aggregator):
+    check = ProbeCheck('probe', {}, [{}])
+    check.release.set()
+    check.check({'name': 'foo'})
+
+    aggregator.assert_service_check('probe.can_connect', status=NetworkCheck.OK, tags=['instance:foo'], count=1)
+
+
+def test_check_concurrently(aggregator):
+    instance = {'name': 'foo', 'concurrent_probes': True}
+    check = ProbeCheck('probe', {}, [instance])
+
+    # The probe runs in the background
+    check.check(instance)
+    assert len(aggregator.service_checks('probe.can_connect')) == 0
+
+    # It isn't submitted again while still running
+    check.check(instance)
+    assert len(check._probes) == 1
+    assert len(aggregator.service_checks('probe.can_connect')) == 0
+
+    # Its statuses are reported by the run following its completion
+    check.release.set()
+    check.probed.wait(5)
+    check._probes['foo'].done.wait(5)
+    check.check(instance)
+    aggregator.assert_service_check('probe.can_connect', status=NetworkCheck.OK, tags=['instance:foo'], count=1)
+
+
+def test_check_concurrently_timeout(aggregator):
+    instance = {'name': 'foo', 'concurrent_probes': True, 'probe_timeout': 0}
+    check = ProbeCheck('probe', {}, [instance])
+
+    check.check(instance)
+    check.started.wait(5)
+    check.check(instance)
+    check.release.set()
+
+    aggregator.assert_service_check('probe.can_connect', status=NetworkCheck.CRITICAL, tags=['instance:foo'], count=1)
+
+
+class SingleThreadProbeCheck(ProbeCheck):
+    pass
+
+
+def test_check_concurrently_queued(aggregator):
+    """
+    The time a probe waits for a thread doesn't count in its timeout
+    """
+    init_config = {'probe_threads': 1}
+    running = {'name': 'foo', 'concurrent_probes': True, 'probe_timeout': 0}
+    queued = {'name': 'bar', 'concurrent_probes': True, 'probe_timeout': 0}
+    running_check = SingleThreadProbeCheck('probe', init_config, [running])
+    queued_check = SingleThreadProbeCheck('probe', init_config, [queued])
+
+    running_check.check(running)
+    running_check.started.wait(5)
+    queued_check.check(queued)
+
+    # The probe holding the only thread times out, the other one waits for it
+    running_check.check(running)
+    queued_check.check(queued)
+    aggregator.assert_service_check('probe.can_connect', status=NetworkCheck.CRITICAL, tags=['instance:foo'], count=1)
+    assert len(aggregator.service_checks('probe.can_connect')) == 1
+    assert queued_check._probes['bar'].start is None
+
+    running_check.release.set()
+    queued_check.release.set()
+    queued_check._probes['bar'].done.wait(5)
+    queued_check.check(queued)
+    aggregator.assert_service_check('probe.can_connect', status=NetworkCheck.OK, tags=['instance:bar'], count=1)
+
+
+def test_check_concurrently_error(aggregator):
+    instance = {'name': 'foo', 'concurrent_probes': True, 'fail': True}
+    check = ProbeCheck('probe', {}, [instance])
+    check.release.set()
+
+    check.check(instance)
+    check._probes['foo'].done.wait(5)
+    check.check(instance)
+
+    assert len(aggregator.service_checks('probe.can_connect')) == 0
+    # A new probe was submitted
+    assert check._probes['foo'] is not None
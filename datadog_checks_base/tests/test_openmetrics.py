@@ -7,6 +7,7 @@ import copy
 import logging
 import math
 import os
+import threading
 
 import mock
 import pytest
@@ -344,6 +345,40 @@ def test_submit_gauge_with_exclude_labels(aggregator, mocked_prometheus_check, m
     )
 
 
+def test_label_tags_cache(aggregator, mocked_prometheus_check, mocked_prometheus_scraper_config):
+    """
+    Formatted tags are cached per label name and value, and the cache is
+    rebuilt when exclude_labels or labels_mapper are replaced
+    """
+    ref_gauge = GaugeMetricFamily(
+        'process_virtual_memory_bytes', 'Virtual memory size in bytes.', labels=['my_1st_label', 'my_2nd_label']
+    )
+    ref_gauge.add_metric(['value_1', 'value_2'], 1.0)
+    ref_gauge.add_metric(['value_1', 'value_3'], 2.0)
+
+    check = mocked_prometheus_check
+    mocked_prometheus_scraper_config['exclude_labels'] = ['my_2nd_label']
+    metric = mocked_prometheus_scraper_config['metrics_mapper'][ref_gauge.name]
+    check.submit_openmetric(metric, ref_gauge, mocked_prometheus_scraper_config)
+
+    label_tags = mocked_prometheus_scraper_config['_label_tags']
+    assert label_tags['tag_prefixes'] == {'my_1st_label': 'my_1st_label:', 'my_2nd_label': None}
+    # Excluded labels are never formatted nor cached
+    assert len(label_tags['cache']) == 1
+    assert label_tags['cache'].hits == 1
+
+    mocked_prometheus_scraper_config['exclude_labels'] = []
+    check.submit_openmetric(metric, ref_gauge, mocked_prometheus_scraper_config)
+
+    aggregator.assert_metric('prometheus.process.vm.bytes', 1.0, tags=['my_1st_label:value_1'], count=1)
+    aggregator.assert_metric(
+        'prometheus.process.vm.bytes', 1.0, tags=['my_1st_label:value_1', 'my_2nd_label:value_2'], count=1
+    )
+    aggregator.assert_metric(
+        'prometheus.process.vm.bytes', 2.0, tags=['my_1st_label:value_1', 'my_2nd_label:value_3'], count=1
+    )
+
+
 def test_submit_counter(aggregator, mocked_prometheus_check, mocked_prometheus_scraper_config):
     _counter = CounterMetricFamily('my_counter', 'Random counter')
     _counter.add_metric([], 42)
@@ -1308,10 +1343,7 @@ def test_label_joins(aggregator, mocked_prometheus_check, mocked_prometheus_scra
         'kube_deployment_status_replicas': 'deploy.replicas.available',
     }
 
-    # dry run to build mapping
-    check.process(mocked_prometheus_scraper_config)
-
-    # run with submit
+    # labels are joined during the first run
     check.process(mocked_prometheus_scraper_config)
 
     # check a bunch of metrics
@@ -1586,9 +1618,7 @@ def test_label_joins_gc(aggregator, mocked_prometheus_check, mocked_prometheus_s
         'kube_pod_info': {'label_to_match': 'pod', 'labels_to_get': ['node', 'pod_ip']}
     }
     mocked_prometheus_scraper_config['metrics_mapper'] = {'kube_pod_status_ready': 'pod.ready'}
-    # dry run to build mapping
-    check.process(mocked_prometheus_scraper_config)
-    # run with submit
+    # labels are joined during the first run
     check.process(mocked_prometheus_scraper_config)
 
     # check a bunch of metrics
@@ -1638,9 +1668,7 @@ def test_label_joins_missconfigured(aggregator, mocked_prometheus_check, mocked_
     }
     mocked_prometheus_scraper_config['metrics_mapper'] = {'kube_pod_status_ready': 'pod.ready'}
 
-    # dry run to build mapping
-    check.process(mocked_prometheus_scraper_config)
-    # run with submit
+    # labels are joined during the first run
     check.process(mocked_prometheus_scraper_config)
 
     # check a bunch of metrics
@@ -1676,9 +1704,7 @@ def test_label_join_not_existing(aggregator, mocked_prometheus_check, mocked_pro
         'kube_pod_info': {'label_to_match': 'not_existing', 'labels_to_get': ['node', 'pod_ip']}
     }
     mocked_prometheus_scraper_config['metrics_mapper'] = {'kube_pod_status_ready': 'pod.ready'}
-    # dry run to build mapping
-    check.process(mocked_prometheus_scraper_config)
-    # run with submit
+    # labels are joined during the first run
     check.process(mocked_prometheus_scraper_config)
     # check a bunch of metrics
     aggregator.assert_metric(
@@ -1699,9 +1725,7 @@ def test_label_join_metric_not_existing(
         'not_existing': {'label_to_match': 'pod', 'labels_to_get': ['node', 'pod_ip']}
     }
     mocked_prometheus_scraper_config['metrics_mapper'] = {'kube_pod_status_ready': 'pod.ready'}
-    # dry run to build mapping
-    check.process(mocked_prometheus_scraper_config)
-    # run with submit
+    # labels are joined during the first run
     check.process(mocked_prometheus_scraper_config)
     # check a bunch of metrics
     aggregator.assert_metric(
@@ -1721,9 +1745,7 @@ def test_label_join_with_hostname(aggregator, mocked_prometheus_check, mocked_pr
     }
     mocked_prometheus_scraper_config['label_to_hostname'] = 'node'
     mocked_prometheus_scraper_config['metrics_mapper'] = {'kube_pod_status_ready': 'pod.ready'}
-    # dry run to build mapping
-    check.process(mocked_prometheus_scraper_config)
-    # run with submit
+    # labels are joined during the first run
     check.process(mocked_prometheus_scraper_config)
     # check a bunch of metrics
     aggregator.assert_metric(
@@ -1764,9 +1786,7 @@ def test_label_join_state_change(aggregator, mocked_prometheus_check, mocked_pro
         'kube_pod_status_phase': {'label_to_match': 'pod', 'labels_to_get': ['phase']},
     }
     mocked_prometheus_scraper_config['metrics_mapper'] = {'kube_pod_status_ready': 'pod.ready'}
-    # dry run to build mapping
-    check.process(mocked_prometheus_scraper_config)
-    # run with submit
+    # labels are joined during the first run
     check.process(mocked_prometheus_scraper_config)
 
     # check that 15 pods are in phase:Running
@@ -1788,6 +1808,46 @@ def test_label_join_state_change(aggregator, mocked_prometheus_check, mocked_pro
         assert mocked_prometheus_scraper_config['_label_mapping']['pod']['dd-agent-62bgh']['phase'] == 'Test'
 
 
+def test_label_joins_multiple_labels_before_source(
+    aggregator, mocked_prometheus_check, mocked_prometheus_scraper_config
+):
+    """
+    Tests joining on several labels at once, with samples listed before the metric holding the labels
+    """
+    text_data = '\n'.join(
+        [
+            '# TYPE kube_pod_status_ready gauge',
+            'kube_pod_status_ready{namespace="default",pod="web"} 1',
+            'kube_pod_status_ready{namespace="other",pod="web"} 1',
+            'kube_pod_status_ready{namespace="other",pod="unknown"} 1',
+            '# TYPE kube_pod_info gauge',
+            'kube_pod_info{namespace="default",pod="web",node="node1"} 1',
+            'kube_pod_info{namespace="other",pod="web",node="node2"} 1',
+        ]
+    )
+    check = mocked_prometheus_check
+    mocked_prometheus_scraper_config['namespace'] = 'ksm'
+    mocked_prometheus_scraper_config['label_joins'] = {
+        'kube_pod_info': {'label_to_match': ['namespace', 'pod'], 'labels_to_get': ['node']}
+    }
+    mocked_prometheus_scraper_config['metrics_mapper'] = {'kube_pod_status_ready': 'pod.ready'}
+
+    mock_response = mock.MagicMock(
+        status_code=200, iter_lines=lambda **kwargs: text_data.split("\n"), headers={'Content-Type': text_content_type}
+    )
+    with mock.patch('requests.get', return_value=mock_response, __name__="get"):
+        check.process(mocked_prometheus_scraper_config)
+
+    aggregator.assert_metric('ksm.pod.ready', tags=['namespace:default', 'pod:web', 'node:node1'], count=1)
+    aggregator.assert_metric('ksm.pod.ready', tags=['namespace:other', 'pod:web', 'node:node2'], count=1)
+    aggregator.assert_metric('ksm.pod.ready', tags=['namespace:other', 'pod:unknown'], count=1)
+    aggregator.assert_all_metrics_covered()
+    assert mocked_prometheus_scraper_config['_label_mapping'][('namespace', 'pod')][('other', 'web')] == {
+        'node': 'node2'
+    }
+    assert mocked_prometheus_scraper_config['_pending_label_joins'] == []
+
+
 def test_health_service_check_ok(mock_get, aggregator, mocked_prometheus_check, mocked_prometheus_scraper_config):
     """ Tests endpoint health service check OK """
     check = mocked_prometheus_check
@@ -1884,12 +1944,168 @@ def test_filter_metrics(
         'kube_pod_container_status_restarts': 'pod.restart',
         'kube_pod_container_status_restarts_old': 'pod.restart_old',
     }
-    # dry run to build mapping
-    check.process(mocked_filter_openmetrics_check_scraper_config)
-    # run with submit
+    # labels are joined during the first run
     check.process(mocked_filter_openmetrics_check_scraper_config)
     # check a bunch of metrics
     aggregator.assert_metric(
         'filter.pod.restart', tags=['pod:kube-dns-autoscaler-97162954-mf6d3', 'namespace:kube-system'], value=42
     )
     aggregator.assert_all_metrics_covered()
+
+
+def test_process_skips_unhandled_families(
+    aggregator, mocked_prometheus_check, mocked_prometheus_scraper_config, mock_get
+):
+    """ Families without mapping, transformer nor label join are not handed to process_metric """
+    check = mocked_prometheus_check
+    mocked_prometheus_scraper_config['namespace'] = 'ksm'
+    mocked_prometheus_scraper_config['metrics_mapper'] = {'kube_pod_status_ready': 'pod.ready'}
+    mocked_prometheus_scraper_config['label_joins'] = {
+        'kube_pod_info': {'label_to_match': 'pod', 'labels_to_get': ['node']}
+    }
+    transformer = mock.MagicMock()
+
+    with mock.patch.object(check, 'process_metric', wraps=check.process_metric) as process_metric:
+        check.process(mocked_prometheus_scraper_config, metric_transformers={'kube_pod_status_phase': transformer})
+        processed = sorted(call[0][0].name for call in process_metric.call_args_list)
+
+    assert processed == ['kube_pod_info', 'kube_pod_status_phase', 'kube_pod_status_ready']
+
+
+def test_process_concurrently(aggregator, mocked_prometheus_check):
+    """ Endpoints are fetched concurrently but an error on one of them doesn't prevent processing the others """
+    check = mocked_prometheus_check
+    scrapers = []
+    for endpoint in ('http://fake.first:10055/metrics', 'http://fake.second:10055/metrics'):
+        instance = {'prometheus_url': endpoint, 'namespace': 'prometheus', 'metrics': [{'foo': 'foo'}]}
+        scrapers.append((check.get_scraper_config(instance), None))
+
+    def get(url, **_):
+        if 'first' in url:
+            raise requests.ConnectionError('Connection refused')
+        return mock.MagicMock(
+            status_code=200,
+            iter_lines=lambda **kwargs: ['# TYPE foo gauge', 'foo 42'],
+            headers={'Content-Type': text_content_type},
+        )
+
+    with mock.patch('requests.get', side_effect=get, __name__="get"):
+        with pytest.raises(requests.ConnectionError):
+            check.process_concurrently(scrapers)
+
+    aggregator.assert_metric('prometheus.foo', 42, tags=[], count=1)
+    aggregator.assert_service_check(
+        'prometheus.prometheus.health',
+        status=OpenMetricsBaseCheck.CRITICAL,
+        tags=['endpoint:http://fake.first:10055/metrics'],
+    )
+    aggregator.assert_service_check(
+        'prometheus.prometheus.health',
+        status=OpenMetricsBaseCheck.OK,
+        tags=['endpoint:http://fake.second:10055/metrics'],
+    )
+    assert all(scraper_config['_prefetched_response'] is None for scraper_config, _ in scrapers)
+
+
+def test_process_concurrently_reuses_pool(aggregator, mocked_prometheus_check):
+    """ The worker threads are kept across runs and the payloads are streamed from the calling thread """
+    check = mocked_prometheus_check
+    instance = {'prometheus_url': 'http://fake.endpoint:10055/metrics', 'namespace': 'prometheus', 'metrics': ['foo']}
+    scrapers = [(check.get_scraper_config(instance), None)]
+    readers = []
+
+    def iter_lines(**kwargs):
+        readers.append(threading.current_thread())
+        return ['# TYPE foo gauge', 'foo 42']
+
+    def get(url, **_):
+        return mock.MagicMock(status_code=200, iter_lines=iter_lines, headers={'Content-Type': text_content_type})
+
+    with mock.patch('requests.get', side_effect=get, __name__="get"):
+        check.process_concurrently(scrapers)
+        pool = check._prefetch_pool
+        check.process_concurrently(scrapers)
+
+    assert check._prefetch_pool is pool
+    assert readers == [threading.current_thread()] * 2
+    aggregator.assert_metric('prometheus.foo', 42, tags=[], count=2)
+
+
+def test_process_concurrently_closes_unconsumed_response(aggregator, mocked_prometheus_check):
+    """ A prefetched response is closed when the endpoint fails before reading it """
+    check = mocked_prometheus_check
+    instance = {'prometheus_url': 'http://fake.endpoint:10055/metrics', 'namespace': 'prometheus', 'metrics': ['foo']}
+    scrapers = [(check.get_scraper_config(instance), None)]
+    response = mock.MagicMock(status_code=200, headers={'Content-Type': text_content_type})
+
+    with mock.patch('requests.get', return_value=response, __name__="get"):
+        with mock.patch.object(check, 'process', side_effect=Exception('process failed')):
+            with pytest.raises(Exception, match='process failed'):
+                check.process_concurrently(scrapers)
+
+    response.close.assert_called_once_with()
+    assert scrapers[0][0]['_prefetched_response'] is None
+
+
+def test_process_protobuf(aggregator, mocked_prometheus_check):
+    """ The protobuf format is negotiated and parsed when enabled """
+    check = mocked_prometheus_check
+    instance = {
+        'prometheus_url': 'http://fake.endpoint:10055/metrics',
+        'namespace': 'prometheus',
+        'metrics': [{'go_goroutines': 'goroutines'}],
+        'protobuf': True,
+    }
+    scraper_config = check.get_scraper_config(instance)
+    with open(os.path.join(os.path.dirname(__file__), 'fixtures', 'prometheus', 'protobuf.bin'), 'rb') as f:
+        bin_data = f.read()
+    mock_response = mock.MagicMock(
+        status_code=200,
+        content=bin_data,
+        headers={
+            'Content-Type': 'application/vnd.google.protobuf; proto=io.prometheus.client.MetricFamily; '
+            'encoding=delimited'
+        },
+    )
+
+    with mock.patch('requests.get', return_value=mock_response, __name__="get") as get:
+        check.process(scraper_config, metric_transformers={})
+
+    assert get.call_args[1]['headers']['accept'] == check.PROTOBUF_ACCEPT_HEADER
+    aggregator.assert_metric('prometheus.goroutines', 23, tags=[], count=1)
+    aggregator.assert_all_metrics_covered()
+
+
+def test_replay_unchanged_payloads(aggregator, mocked_prometheus_check):
+    """ Unchanged payloads are not parsed again, the submissions of the last run are replayed instead """
+    check = mocked_prometheus_check
+    instance = {
+        'prometheus_url': 'http://fake.endpoint:10055/metrics',
+        'namespace': 'prometheus',
+        'metrics': [{'foo': 'foo'}],
+        'replay_unchanged_payloads': True,
+    }
+    scraper_config = check.get_scraper_config(instance)
+    payloads = [b'# TYPE foo gauge\nfoo 1', b'# TYPE foo gauge\nfoo 1', b'', b'# TYPE foo gauge\nfoo 2']
+    responses = [
+        mock.MagicMock(
+            status_code=304 if not payload else 200,
+            encoding='utf-8',
+            iter_content=lambda payload=payload, **kwargs: [payload[:10], payload[10:]],
+            headers={'Content-Type': text_content_type, 'ETag': '"v1"'},
+        )
+        for payload in payloads
+    ]
+
+    with mock.patch('requests.get', side_effect=responses, __name__="get") as get:
+        with mock.patch.object(check, 'parse_metric_family', wraps=check.parse_metric_family) as parse:
+            for _ in payloads:
+                check.process(scraper_config)
+
+    # The identical body and the `304 Not Modified` were replayed
+    assert parse.call_count == 2
+    assert 'If-None-Match' not in get.call_args_list[0][1]['headers']
+    assert get.call_args_list[2][1]['headers']['If-None-Match'] == '"v1"'
+    aggregator.assert_metric('prometheus.foo', 1, tags=[], count=3)
+    aggregator.assert_metric('prometheus.foo', 2, tags=[], count=1)
+    assert 'gauge' not in check.__dict__
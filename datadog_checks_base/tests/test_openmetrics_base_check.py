@@ -1,7 +1,9 @@
 import os
+import threading
 
 import pytest
 from mock import patch
+from six.moves import BaseHTTPServer, socketserver
 
 from datadog_checks.checks.openmetrics import OpenMetricsBaseCheck
 
@@ -104,3 +106,106 @@ def test_bearer_token_not_found():
     }
     with pytest.raises(IOError):
         OpenMetricsBaseCheck('prometheus_check', {}, {}, [instance])
+
+
+def test_bearer_token_refresh():
+    endpoint = "none"
+    instance = {
+        'prometheus_url': endpoint,
+        'namespace': 'default_namespace',
+        'bearer_token_auth': True,
+        'bearer_token_path': os.path.join(FIXTURE_PATH, 'custom_token'),
+        'bearer_token_refresh_interval': 10,
+    }
+    check = OpenMetricsBaseCheck('prometheus_check', {}, {}, [instance])
+    scraper_config = check.get_scraper_config(instance)
+    scraper_config['bearer_token_path'] = os.path.join(FIXTURE_PATH, 'default_token')
+
+    # The refresh interval has not elapsed yet
+    assert check._refresh_bearer_token(scraper_config) == 'my custom token'
+
+    scraper_config['_bearer_token_last_refresh'] -= 10
+    assert check._refresh_bearer_token(scraper_config) == 'my default token'
+
+
+def test_persist_connections_reuses_session():
+    endpoint = "http://fake.endpoint:10055/metrics"
+    instance = {
+        'prometheus_url': endpoint,
+        'namespace': 'default_namespace',
+        'metrics': ['foo'],
+        'persist_connections': True,
+        'username': 'user',
+        'password': 'pass',
+        'ssl_ca_cert': '/path/to/ca.pem',
+    }
+    check = OpenMetricsBaseCheck('prometheus_check', {}, {}, [instance])
+    scraper_config = check.get_scraper_config(instance)
+
+    with patch('requests.Session.get') as session_get, patch('requests.get') as requests_get:
+        check.send_request(endpoint, scraper_config)
+        check.send_request(endpoint, scraper_config)
+
+        assert session_get.call_count == 2
+        requests_get.assert_not_called()
+
+    session = scraper_config['_session']
+    assert session.auth == ('user', 'pass')
+    assert session.verify == '/path/to/ca.pem'
+    assert session.get_adapter('https://fake.endpoint') is session.get_adapter('http://fake.endpoint')
+
+
+class MetricsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    # Keeps the connections alive between requests
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'# TYPE foo gauge\nfoo 1\n'
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class MetricsServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    # The handlers of the kept-alive connections don't prevent the shutdown
+    daemon_threads = True
+
+
+@pytest.fixture
+def metrics_server():
+    server = MetricsServer(('127.0.0.1', 0), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    try:
+        yield 'http://127.0.0.1:{}/metrics'.format(server.server_address[1])
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_connections_opened_telemetry(aggregator, metrics_server):
+    instance = {
+        'prometheus_url': metrics_server,
+        'namespace': 'default_namespace',
+        'metrics': ['foo'],
+        'persist_connections': True,
+        'telemetry': True,
+    }
+    check = OpenMetricsBaseCheck('prometheus_check', {}, {}, [instance])
+    scraper_config = check.get_scraper_config(instance)
+    metric_name = 'default_namespace.telemetry.connections.opened.count'
+
+    check.process(scraper_config)
+    aggregator.assert_metric(metric_name, value=1, count=1)
+
+    # The connection is kept alive
+    aggregator.reset()
+    check.process(scraper_config)
+    aggregator.assert_metric(metric_name, value=0, count=1)
+    aggregator.assert_metric('default_namespace.foo', value=1, count=1)
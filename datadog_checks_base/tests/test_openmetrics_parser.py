@@ -0,0 +1,124 @@
+# (C) Datadog, Inc. 2019
+# All rights reserved
+# Licensed under a 3-clause BSD style license (see LICENSE)
+import os
+
+import mock
+import pytest
+from google.protobuf.internal.encoder import _VarintBytes  # pylint: disable=E0611,E0401
+from prometheus_client.parser import text_fd_to_metric_families as reference_parser
+
+from datadog_checks.base.checks.openmetrics.parser import protobuf_to_metric_families, text_fd_to_metric_families
+from datadog_checks.base.utils.prometheus import metrics_pb2
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'prometheus')
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), 'r') as f:
+        return f.read().split('\n')
+
+
+def encode_families(families):
+    return b''.join(_VarintBytes(family.ByteSize()) + family.SerializeToString() for family in families)
+
+
+def protobuf_families():
+    gauge = metrics_pb2.MetricFamily(name='foo', help='A gauge', type=metrics_pb2.GAUGE)
+    metric = gauge.metric.add()
+    metric.label.add(name='a', value='b')
+    metric.gauge.value = 1.5
+
+    summary = metrics_pb2.MetricFamily(name='latency', help='A summary', type=metrics_pb2.SUMMARY)
+    metric = summary.metric.add()
+    metric.summary.quantile.add(quantile=0.5, value=2)
+    metric.summary.sample_sum = 10
+    metric.summary.sample_count = 4
+
+    histogram = metrics_pb2.MetricFamily(name='size', help='A histogram', type=metrics_pb2.HISTOGRAM)
+    metric = histogram.metric.add()
+    metric.label.add(name='a', value='c')
+    metric.histogram.bucket.add(upper_bound=1, cumulative_count=1)
+    metric.histogram.bucket.add(upper_bound=5, cumulative_count=3)
+    metric.histogram.sample_sum = 7
+    metric.histogram.sample_count = 4
+
+    return [gauge, summary, histogram]
+
+
+def test_protobuf_same_output_as_text():
+    lines = [
+        '# HELP foo A gauge',
+        '# TYPE foo gauge',
+        'foo{a="b"} 1.5',
+        '# HELP latency A summary',
+        '# TYPE latency summary',
+        'latency{quantile="0.5"} 2',
+        'latency_sum 10',
+        'latency_count 4',
+        '# HELP size A histogram',
+        '# TYPE size histogram',
+        'size_bucket{a="c",le="1.0"} 1',
+        'size_bucket{a="c",le="5.0"} 3',
+        'size_bucket{a="c",le="+Inf"} 4',
+        'size_sum{a="c"} 7',
+        'size_count{a="c"} 4',
+    ]
+    buf = encode_families(protobuf_families())
+    assert list(protobuf_to_metric_families(buf)) == list(reference_parser(lines))
+
+
+def test_protobuf_family_filter():
+    buf = encode_families(protobuf_families())
+    on_skip = mock.MagicMock()
+
+    metrics = list(protobuf_to_metric_families(buf, family_filter=lambda name, _: name == 'foo', on_skip=on_skip))
+
+    assert [m.name for m in metrics] == ['foo']
+    on_skip.assert_has_calls([mock.call('latency', 'summary', 3), mock.call('size', 'histogram', 5)])
+
+
+@pytest.mark.parametrize('fixture', ['metrics.txt', 'ksm.txt', 'deprecated.txt'])
+def test_same_output_as_prometheus_client(fixture):
+    lines = read_fixture(fixture)
+    assert list(text_fd_to_metric_families(lines)) == list(reference_parser(lines))
+
+
+def test_untyped_and_escaped_samples():
+    lines = [
+        '# HELP foo Some \\\\ help',
+        '# TYPE foo gauge',
+        'foo{label="a\\"b",other="c"} 1 1395066363000',
+        'bar 2',
+        'baz{a="b"}\t3',
+    ]
+    assert list(text_fd_to_metric_families(lines)) == list(reference_parser(lines))
+
+
+def test_family_filter_skips_samples():
+    lines = [
+        '# HELP kept A kept gauge',
+        '# TYPE kept gauge',
+        'kept{a="b"} 1',
+        '# HELP skipped A skipped histogram',
+        '# TYPE skipped histogram',
+        'skipped_bucket{le="1"} 1',
+        'skipped_bucket{le="+Inf"} 2',
+        'skipped_sum 3',
+        'skipped_count 2',
+        'untyped_skipped 4',
+    ]
+    family_filter = mock.MagicMock(side_effect=lambda name, metric_type: name == 'kept')
+    on_skip = mock.MagicMock()
+
+    with mock.patch('datadog_checks.base.checks.openmetrics.parser._parse_labels', return_value={'a': 'b'}) as labels:
+        metrics = list(text_fd_to_metric_families(lines, family_filter=family_filter, on_skip=on_skip))
+        # Labels were only parsed for the relevant family
+        assert labels.call_count == 1
+
+    assert [m.name for m in metrics] == ['kept']
+    assert metrics[0].samples == [('kept', {'a': 'b'}, 1.0)]
+    family_filter.assert_has_calls(
+        [mock.call('kept', 'gauge'), mock.call('skipped', 'histogram'), mock.call('untyped_skipped', 'untyped')]
+    )
+    on_skip.assert_has_calls([mock.call('skipped', 'histogram', 4), mock.call('untyped_skipped', 'untyped', 1)])
@@ -329,6 +329,27 @@ def test_process_metric_filtered(mocked_prometheus_check):
     check.gauge.assert_not_called()
 
 
+def test_process_replay_unchanged_payloads(bin_data, mocked_prometheus_check):
+    """ Unchanged payloads are not parsed again, the submissions of the last run are replayed instead """
+    endpoint = "http://fake.endpoint:10055/metrics"
+    check = mocked_prometheus_check
+    check.replay_unchanged_payloads = True
+    mock_response = mock.MagicMock(
+        status_code=200,
+        iter_content=lambda **kwargs: [bin_data[:100], bin_data[100:]],
+        headers={'Content-Type': protobuf_content_type},
+    )
+
+    with mock.patch('requests.get', return_value=mock_response, __name__="get"):
+        with mock.patch.object(check, 'parse_metric_family', wraps=check.parse_metric_family) as parse:
+            check.process(endpoint)
+            check.process(endpoint)
+
+    assert parse.call_count == 1
+    assert check.gauge.call_count == 2
+    assert check.gauge.call_args_list[0] == check.gauge.call_args_list[1]
+
+
 def test_poll_protobuf(mocked_prometheus_check, bin_data):
     """ Tests poll using the protobuf format """
     check = mocked_prometheus_check
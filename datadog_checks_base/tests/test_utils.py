@@ -4,14 +4,20 @@
 # All rights reserved
 # Licensed under a 3-clause BSD style license (see LICENSE)
 
+import socket
 from decimal import ROUND_HALF_DOWN
 
+import mock
 import pytest
 from six import PY3
 
 from datadog_checks.base.utils.common import ensure_bytes, ensure_unicode, pattern_filter, round_value
 from datadog_checks.base.utils.containers import iter_unique
+from datadog_checks.base.utils.json_stream import iter_json_array
 from datadog_checks.base.utils.limiter import Limiter
+from datadog_checks.base.utils.lru import LRUCache
+from datadog_checks.base.utils.replay import SPOOL_MAX_SIZE, PayloadReplayCache, SubmissionRecorder
+from datadog_checks.base.utils.resolver import clear_cache, gethostbyname
 
 
 class Item:
@@ -22,6 +28,14 @@ class Item:
         return self.name == other.name
 
 
+class Submitter:
+    def __init__(self):
+        self.submissions = []
+
+    def __getattr__(self, method_name):
+        return lambda *args, **kwargs: self.submissions.append((method_name, args, kwargs))
+
+
 class TestPatternFilter:
     def test_no_items(self):
         items = []
@@ -117,6 +131,79 @@ class TestLimiter:
         assert limiter.get_status() == (1, 10, False)
 
 
+class TestLRUCache:
+    def test_eviction(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        # Mark `a` as the most recently used entry
+        assert cache.get('a') == 1
+        cache.set('c', 3)
+
+        assert 'b' not in cache
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
+        assert len(cache) == 2
+
+    def test_get_or_compute(self):
+        cache = LRUCache(10)
+        calls = []
+
+        def compute(key):
+            calls.append(key)
+            return None
+
+        # Cached `None` values are not computed again
+        assert cache.get_or_compute('a', compute) is None
+        assert cache.get_or_compute('a', compute) is None
+        assert calls == ['a']
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_invalid_size(self):
+        with pytest.raises(ValueError):
+            LRUCache(0)
+
+
+def chunked(document, size):
+    data = document.encode('utf-8')
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+class TestJsonStream:
+    DOCUMENT = (
+        u'{"meta": {"count": [1, 2]}, '
+        u'"apps": {"app": [{"id": "a\u00e9", "vcores": 12}, {"id": "b", "memory": 1.5e3}]}}'
+    )
+
+    @pytest.mark.parametrize('size', [1, 3, 7, 1000])
+    def test_chunks(self, size):
+        assert list(iter_json_array(chunked(self.DOCUMENT, size), ('apps', 'app'))) == [
+            {'id': u'a\u00e9', 'vcores': 12},
+            {'id': 'b', 'memory': 1500.0},
+        ]
+
+    def test_numbers_across_chunks(self):
+        assert list(iter_json_array([b'[12', b'34, 5', b'6]'])) == [1234, 56]
+        assert list(iter_json_array([b'[1.', b'5]'])) == [1.5]
+        assert list(iter_json_array([b'[2e', b'3, 2.5E', b'+3, -', b'1]'])) == [2000.0, 2500.0, -1]
+        assert list(iter_json_array([b'{"a": 1.', b'5, "apps": [-2', b'E-1]}'], ('apps',))) == [-0.2]
+        assert list(iter_json_array([b' [ ] '])) == []
+
+    @pytest.mark.parametrize(
+        'document', ['{"apps": null}', '{"apps": {}}', '{}', '{"other": [1], "apps": {"app": null}}', 'null']
+    )
+    def test_no_array(self, document):
+        assert list(iter_json_array(chunked(document, 4), ('apps', 'app'))) == []
+
+    def test_stops_at_the_end_of_the_array(self):
+        assert list(iter_json_array([b'{"apps": {"app": [1, 2]', b'}, "invalid'], ('apps', 'app'))) == [1, 2]
+
+    @pytest.mark.parametrize('document', ['{"apps": {"app": [1, 2', '{"apps": {"app": [1 2]}}', '{"apps" {}}'])
+    def test_invalid(self, document):
+        with pytest.raises(ValueError):
+            list(iter_json_array(chunked(document, 4), ('apps', 'app')))
+
+
 class TestRounding:
     def test_round_half_up(self):
         assert round_value(3.5) == 4.0
@@ -162,3 +249,93 @@ class TestBytesUnicode:
     def test_ensure_unicode(self):
         assert ensure_unicode('éâû') == u'éâû'
         assert ensure_unicode(u'éâû') == u'éâû'
+
+
+class TestSubmissionRecorder:
+    def test_replay(self):
+        submitter = Submitter()
+        recorder = SubmissionRecorder(submitter)
+        tags = ['foo:bar']
+
+        recorder.start()
+        submitter.gauge('metric', 1, tags=tags)
+        submitter.service_check('check', 0, tags)
+        tags.append('baz:qux')
+        recorder.stop()
+
+        assert recorder.replayable is True
+        assert 'gauge' not in submitter.__dict__
+        submitter.submissions = []
+        recorder.replay()
+        assert submitter.submissions == [
+            ('gauge', ('metric', 1), {'tags': ['foo:bar']}),
+            ('service_check', ('check', 0, ['foo:bar']), {}),
+        ]
+
+    def test_unreplayable_submissions(self):
+        submitter = Submitter()
+        recorder = SubmissionRecorder(submitter, ignored_prefix='telemetry.')
+
+        recorder.start()
+        submitter.count('telemetry.input', 1)
+        assert recorder.replayable is True
+        submitter.count('metric', 1)
+        recorder.stop()
+
+        assert recorder.replayable is False
+        assert submitter.submissions == [('count', ('telemetry.input', 1), {}), ('count', ('metric', 1), {})]
+
+
+class TestPayloadReplayCache:
+    def test_read(self):
+        body = b'foo 1\n' * (SPOOL_MAX_SIZE // 3)
+        cache = PayloadReplayCache()
+        submitter = Submitter()
+
+        for expected_unchanged in (False, True):
+            response = mock.MagicMock(
+                status_code=200, encoding='utf-8', headers={}, iter_content=lambda **kwargs: [body[:100], body[100:]]
+            )
+            unchanged, spooled = cache.read(response)
+            cache.start_recording(submitter)
+            cache.commit()
+
+            assert unchanged is expected_unchanged
+            response.close.assert_called_once_with()
+            # The body larger than the spooling threshold is streamed back whole
+            assert b''.join(spooled.iter_content(chunk_size=4096)) == body
+            spooled.close()
+
+
+class TestResolver:
+    def setup_method(self):
+        clear_cache()
+
+    def test_gethostbyname(self):
+        with mock.patch('socket.gethostbyname', return_value='10.0.0.1') as resolve:
+            assert gethostbyname('foo') == '10.0.0.1'
+            assert gethostbyname('foo') == '10.0.0.1'
+            assert resolve.call_count == 2
+
+            assert gethostbyname('foo', ttl=60) == '10.0.0.1'
+            assert resolve.call_count == 2
+
+            resolve.return_value = '10.0.0.2'
+            assert gethostbyname('foo', ttl=0) == '10.0.0.2'
+            assert resolve.call_count == 3
+
+    def test_negative_caching(self):
+        with mock.patch(
+            'socket.gethostbyname', side_effect=socket.gaierror(-2, 'Name or service not known')
+        ) as resolve:
+            with pytest.raises(socket.gaierror):
+                gethostbyname('foo', ttl=60, negative_ttl=60)
+            with pytest.raises(socket.gaierror):
+                gethostbyname('foo', ttl=60, negative_ttl=60)
+            assert resolve.call_count == 1
+
+            resolve.side_effect = None
+            resolve.return_value = '10.0.0.1'
+            assert gethostbyname('foo', ttl=60) == '10.0.0.1'
+            assert gethostbyname('foo', ttl=60) == '10.0.0.1'
+            assert resolve.call_count == 2
@@ -1,7 +1,10 @@
 # (C) Datadog, Inc. 2018
 # All rights reserved
 # Licensed under a 3-clause BSD style license (see LICENSE)
+from collections import namedtuple
 from fnmatch import fnmatch
+from itertools import chain
+from math import ceil
 from os.path import abspath, exists, join, relpath
 from re import compile as re_compile
 from time import time
@@ -10,7 +13,14 @@ from datadog_checks.checks import AgentCheck
 from datadog_checks.config import is_affirmative
 from datadog_checks.errors import ConfigurationError
 
-from .traverse import walk
+from .traverse import WalkCache, cached_walk, walk
+
+# Files of a directory matching the pattern: their number, total size and the sorted lists of their sizes,
+# modification and creation times
+FileSummary = namedtuple('FileSummary', 'files bytes sizes mtimes ctimes')
+
+# Percentiles of the summary points submitted for the distributions aggregated by the check
+SUMMARY_PERCENTILES = (('median', 0.5), ('95percentile', 0.95))
 
 
 class DirectoryCheck(AgentCheck):
@@ -31,10 +41,21 @@ class DirectoryCheck(AgentCheck):
                       Useful for very large directories. default False
         `ignore_missing` - boolean, when true do not raise an exception on missing/inaccessible directories.
                            default False
+        `incremental` - boolean, when true only the directories whose mtime changed since the last run are read
+                        again, and the file distributions are aggregated by the check. default False
     """
 
     SOURCE_TYPE_NAME = 'system'
 
+    def __init__(self, name, init_config, agentConfig, instances=None):
+        super(DirectoryCheck, self).__init__(name, init_config, agentConfig, instances)
+
+        # Entries of the directories read during the last run, indexed by directory, pattern and
+        # whether the files are only counted, for incremental walks
+        self._walk_caches = {}
+        # Summaries of the directories aggregated during the last run and their merge, indexed the same way
+        self._merged_summaries = {}
+
     def check(self, instance):
         try:
             directory = instance['directory']
@@ -53,6 +74,7 @@ class DirectoryCheck(AgentCheck):
         filegauges = is_affirmative(instance.get('filegauges', False))
         countonly = is_affirmative(instance.get('countonly', False))
         ignore_missing = is_affirmative(instance.get('ignore_missing', False))
+        incremental = is_affirmative(instance.get('incremental', False))
         custom_tags = instance.get('tags', [])
 
         if not exists(abs_directory):
@@ -78,6 +100,7 @@ class DirectoryCheck(AgentCheck):
             recursive,
             countonly,
             custom_tags,
+            incremental,
         )
 
     def _get_stats(
@@ -93,37 +116,56 @@ class DirectoryCheck(AgentCheck):
         recursive,
         countonly,
         tags,
+        incremental=False,
     ):
         dirtags = ['{}:{}'.format(dirtagname, name)]
         dirtags.extend(tags)
         directory_bytes = 0
         directory_files = 0
 
+        # The per-file gauges need the files of every directory, otherwise the incremental
+        # mode aggregates the summaries of the directories cached with their entries
+        summarize = incremental and not filegauges
+        summaries = []
+
+        if incremental:
+            cache_key = (directory, pattern, countonly)
+            walk_cache = self._walk_caches.get(cache_key)
+            if walk_cache is None:
+                walk_cache = self._walk_caches[cache_key] = WalkCache()
+            walker = cached_walk(directory, walk_cache)
+        else:
+            walker = walk(directory)
+
         # If we do not want to recursively search sub-directories only get the root.
-        walker = walk(directory) if recursive else (next(walk(directory)),)
+        if not recursive:
+            walker = (next(walker),)
 
         # Avoid repeated global lookups.
         get_length = len
 
         for root, dirs, files in walker:
-            directory_files += get_length(files)
-
             if exclude_dirs_pattern is not None:
                 if dirs_patterns_full:
                     dirs[:] = [d for d in dirs if not exclude_dirs_pattern.search(d.path)]
                 else:
                     dirs[:] = [d for d in dirs if not exclude_dirs_pattern.search(d.name)]
 
+            if summarize:
+                # Only the directories read again are summarized again
+                summary = walk_cache.get_summary(root)
+                if summary is None:
+                    summary = self._summarize_files(directory, root, files, pattern, countonly)
+                    walk_cache.set_summary(root, summary)
+                summaries.append(summary)
+                continue
+
+            directory_files += get_length(files)
+
             for file_entry in files:
-                if pattern:
-                    # Check if the path of the file relative to the directory
-                    # matches the pattern. Also check if the absolute path of the
-                    # filename matches the pattern, for compatibility with previous
-                    # agent versions.
-                    filename = join(root, file_entry.name)
-                    if not (fnmatch(filename, pattern) or fnmatch(relpath(filename, directory), pattern)):
-                        directory_files -= 1
-                        continue
+                if pattern and not _matches(directory, root, file_entry, pattern):
+                    directory_files -= 1
+                    continue
 
                 # We're just looking to count the files.
                 if countonly:
@@ -156,9 +198,106 @@ class DirectoryCheck(AgentCheck):
                             'system.disk.directory.file.created_sec_ago', time() - file_stat.st_ctime, tags=dirtags
                         )
 
+        if summarize:
+            summary = self._merge_summaries(cache_key, summaries)
+            directory_files = summary.files
+            directory_bytes = summary.bytes
+            if summary.sizes:
+                now = time()
+                self._submit_summary('system.disk.directory.file.bytes', summary.sizes, summary.bytes, dirtags)
+                self._submit_summary(
+                    'system.disk.directory.file.modified_sec_ago', summary.mtimes, sum(summary.mtimes), dirtags, now
+                )
+                self._submit_summary(
+                    'system.disk.directory.file.created_sec_ago', summary.ctimes, sum(summary.ctimes), dirtags, now
+                )
+
         # number of files
         self.gauge('system.disk.directory.files', directory_files, tags=dirtags)
 
         # total file size
         if not countonly:
             self.gauge('system.disk.directory.bytes', directory_bytes, tags=dirtags)
+
+    def _summarize_files(self, directory, root, files, pattern, countonly):
+        files_matched = 0
+        sizes = []
+        mtimes = []
+        ctimes = []
+
+        for file_entry in files:
+            if pattern and not _matches(directory, root, file_entry, pattern):
+                continue
+
+            files_matched += 1
+            if countonly:
+                continue
+
+            try:
+                file_stat = file_entry.stat()
+            except OSError as ose:
+                self.warning('DirectoryCheck: could not stat file {} - {}'.format(join(root, file_entry.name), ose))
+            else:
+                sizes.append(file_stat.st_size)
+                mtimes.append(file_stat.st_mtime)
+                ctimes.append(file_stat.st_ctime)
+
+        sizes.sort()
+        mtimes.sort()
+        ctimes.sort()
+        return FileSummary(files_matched, sum(sizes), sizes, mtimes, ctimes)
+
+    def _merge_summaries(self, cache_key, summaries):
+        """
+        Merges the summaries of the directories, reusing the last merge when none of them changed
+        """
+        merged = self._merged_summaries.get(cache_key)
+        if (
+            merged is not None
+            and len(merged[0]) == len(summaries)
+            and all(previous is summary for previous, summary in zip(merged[0], summaries))
+        ):
+            return merged[1]
+
+        # The lists are sorted: sorting their concatenation only merges their runs
+        summary = FileSummary(
+            sum(summary.files for summary in summaries),
+            sum(summary.bytes for summary in summaries),
+            sorted(chain.from_iterable(summary.sizes for summary in summaries)),
+            sorted(chain.from_iterable(summary.mtimes for summary in summaries)),
+            sorted(chain.from_iterable(summary.ctimes for summary in summaries)),
+        )
+        self._merged_summaries[cache_key] = (summaries, summary)
+        return summary
+
+    def _submit_summary(self, name, values, total, tags, now=None):
+        """
+        Submits the summary points of a distribution given its sorted values. When `now` is set, the values
+        are timestamps and the distribution of their ages is submitted instead.
+
+        The points are named apart from the aggregates of the histograms submitted by the other modes.
+        """
+        count = len(values)
+
+        def value_at(rank):
+            if now is None:
+                return values[rank]
+            # The ages are sorted the other way around
+            return now - values[count - 1 - rank]
+
+        self.gauge('{}.summary.count'.format(name), count, tags=tags)
+        self.gauge('{}.summary.min'.format(name), value_at(0), tags=tags)
+        self.gauge('{}.summary.max'.format(name), value_at(count - 1), tags=tags)
+        avg = total / float(count)
+        self.gauge('{}.summary.avg'.format(name), avg if now is None else now - avg, tags=tags)
+        for suffix, percentile in SUMMARY_PERCENTILES:
+            self.gauge('{}.summary.{}'.format(name, suffix), value_at(int(ceil(percentile * count)) - 1), tags=tags)
+
+
+def _matches(directory, root, file_entry, pattern):
+    # Check if the path of the file relative to the directory
+    # matches the pattern. Also check if the absolute path of the
+    # filename matches the pattern, for compatibility with previous
+    # agent versions.
+    filename = join(root, file_entry.name)
+    return fnmatch(filename, pattern) or fnmatch(relpath(filename, directory), pattern)
@@ -3,15 +3,24 @@
 # Licensed under a 3-clause BSD style license (see LICENSE)
 import platform
 import sys
+from collections import namedtuple
+from os import stat
+from os.path import join
+from time import time
 
 import six
 from scandir import scandir
 
+# Maximum number of files and directories whose entries are kept by a WalkCache
+DEFAULT_MAX_CACHED_ENTRIES = 100000
 
-def _walk(top):
-    """Modified version of https://docs.python.org/3/library/os.html#os.scandir
-    that returns https://docs.python.org/3/library/os.html#os.DirEntry for files
-    directly to take advantage of possible cached os.stat calls.
+# The fields of the `stat()` results of the files read by the check
+StatResult = namedtuple('StatResult', 'st_size st_mtime st_ctime')
+
+
+def _scan(top):
+    """Returns the lists of https://docs.python.org/3/library/os.html#os.DirEntry
+    of the directories and of the other files in `top`, or None if it can't be read.
     """
     dirs = []
     nondirs = []
@@ -19,7 +28,7 @@ def _walk(top):
     try:
         scandir_iter = scandir(top)
     except OSError:
-        return
+        return None
 
     # Avoid repeated global lookups.
     get_next = next
@@ -30,7 +39,7 @@ def _walk(top):
         except StopIteration:
             break
         except OSError:
-            return
+            return None
 
         try:
             is_dir = entry.is_dir()
@@ -42,6 +51,19 @@ def _walk(top):
         else:
             nondirs.append(entry)
 
+    return dirs, nondirs
+
+
+def _walk(top):
+    """Modified version of https://docs.python.org/3/library/os.html#os.scandir
+    that returns https://docs.python.org/3/library/os.html#os.DirEntry for files
+    directly to take advantage of possible cached os.stat calls.
+    """
+    entries = _scan(top)
+    if entries is None:
+        return
+
+    dirs, nondirs = entries
     yield top, dirs, nondirs
 
     for dir_entry in dirs:
@@ -49,8 +71,132 @@ def _walk(top):
             yield entry
 
 
+class CachedDirEntry(object):
+    """Replaces an os.DirEntry in a WalkCache, keeping only the fields read by the check.
+    The file is stat'ed on the first call to `stat()`, whose result is then reused.
+    """
+
+    __slots__ = ('_top', 'name', '_stat')
+
+    def __init__(self, top, name):
+        self._top = top
+        self.name = name
+        self._stat = None
+
+    @property
+    def path(self):
+        return join(self._top, self.name)
+
+    def stat(self):
+        if self._stat is None:
+            file_stat = stat(self.path)
+            self._stat = StatResult(file_stat.st_size, file_stat.st_mtime, file_stat.st_ctime)
+        return self._stat
+
+
+class WalkCache(object):
+    """Entries of the directories read by `cached_walk`, indexed by directory. At most `max_entries`
+    files and directories are kept: the directories that don't fit are read again at every walk.
+
+    A summary of the files of each cached directory can be kept along with its entries,
+    it is dropped as soon as the directory is read again.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_CACHED_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = 0
+        self._dirs = {}
+        self._summaries = {}
+
+    def __iter__(self):
+        return iter(self._dirs)
+
+    def get(self, top):
+        return self._dirs.get(top)
+
+    def set(self, top, mtime, dirs, nondirs):
+        """Caches the entries of `top`, returns the cached ones or None if they don't fit"""
+        self.pop(top)
+        if self.entries + len(dirs) + len(nondirs) > self.max_entries:
+            return None
+
+        cached = (
+            mtime,
+            [CachedDirEntry(top, entry.name) for entry in dirs],
+            [CachedDirEntry(top, entry.name) for entry in nondirs],
+        )
+        self._dirs[top] = cached
+        self.entries += len(dirs) + len(nondirs)
+        return cached
+
+    def pop(self, top):
+        self._summaries.pop(top, None)
+        cached = self._dirs.pop(top, None)
+        if cached is not None:
+            self.entries -= len(cached[1]) + len(cached[2])
+
+    def get_summary(self, top):
+        return self._summaries.get(top)
+
+    def set_summary(self, top, summary):
+        """Keeps the summary of the files of `top`, as long as its entries are cached"""
+        if top in self._dirs:
+            self._summaries[top] = summary
+
+
+def _cached_walk_dir(top, cache, walked):
+    walked.add(top)
+
+    try:
+        mtime = stat(top).st_mtime
+    except OSError:
+        return
+
+    cached = cache.get(top)
+    if cached is not None and cached[0] == mtime:
+        dirs, nondirs = cached[1], cached[2]
+    else:
+        entries = _scan(top)
+        if entries is None:
+            return
+
+        dirs, nondirs = entries
+        # The mtime resolution of some file systems is the second: a directory modified in the
+        # same second as it was read might change again without its mtime changing, read it again.
+        cached = cache.set(top, mtime if time() - mtime > 1 else None, dirs, nondirs)
+        if cached is not None:
+            dirs, nondirs = cached[1], cached[2]
+
+    # The caller may prune the directories to walk
+    dirs = list(dirs)
+    yield top, dirs, nondirs
+
+    for dir_entry in dirs:
+        for entry in _cached_walk_dir(dir_entry.path, cache, walked):
+            yield entry
+
+
+def _cached_walk(top, cache):
+    """Same as `walk`, except that the directories whose mtime didn't change since
+    the last walk are not read again: their entries are taken from `cache`, a
+    WalkCache updated in place. Since the cached entries keep their `stat()`
+    results, the files of these directories are not stat'ed again either.
+
+    The mtime of a directory only changes when entries are added, removed or
+    renamed, so the size and times of files modified in place are not refreshed.
+    """
+    walked = set()
+    for entry in _cached_walk_dir(top, cache, walked):
+        yield entry
+
+    # Forget about the directories that don't exist anymore
+    for path in set(cache) - walked:
+        cache.pop(path)
+
+
 if six.PY3 or platform.system() != 'Windows':
     walk = _walk
+    cached_walk = _cached_walk
 else:
     # Fix for broken unicode handling on Windows on Python 2.x, see:
     # https://github.com/benhoyt/scandir/issues/54
@@ -60,3 +206,8 @@ else:
         if isinstance(top, bytes):
             top = top.decode(file_system_encoding)
         return _walk(top)
+
+    def cached_walk(top, cache):
+        if isinstance(top, bytes):
+            top = top.decode(file_system_encoding)
+        return _cached_walk(top, cache)
@@ -10,7 +10,8 @@ import pytest
 
 from datadog_checks.dev.utils import create_file
 from datadog_checks.dev.utils import temp_dir as temp_directory
-from datadog_checks.directory import DirectoryCheck
+from datadog_checks.directory import DirectoryCheck, traverse
+from datadog_checks.directory.traverse import CachedDirEntry, WalkCache, cached_walk
 from datadog_checks.errors import ConfigurationError
 
 from . import common
@@ -137,6 +138,110 @@ def test_file_metrics(aggregator):
         assert aggregator.metrics_asserted_pct == 100.0
 
 
+def test_incremental_walk():
+    with temp_directory() as td:
+        for path in ('a/file_1', 'a/file_2', 'b/file_3'):
+            create_file(os.path.join(td, path))
+        past = os.stat(td).st_mtime - 10
+        for path in ('', 'a', 'b'):
+            os.utime(os.path.join(td, path), (past, past))
+
+        cache = WalkCache()
+        with mock.patch('datadog_checks.directory.traverse.scandir', wraps=traverse.scandir) as scandir:
+            first = sorted((root, sorted(f.name for f in files)) for root, _, files in cached_walk(td, cache))
+            assert scandir.call_count == 3
+
+            # Nothing changed, no directory is read again
+            second = sorted((root, sorted(f.name for f in files)) for root, _, files in cached_walk(td, cache))
+            assert scandir.call_count == 3
+            assert first == second
+
+            # Only the modified directory is read again, the removed one is forgotten
+            create_file(os.path.join(td, 'a', 'file_4'))
+            os.utime(os.path.join(td, 'a'), (past + 1, past + 1))
+            shutil.rmtree(os.path.join(td, 'b'))
+            os.utime(td, (past + 1, past + 1))
+            third = sorted((root, sorted(f.name for f in files)) for root, _, files in cached_walk(td, cache))
+            assert scandir.call_count == 5
+
+        assert third == [(td, []), (os.path.join(td, 'a'), ['file_1', 'file_2', 'file_4'])]
+        assert sorted(cache) == [td, os.path.join(td, 'a')]
+        assert cache.entries == 4
+
+
+def test_incremental_walk_cache_bound():
+    with temp_directory() as td:
+        for path in ('a/file_1', 'a/file_2', 'b/file_3'):
+            create_file(os.path.join(td, path))
+        past = os.stat(td).st_mtime - 10
+        for path in ('', 'a', 'b'):
+            os.utime(os.path.join(td, path), (past, past))
+
+        cache = WalkCache(max_entries=3)
+        walked = sorted((root, sorted(f.name for f in files)) for root, _, files in cached_walk(td, cache))
+
+        # The entries of `a` don't fit next to those of the top directory and `b`
+        assert walked == [(td, []), (os.path.join(td, 'a'), ['file_1', 'file_2']), (os.path.join(td, 'b'), ['file_3'])]
+        assert sorted(cache) == [td, os.path.join(td, 'b')]
+        assert cache.entries == 3
+        _, dirs, files = cache.get(os.path.join(td, 'b'))
+        assert dirs == []
+        assert isinstance(files[0], CachedDirEntry)
+        assert files[0].path == os.path.join(td, 'b', 'file_3')
+        assert files[0].stat().st_size == 0
+
+
+def test_incremental_check(aggregator):
+    check = DirectoryCheck('directory', {}, {})
+    with temp_directory() as td:
+        for i, size in enumerate((1, 2, 3, 10)):
+            with open(os.path.join(td, 'file_{}'.format(i)), 'w') as f:
+                f.write('x' * size)
+
+        check.check({'directory': td, 'incremental': True, 'tags': ['optional:tag1']})
+
+    # The distributions are aggregated by the check into a fixed number of points
+    dir_tags = ['name:{}'.format(td), 'optional:tag1']
+    for suffix, value in (('count', 4), ('min', 1), ('max', 10), ('avg', 4), ('median', 2), ('95percentile', 10)):
+        aggregator.assert_metric('system.disk.directory.file.bytes.summary.{}'.format(suffix), value=value, count=1)
+    for mname in ('modified_sec_ago', 'created_sec_ago'):
+        aggregator.assert_metric('system.disk.directory.file.{}.summary.count'.format(mname), value=4, count=1)
+        for suffix in ('min', 'max', 'avg', 'median', '95percentile'):
+            aggregator.assert_metric(
+                'system.disk.directory.file.{}.summary.{}'.format(mname, suffix), tags=dir_tags, count=1
+            )
+    aggregator.assert_metric('system.disk.directory.files', value=4, tags=dir_tags, count=1)
+    aggregator.assert_metric('system.disk.directory.bytes', value=16, tags=dir_tags, count=1)
+    aggregator.assert_all_metrics_covered()
+
+
+def test_incremental_check_summaries():
+    check = DirectoryCheck('directory', {}, {})
+    instance = {'directory': None, 'incremental': True, 'recursive': True, 'pattern': '*.log'}
+    with temp_directory() as td:
+        instance['directory'] = td
+        for path in ('a/file_1.log', 'a/file_2.txt', 'b/file_3.log'):
+            create_file(os.path.join(td, path))
+        past = os.stat(td).st_mtime - 10
+        for path in ('', 'a', 'b'):
+            os.utime(os.path.join(td, path), (past, past))
+
+        with mock.patch.object(check, '_summarize_files', wraps=check._summarize_files) as summarize_files:
+            check.check(instance)
+            assert summarize_files.call_count == 3
+            walk_cache = check._walk_caches[(td, '*.log', False)]
+            assert walk_cache.get_summary(os.path.join(td, 'a')).files == 1
+
+            # Only the modified directory is summarized again
+            check.check(instance)
+            assert summarize_files.call_count == 3
+            create_file(os.path.join(td, 'b', 'file_4.log'))
+            os.utime(os.path.join(td, 'b'), (past + 1, past + 1))
+            check.check(instance)
+            assert summarize_files.call_count == 4
+            assert walk_cache.get_summary(os.path.join(td, 'b')).files == 2
+
+
 def test_non_existent_directory():
     """
     Missing or inaccessible directory coverage.
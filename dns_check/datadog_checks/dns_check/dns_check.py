@@ -33,6 +33,8 @@ class BadConfException(Exception):
 class DNSCheck(NetworkCheck):
     SERVICE_CHECK_NAME = 'dns.can_resolve'
     DEFAULT_TIMEOUT = 5
+    # Number of seconds a resolver is reused for, before reading the configuration of the system again
+    RESOLVER_TTL = 300
 
     def __init__(self, name, init_config, agentConfig, instances=None):
         # Now that the DNS check is a Network check, we must provide a `name` for each
@@ -48,24 +50,20 @@ class DNSCheck(NetworkCheck):
 
         self.default_timeout = init_config.get('default_timeout', self.DEFAULT_TIMEOUT)
 
+        # {(nameserver, nameserver_port, timeout): (creation time, resolver)},
+        # creating a resolver reads the configuration of the system
+        self._resolvers = {}
+
     def _load_conf(self, instance):
         # Fetches the conf
         hostname = instance.get('hostname')
         if not hostname:
             raise BadConfException('A valid "hostname" must be specified')
 
-        resolver = dns.resolver.Resolver()
-
-        # If a specific DNS server was defined use it, else use the system default
         nameserver = instance.get('nameserver')
         nameserver_port = instance.get('nameserver_port')
-        if nameserver is not None:
-            resolver.nameservers = [nameserver]
-        if nameserver_port is not None:
-            resolver.port = nameserver_port
-
         timeout = float(instance.get('timeout', self.default_timeout))
-        resolver.lifetime = timeout
+        resolver = self._get_resolver(nameserver, nameserver_port, timeout)
         record_type = instance.get('record_type', 'A')
         resolves_as = instance.get('resolves_as', None)
         if resolves_as and record_type not in ['A', 'CNAME', 'MX']:
@@ -73,6 +71,24 @@ class DNSCheck(NetworkCheck):
 
         return hostname, timeout, nameserver, record_type, resolver, resolves_as
 
+    def _get_resolver(self, nameserver=None, nameserver_port=None, timeout=None):
+        key = (nameserver, nameserver_port, timeout)
+        now = time.time()
+        created, resolver = self._resolvers.get(key, (None, None))
+        if resolver is None or now - created >= self.RESOLVER_TTL:
+            resolver = dns.resolver.Resolver()
+            self._resolvers[key] = (now, resolver)
+
+            # If a specific DNS server was defined use it, else use the system default
+            if nameserver is not None:
+                resolver.nameservers = [nameserver]
+            if nameserver_port is not None:
+                resolver.port = nameserver_port
+            if timeout is not None:
+                resolver.lifetime = timeout
+
+        return resolver
+
     def _check(self, instance):
         hostname, timeout, nameserver, record_type, resolver, resolves_as = self._load_conf(instance)
 
@@ -136,7 +152,7 @@ class DNSCheck(NetworkCheck):
         tags = []
 
         try:
-            nameserver = instance.get('nameserver') or dns.resolver.Resolver().nameservers[0]
+            nameserver = instance.get('nameserver') or self._get_resolver().nameservers[0]
         except IndexError:
             self.log.error('No DNS server was found on this host.')
 
@@ -125,3 +125,25 @@ def test_invalid_config(aggregator):
 
         # Assert coverage for this check on this instance
         aggregator.assert_all_metrics_covered()
+
+
+@mock.patch.object(Resolver, 'query', side_effect=success_query_mock)
+def test_resolver_reuse(mocked_query, aggregator):
+    integration = DNSCheck('dns_check', {}, {})
+    instance = common.CONFIG_SUCCESS['instances'][0]
+
+    with mock.patch('datadog_checks.dns_check.dns_check.time') as mocked_time:
+        mocked_time.time.return_value = 1000
+        integration.check(instance)
+        resolver = integration._get_resolver(instance.get('nameserver'), None, float(instance.get('timeout', 5)))
+        integration.check(instance)
+
+        # The same resolver is used by the following runs
+        assert integration._load_conf(instance)[4] is resolver
+        assert len(integration._resolvers) == 1
+
+        # It's created again once expired, to take changes of the system configuration into account
+        mocked_time.time.return_value = 1000 + DNSCheck.RESOLVER_TTL
+        assert integration._load_conf(instance)[4] is not resolver
+
+    aggregator.assert_service_check(DNSCheck.SERVICE_CHECK_NAME, status=DNSCheck.OK, count=2)
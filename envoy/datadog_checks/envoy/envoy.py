@@ -5,11 +5,18 @@ import re
 from collections import defaultdict
 
 import requests
+from six import PY3
 
+from datadog_checks.base.utils.lru import LRUCache
 from datadog_checks.checks import AgentCheck
 
 from .errors import UnknownMetric, UnknownTags
-from .parser import parse_histogram, parse_metric
+from .parser import parse_histogram, parse_json_histogram, parse_metric
+
+DEFAULT_PARSE_CACHE_SIZE = 100000
+
+# Size of the chunks the `/stats` payload is streamed by
+STREAM_CHUNK_SIZE = 64 * 1024
 
 
 class Envoy(AgentCheck):
@@ -23,10 +30,9 @@ class Envoy(AgentCheck):
         self.whitelist = None
         self.blacklist = None
 
-        # The memory implications here are unclear to me. We may want a bloom filter
-        # or a data structure that expires elements based on inactivity.
-        self.whitelisted_metrics = set()
-        self.blacklisted_metrics = set()
+        # Raw stat name -> result of its filtering and parsing, see `get_parsed_metric`.
+        # Bounded as stat names embed dynamic parts, e.g. cluster names.
+        self.parsed_metrics = None
 
         self.caching_metrics = None
 
@@ -51,9 +57,11 @@ class Envoy(AgentCheck):
 
         if self.caching_metrics is None:
             self.caching_metrics = instance.get('cache_metrics', True)
+            if self.caching_metrics:
+                self.parsed_metrics = LRUCache(int(instance.get('parse_cache_size', DEFAULT_PARSE_CACHE_SIZE)))
 
         try:
-            response = self.http.get(stats_url)
+            response = self.http.get(stats_url, stream=True)
         except requests.exceptions.Timeout:
             msg = 'Envoy endpoint `{}` timed out after {} seconds'.format(
                 stats_url, timeout=self.http.options['timeout']
@@ -67,74 +75,120 @@ class Envoy(AgentCheck):
             self.log.exception(msg)
             return
 
-        if response.status_code != 200:
-            msg = 'Envoy endpoint `{}` responded with HTTP status code {}'.format(stats_url, response.status_code)
-            self.service_check(self.SERVICE_CHECK_NAME, AgentCheck.CRITICAL, message=msg, tags=custom_tags)
-            self.log.warning(msg)
-            return
+        with response:
+            if response.status_code != 200:
+                msg = 'Envoy endpoint `{}` responded with HTTP status code {}'.format(stats_url, response.status_code)
+                self.service_check(self.SERVICE_CHECK_NAME, AgentCheck.CRITICAL, message=msg, tags=custom_tags)
+                self.log.warning(msg)
+                return
 
-        # Avoid repeated global lookups.
-        get_method = getattr
+            if 'format=json' in stats_url:
+                self.process_json_stats(response.json(), custom_tags)
+            else:
+                self.process_text_stats(response.iter_lines(chunk_size=STREAM_CHUNK_SIZE), custom_tags)
 
-        for line in response.content.decode().splitlines():
+        self.service_check(self.SERVICE_CHECK_NAME, AgentCheck.OK, tags=custom_tags)
+
+    def process_text_stats(self, lines, custom_tags):
+        """
+        Processes the `<name>: <value>` lines of the text format, as raw bytes
+        """
+        for line in lines:
             try:
-                envoy_metric, value = line.split(': ')
+                envoy_metric, value = line.split(b': ')
             except ValueError:
                 continue
 
-            if not self.whitelisted_metric(envoy_metric):
+            parsed = self.get_parsed_metric(envoy_metric)
+            if parsed is None:
                 continue
+            metric, tags, method = parsed
 
+            tags = tags + custom_tags
             try:
-                metric, tags, method = parse_metric(envoy_metric)
-            except UnknownMetric:
-                if envoy_metric not in self.unknown_metrics:
-                    self.log.debug('Unknown metric `{}`'.format(envoy_metric))
-                self.unknown_metrics[envoy_metric] += 1
+                getattr(self, method)(metric, int(value), tags=tags)
+
+            # If the value isn't an integer assume it's pre-computed histogram data.
+            except (ValueError, TypeError):
+                for metric, value in parse_histogram(metric, value.decode('utf-8')):
+                    self.gauge(metric, value, tags=tags)
+
+    def process_json_stats(self, payload, custom_tags):
+        """
+        Processes the payload of the JSON format, i.e. `/stats?format=json`
+        """
+        for stat in payload.get('stats', []):
+            if 'histograms' in stat:
+                histograms = stat['histograms']
+                supported_quantiles = histograms.get('supported_quantiles', [])
+                for histogram in histograms.get('computed_quantiles', []):
+                    parsed = self.get_parsed_metric(histogram['name'])
+                    if parsed is None:
+                        continue
+                    metric, tags, _ = parsed
+
+                    tags = tags + custom_tags
+                    for metric, value in parse_json_histogram(metric, supported_quantiles, histogram['values']):
+                        self.gauge(metric, value, tags=tags)
                 continue
-            except UnknownTags as e:
-                unknown_tags = str(e).split('|||')
-                for tag in unknown_tags:
-                    if tag not in self.unknown_tags:
-                        self.log.debug('Unknown tag `{}` in metric `{}`'.format(tag, envoy_metric))
-                    self.unknown_tags[tag] += 1
+
+            parsed = self.get_parsed_metric(stat['name'])
+            if parsed is None:
                 continue
+            metric, tags, method = parsed
 
-            tags.extend(custom_tags)
+            getattr(self, method)(metric, stat['value'], tags=tags + custom_tags)
 
-            try:
-                value = int(value)
-                get_method(self, method)(metric, value, tags=tags)
+    def get_parsed_metric(self, envoy_metric):
+        """
+        Returns the (metric, tags, method) of a raw stat name, or None if it is filtered out or can't be parsed.
+        Results are cached, unknown metrics and tags are still counted every time they're seen.
+        """
+        if self.parsed_metrics is None:
+            parsed = self._parse_metric(envoy_metric)
+        else:
+            parsed = self.parsed_metrics.get_or_compute(envoy_metric, self._parse_metric)
 
-            # If the value isn't an integer assume it's pre-computed histogram data.
-            except (ValueError, TypeError):
-                for metric, value in parse_histogram(metric, value):
-                    self.gauge(metric, value, tags=tags)
+        if isinstance(parsed, UnknownMetric):
+            self.unknown_metrics[parsed.args[0]] += 1
+            return None
+        elif isinstance(parsed, UnknownTags):
+            for tag in parsed.args[0]:
+                self.unknown_tags[tag] += 1
+            return None
 
-        self.service_check(self.SERVICE_CHECK_NAME, AgentCheck.OK, tags=custom_tags)
+        return parsed
 
-    def whitelisted_metric(self, metric):
-        if self.caching_metrics:
-            if metric in self.whitelisted_metrics:
-                return True
-            elif metric in self.blacklisted_metrics:
-                return False
+    def _parse_metric(self, envoy_metric):
+        if PY3 and isinstance(envoy_metric, bytes):
+            envoy_metric = envoy_metric.decode('utf-8')
+
+        if not self.whitelisted_metric(envoy_metric):
+            return None
 
+        try:
+            metric, tags, method = parse_metric(envoy_metric)
+        except UnknownMetric:
+            if envoy_metric not in self.unknown_metrics:
+                self.log.debug('Unknown metric `{}`'.format(envoy_metric))
+            return UnknownMetric(envoy_metric)
+        except UnknownTags as e:
+            unknown_tags = str(e).split('|||')
+            for tag in unknown_tags:
+                if tag not in self.unknown_tags:
+                    self.log.debug('Unknown tag `{}` in metric `{}`'.format(tag, envoy_metric))
+            return UnknownTags(unknown_tags)
+
+        return metric, tags, method
+
+    def whitelisted_metric(self, metric):
         if self.whitelist:
             whitelisted = any(pattern.search(metric) for pattern in self.whitelist)
             if self.blacklist:
                 whitelisted = whitelisted and not any(pattern.search(metric) for pattern in self.blacklist)
 
-            if self.caching_metrics and whitelisted:
-                self.whitelisted_metrics.add(metric)
-
             return whitelisted
         elif self.blacklist:
-            blacklisted = any(pattern.search(metric) for pattern in self.blacklist)
-
-            if self.caching_metrics and blacklisted:
-                self.blacklisted_metrics.add(metric)
-
-            return not blacklisted
+            return not any(pattern.search(metric) for pattern in self.blacklist)
         else:
             return True
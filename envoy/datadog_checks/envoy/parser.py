@@ -116,3 +116,24 @@ def parse_histogram(metric, histogram):
             # In case Envoy adds more
             except KeyError:
                 yield '{}.{}percentile'.format(metric, percentile[1:].replace('.', '_')), value
+
+
+def parse_json_histogram(metric, supported_quantiles, values):
+    """Iterates over the computed quantiles of a histogram of the JSON format,
+    yielding metric-value pairs named like those of `parse_histogram`.
+
+    Example:
+        supported_quantiles: [0, 25, 50, 75, 90, 95, 99, 99.5, 99.9, 100]
+        values: [{'interval': None, 'cumulative': 1.0}, {'interval': None, 'cumulative': 1.025}, ...]
+    """
+    for quantile, value in zip(supported_quantiles, values):
+        # Like `nan` in the text format, there is no value when nothing was recorded during the interval
+        value = value.get('interval')
+        if value is None:
+            continue
+
+        percentile = 'P{:g}'.format(quantile)
+        try:
+            yield metric + PERCENTILE_SUFFIX[percentile], float(value)
+        except KeyError:
+            yield '{}.{}percentile'.format(metric, percentile[1:].replace('.', '_')), float(value)
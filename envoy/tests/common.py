@@ -1,3 +1,4 @@
+import json
 import os
 
 from datadog_checks.utils.common import get_docker_hostname
@@ -30,6 +31,18 @@ class MockResponse:
         self.content = content
         self.status_code = status_code
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    def iter_lines(self, chunk_size=512):
+        return iter(self.content.splitlines())
+
+    def json(self):
+        return json.loads(self.content.decode('utf-8'))
+
 
 @lru_cache(maxsize=None)
 def response(kind):
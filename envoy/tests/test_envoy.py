@@ -1,12 +1,14 @@
 # (C) Datadog, Inc. 2018
 # All rights reserved
 # Licensed under a 3-clause BSD style license (see LICENSE)
+import json
+
 import mock
 
 from datadog_checks.envoy import Envoy
 from datadog_checks.envoy.metrics import METRIC_PREFIX, METRICS
 
-from .common import INSTANCES, response
+from .common import HOST, INSTANCES, PORT, MockResponse, response
 
 CHECK_NAME = 'envoy'
 
@@ -90,3 +92,72 @@ def test_unknown():
         c.check(instance)
 
     assert sum(c.unknown_metrics.values()) == 5
+
+
+def test_json_stats(aggregator):
+    instance = {'stats_url': 'http://{}:{}/stats?format=json&usedonly'.format(HOST, PORT)}
+    c = Envoy(CHECK_NAME, {}, [instance])
+
+    with mock.patch('requests.get', return_value=response('json_stats')):
+        c.check(instance)
+    json_metrics = sorted(
+        (m.name, m.value, tuple(sorted(m.tags))) for name in aggregator.metric_names for m in aggregator.metrics(name)
+    )
+    aggregator.reset()
+
+    # The same stats in the text format
+    lines = []
+    for stat in json.loads(response('json_stats').content.decode('utf-8'))['stats']:
+        if 'histograms' in stat:
+            quantiles = stat['histograms']['supported_quantiles']
+            for histogram in stat['histograms']['computed_quantiles']:
+                values = ' '.join(
+                    'P{:g}({},{})'.format(q, 'nan' if v['interval'] is None else v['interval'], v['cumulative'])
+                    for q, v in zip(quantiles, histogram['values'])
+                )
+                lines.append('{}: {}'.format(histogram['name'], values))
+        else:
+            lines.append('{}: {}'.format(stat['name'], stat['value']))
+
+    instance = INSTANCES['main']
+    c = Envoy(CHECK_NAME, {}, [instance])
+    with mock.patch('requests.get', return_value=MockResponse('\n'.join(lines).encode('utf-8'), 200)):
+        c.check(instance)
+    text_metrics = sorted(
+        (m.name, m.value, tuple(sorted(m.tags))) for name in aggregator.metric_names for m in aggregator.metrics(name)
+    )
+
+    assert len(json_metrics) > 150
+    assert 'envoy.cluster.upstream_cx_connect_ms.99_5percentile' in {m[0] for m in json_metrics}
+    assert json_metrics == text_metrics
+
+
+def test_parse_cache(aggregator):
+    instance = INSTANCES['main']
+    c = Envoy(CHECK_NAME, {}, [instance])
+
+    with mock.patch('requests.get', return_value=response('multiple_services')):
+        c.check(instance)
+        num_metrics = len(aggregator.metric_names)
+
+        # Stat names are only parsed during the first run
+        with mock.patch('datadog_checks.envoy.envoy.parse_metric') as parse_metric:
+            aggregator.reset()
+            c.check(instance)
+            parse_metric.assert_not_called()
+        assert len(aggregator.metric_names) == num_metrics
+
+
+def test_parse_cache_bounded(aggregator):
+    instance = dict(INSTANCES['main'], parse_cache_size=100)
+    c = Envoy(CHECK_NAME, {}, [instance])
+
+    with mock.patch('requests.get', return_value=response('unknown_metrics')):
+        c.check(instance)
+        c.check(instance)
+    # Unknown metrics are still counted when cached
+    assert sum(c.unknown_metrics.values()) == 10
+
+    with mock.patch('requests.get', return_value=response('multiple_services')):
+        c.check(instance)
+    assert len(c.parsed_metrics) == 100
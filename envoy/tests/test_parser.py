@@ -2,7 +2,7 @@ import pytest
 
 from datadog_checks.envoy.errors import UnknownMetric, UnknownTags
 from datadog_checks.envoy.metrics import METRIC_PREFIX, METRICS
-from datadog_checks.envoy.parser import parse_histogram, parse_metric
+from datadog_checks.envoy.parser import parse_histogram, parse_json_histogram, parse_metric
 
 
 def test_unknown_metric():
@@ -589,3 +589,20 @@ def test_correct_unknown_percentile():
         ('envoy.http.downstream_rq_time.25percentile', 25.0),
         ('envoy.http.downstream_rq_time.55_5percentile', 55.5),
     ]
+
+
+def test_json_histogram():
+    metric = 'envoy.http.downstream_rq_time'
+    supported_quantiles = [0, 25, 55.5, 99.9]
+    values = [
+        {'interval': 0, 'cumulative': 0},
+        {'interval': None, 'cumulative': 25},
+        {'interval': 55.5, 'cumulative': 55.5},
+        {'interval': 99.9, 'cumulative': 99.9},
+    ]
+
+    assert list(parse_json_histogram(metric, supported_quantiles, values)) == [
+        ('envoy.http.downstream_rq_time.0percentile', 0.0),
+        ('envoy.http.downstream_rq_time.55_5percentile', 55.5),
+        ('envoy.http.downstream_rq_time.99_9percentile', 99.9),
+    ]
@@ -105,3 +105,26 @@ class WeakCiphersAdapter(HTTPAdapter):
         self.poolmanager = WeakCiphersPoolManager(
             num_pools=connections, maxsize=maxsize, block=block, strict=True, **pool_kwargs
         )
+
+
+class PeerCertAdapter(HTTPAdapter):
+    """Transport adapter that keeps the certificate of the peer of the last response it got."""
+
+    def __init__(self, *args, **kwargs):
+        super(PeerCertAdapter, self).__init__(*args, **kwargs)
+        self.peer_cert = None
+
+    def build_response(self, req, resp):
+        # The connection is still attached to the response as its content isn't read yet,
+        # a connection kept alive from a previous request still knows the certificate of its peer
+        peer_cert = None
+        sock = getattr(getattr(resp, '_connection', None), 'sock', None)
+        if sock is not None and hasattr(sock, 'getpeercert'):
+            try:
+                # Empty when the certificate wasn't validated
+                peer_cert = sock.getpeercert() or None
+            except Exception:
+                pass
+        self.peer_cert = peer_cert
+
+        return super(PeerCertAdapter, self).build_response(req, resp)
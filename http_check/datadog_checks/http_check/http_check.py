@@ -5,21 +5,20 @@ from __future__ import unicode_literals
 
 import re
 import socket
-import ssl
 import time
 from datetime import datetime
 
 import _strptime  # noqa
 import requests
-from six import string_types
+from six import itervalues, string_types
 from six.moves.urllib.parse import urlparse
 
 from datadog_checks.base import ensure_unicode, is_affirmative
 from datadog_checks.base.checks import NetworkCheck, Status
 
-from .adapters import WeakCiphersAdapter, WeakCiphersHTTPSConnection
+from .adapters import PeerCertAdapter, WeakCiphersAdapter, WeakCiphersHTTPSConnection
 from .config import DEFAULT_EXPECTED_CODE, from_instance
-from .utils import get_ca_certs_path
+from .utils import get_ca_certs_path, get_ssl_context
 
 DEFAULT_EXPIRE_DAYS_WARNING = 14
 DEFAULT_EXPIRE_DAYS_CRITICAL = 7
@@ -56,6 +55,11 @@ class HTTPCheck(NetworkCheck):
             # overrides configured `tls_ca_cert` value if `disable_ssl_validation` is enabled
             self.http.options['verify'] = False
 
+        # {(host, port, server_name): (expiration date, time it was fetched at)}
+        self._cert_expiration_dates = {}
+        # {(base address, adapter class): adapter}, kept across runs along with their connection pools
+        self._adapters = {}
+
     def _check(self, instance):
         (
             addr,
@@ -101,18 +105,24 @@ class HTTPCheck(NetworkCheck):
         tags_list.append("instance:{}".format(instance_name))
         service_checks = []
         r = None
+        cert_adapter = None
         try:
             parsed_uri = urlparse(addr)
+            base_addr = '{uri.scheme}://{uri.netloc}/'.format(uri=parsed_uri)
             self.log.debug("Connecting to {}".format(addr))
             self.http.session.trust_env = False
             if weakcipher:
-                base_addr = '{uri.scheme}://{uri.netloc}/'.format(uri=parsed_uri)
-                self.http.session.mount(base_addr, WeakCiphersAdapter())
+                self._mount_adapter(base_addr, WeakCiphersAdapter)
                 self.log.debug(
                     "Weak Ciphers will be used for {}. Supported Cipherlist: {}".format(
                         base_addr, WeakCiphersHTTPSConnection.SUPPORTED_CIPHERS
                     )
                 )
+            elif ssl_expire and parsed_uri.scheme == "https" and self._validates_peer_cert(instance, instance_ca_certs):
+                # The certificate for the expiration check can be taken from the request itself
+                cert_adapter = self._mount_adapter(base_addr, PeerCertAdapter)
+                # Don't report the certificate of a previous run if the request fails
+                cert_adapter.peer_cert = None
 
             # Add 'Content-Type' for non GET requests when they have not been specified in custom headers
             if method.upper() in DATA_METHODS and not headers.get('Content-Type'):
@@ -225,7 +235,13 @@ class HTTPCheck(NetworkCheck):
 
         if ssl_expire and parsed_uri.scheme == "https":
             status, days_left, seconds_left, msg = self.check_cert_expiration(
-                instance, timeout, instance_ca_certs, check_hostname, client_cert, client_key
+                instance,
+                timeout,
+                instance_ca_certs,
+                check_hostname,
+                client_cert,
+                client_key,
+                peer_cert=cert_adapter.peer_cert if cert_adapter is not None else None,
             )
             tags_list = list(tags)
             tags_list.append('url:{}'.format(addr))
@@ -263,8 +279,38 @@ class HTTPCheck(NetworkCheck):
 
         self.service_check(sc_name, NetworkCheck.STATUS_TO_SERVICE_CHECK[status], tags=tags, message=msg)
 
+    def _mount_adapter(self, base_addr, adapter_class):
+        """
+        Mounts the adapter of `base_addr` on the session, the same one at every run so its connections are kept alive.
+        """
+        adapter = self._adapters.get((base_addr, adapter_class))
+        if adapter is None:
+            adapter = self._adapters[(base_addr, adapter_class)] = adapter_class()
+
+        replaced = self.http.session.adapters.get(base_addr)
+        if replaced is not adapter:
+            if replaced is not None and replaced not in itervalues(self._adapters):
+                replaced.close()
+            self.http.session.mount(base_addr, adapter)
+
+        return adapter
+
+    def _validates_peer_cert(self, instance, instance_ca_certs):
+        """
+        Whether the request validates the certificate of the url the way the expiration check does,
+        i.e. against the same CA certificates and for the same server name, without going through a proxy.
+        """
+        if not instance_ca_certs or self.http.options['verify'] != instance_ca_certs:
+            return False
+
+        if (self.http.options['proxies'] or {}).get('https'):
+            return False
+
+        hostname = urlparse(instance.get('url')).hostname
+        return instance.get('ssl_server_name', hostname) == hostname
+
     def check_cert_expiration(
-        self, instance, timeout, instance_ca_certs, check_hostname, client_cert=None, client_key=None
+        self, instance, timeout, instance_ca_certs, check_hostname, client_cert=None, client_key=None, peer_cert=None
     ):
         # thresholds expressed in seconds take precedence over those expressed in days
         seconds_warning = (
@@ -283,35 +329,24 @@ class HTTPCheck(NetworkCheck):
         host = o.hostname
         server_name = instance.get('ssl_server_name', o.hostname)
         port = o.port or 443
+        refresh_interval = int(instance.get('certificate_expiration_refresh_interval', 0))
+
+        cache_key = (host, port, server_name)
+        cached = self._cert_expiration_dates.get(cache_key)
+        if peer_cert is not None:
+            exp_date = self._cache_cert_expiration_date(cache_key, peer_cert)
+        elif cached is not None and time.time() - cached[1] < refresh_interval:
+            exp_date = cached[0]
+        else:
+            try:
+                cert = self._get_peer_cert(
+                    host, port, server_name, timeout, instance_ca_certs, check_hostname, client_cert, client_key
+                )
+            except Exception as e:
+                return self._cert_error_status(e)
 
-        try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(float(timeout))
-            sock.connect((host, port))
-            context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
-            context.verify_mode = ssl.CERT_REQUIRED
-            context.check_hostname = check_hostname
-            context.load_verify_locations(instance_ca_certs)
-
-            if client_cert and client_key:
-                context.load_cert_chain(client_cert, keyfile=client_key)
-
-            ssl_sock = context.wrap_socket(sock, server_hostname=server_name)
-            cert = ssl_sock.getpeercert()
-
-        except Exception as e:
-            msg = str(e)
-            if 'expiration' in msg:
-                self.log.debug("error: {}. Cert might be expired.".format(e))
-                return Status.DOWN, 0, 0, msg
-            elif 'Hostname mismatch' in msg or "doesn't match" in msg:
-                self.log.debug("The hostname on the SSL certificate does not match the given host: {}".format(e))
-                return Status.CRITICAL, 0, 0, msg
-            else:
-                self.log.debug("Site is down, unable to connect to get cert expiration: {}".format(e))
-                return Status.DOWN, 0, 0, msg
+            exp_date = self._cache_cert_expiration_date(cache_key, cert)
 
-        exp_date = datetime.strptime(cert['notAfter'], "%b %d %H:%M:%S %Y %Z")
         time_left = exp_date - datetime.utcnow()
         days_left = time_left.days
         seconds_left = time_left.total_seconds()
@@ -337,3 +372,38 @@ class HTTPCheck(NetworkCheck):
 
         else:
             return Status.UP, days_left, seconds_left, "Days left: {}".format(days_left)
+
+    def _get_peer_cert(
+        self, host, port, server_name, timeout, instance_ca_certs, check_hostname, client_cert, client_key
+    ):
+        context = get_ssl_context(instance_ca_certs, check_hostname, client_cert, client_key)
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(float(timeout))
+            sock.connect((host, port))
+
+            ssl_sock = context.wrap_socket(sock, server_hostname=server_name)
+            try:
+                return ssl_sock.getpeercert()
+            finally:
+                ssl_sock.close()
+        finally:
+            sock.close()
+
+    def _cache_cert_expiration_date(self, cache_key, cert):
+        exp_date = datetime.strptime(cert['notAfter'], "%b %d %H:%M:%S %Y %Z")
+        self._cert_expiration_dates[cache_key] = (exp_date, time.time())
+        return exp_date
+
+    def _cert_error_status(self, e):
+        msg = str(e)
+        if 'expiration' in msg:
+            self.log.debug("error: {}. Cert might be expired.".format(e))
+            return Status.DOWN, 0, 0, msg
+        elif 'Hostname mismatch' in msg or "doesn't match" in msg:
+            self.log.debug("The hostname on the SSL certificate does not match the given host: {}".format(e))
+            return Status.CRITICAL, 0, 0, msg
+        else:
+            self.log.debug("Site is down, unable to connect to get cert expiration: {}".format(e))
+            return Status.DOWN, 0, 0, msg
@@ -2,7 +2,9 @@
 # All rights reserved
 # Licensed under a 3-clause BSD style license (see LICENSE)
 import os
+import ssl
 import sys
+import threading
 
 from datadog_checks.base.utils.platform import Platform
 
@@ -11,6 +13,10 @@ EMBEDDED_DIR = 'embedded'
 if Platform.is_windows():
     EMBEDDED_DIR += str(sys.version_info[0])
 
+# {(ca_certs, check_hostname, client_cert, client_key): context}
+_ssl_contexts = {}
+_ssl_contexts_lock = threading.Lock()
+
 
 def get_ca_certs_path():
     """
@@ -22,6 +28,30 @@ def get_ca_certs_path():
     return None
 
 
+def get_ssl_context(ca_certs, check_hostname, client_cert=None, client_key=None):
+    """
+    Get an SSL context validating certificates against `ca_certs`.
+
+    Contexts are shared by all the instances with the same settings, so
+    that the CA certificates are loaded only once per process.
+    """
+    key = (ca_certs, check_hostname, client_cert, client_key)
+    with _ssl_contexts_lock:
+        context = _ssl_contexts.get(key)
+        if context is None:
+            context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+            context.verify_mode = ssl.CERT_REQUIRED
+            context.check_hostname = check_hostname
+            context.load_verify_locations(ca_certs)
+
+            if client_cert and client_key:
+                context.load_cert_chain(client_cert, keyfile=client_key)
+
+            _ssl_contexts[key] = context
+
+    return context
+
+
 def _get_ca_certs_paths():
     """
     Get a list of possible paths containing certificates
@@ -7,6 +7,7 @@
 import mock
 
 from datadog_checks.http_check import HTTPCheck
+from datadog_checks.http_check.adapters import PeerCertAdapter
 
 
 def test__init__():
@@ -22,3 +23,84 @@ def test__init__():
     init_config = {'ca_certs': 'foo'}
     http_check = HTTPCheck('http_check', init_config, [{}])
     assert http_check.ca_certs == 'foo'
+
+
+def test_check_cert_expiration_cache():
+    http_check = HTTPCheck('http_check', {'ca_certs': 'foo'}, [{}])
+    instance = {'url': 'https://example.com', 'certificate_expiration_refresh_interval': 3600}
+    cert = {'notAfter': 'Apr 12 12:00:00 2006 GMT'}
+
+    with mock.patch.object(http_check, '_get_peer_cert', return_value=cert) as get_peer_cert:
+        status, days_left, _, _ = http_check.check_cert_expiration(instance, 10, 'foo', True)
+        assert status == 'CRITICAL'
+        assert days_left < 0
+        assert get_peer_cert.call_count == 1
+
+        # The expiration date is reused until the refresh interval elapses
+        assert http_check.check_cert_expiration(instance, 10, 'foo', True)[0] == 'CRITICAL'
+        assert get_peer_cert.call_count == 1
+
+        # The certificate of the request is used without connecting again
+        http_check.check_cert_expiration(
+            dict(instance, certificate_expiration_refresh_interval=0),
+            10,
+            'foo',
+            True,
+            peer_cert={'notAfter': 'Apr 12 12:00:00 2106 GMT'},
+        )
+        assert get_peer_cert.call_count == 1
+
+        status, days_left, _, _ = http_check.check_cert_expiration(instance, 10, 'foo', True)
+        assert status == 'UP'
+        assert days_left > 0
+        assert get_peer_cert.call_count == 1
+
+
+def test_validates_peer_cert():
+    instance = {'url': 'https://example.com', 'disable_ssl_validation': False}
+    http_check = HTTPCheck('http_check', {'ca_certs': 'foo'}, [instance])
+    assert http_check._validates_peer_cert(instance, 'foo')
+    assert not http_check._validates_peer_cert(instance, 'bar')
+    assert not http_check._validates_peer_cert(dict(instance, ssl_server_name='example.org'), 'foo')
+
+    instance = {'url': 'https://example.com'}
+    http_check = HTTPCheck('http_check', {'ca_certs': 'foo'}, [instance])
+    assert not http_check._validates_peer_cert(instance, 'foo')
+
+
+def test_mount_adapter():
+    http_check = HTTPCheck('http_check', {'ca_certs': 'foo'}, [{}])
+    replaced = mock.Mock()
+    http_check.http.session.mount('https://example.com/', replaced)
+
+    adapter = http_check._mount_adapter('https://example.com/', PeerCertAdapter)
+    assert http_check.http.session.get_adapter('https://example.com/foo') is adapter
+    replaced.close.assert_called_once_with()
+
+    # The same adapter, and so its connections, is used at every run
+    http_check.http._session = None
+    assert http_check._mount_adapter('https://example.com/', PeerCertAdapter) is adapter
+    assert http_check.http.session.get_adapter('https://example.com/foo') is adapter
+    assert http_check._mount_adapter('https://example.org/', PeerCertAdapter) is not adapter
+
+
+def test_peer_cert_adapter():
+    adapter = PeerCertAdapter()
+    cert = {'notAfter': 'Apr 12 12:00:00 2106 GMT'}
+    sock = mock.Mock(getpeercert=mock.Mock(return_value=cert))
+    resp = mock.MagicMock(_connection=mock.Mock(sock=sock), status=200, headers={})
+    req = mock.Mock(url='https://example.com/')
+
+    adapter.build_response(req, resp)
+    assert adapter.peer_cert == cert
+
+    # The certificate is also read from a connection that was kept alive
+    cert = {'notAfter': 'Apr 12 12:00:00 2107 GMT'}
+    sock.getpeercert.return_value = cert
+    adapter.build_response(req, resp)
+    assert adapter.peer_cert == cert
+
+    # Nothing is kept when the certificate wasn't validated
+    sock.getpeercert.return_value = {}
+    adapter.build_response(req, resp)
+    assert adapter.peer_cert is None
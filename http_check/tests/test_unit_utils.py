@@ -8,7 +8,7 @@ import mock
 import pytest
 
 from datadog_checks.dev import temp_dir
-from datadog_checks.http_check.utils import _get_ca_certs_paths, get_ca_certs_path
+from datadog_checks.http_check.utils import _get_ca_certs_paths, get_ca_certs_path, get_ssl_context
 
 
 def test_get_ca_certs_path():
@@ -52,3 +52,17 @@ def test__get_ca_certs_paths(embedded_dir):
             assert len(paths) == 3
             assert paths[1].endswith('ca-certificates.crt')
             assert paths[2] == '/etc/ssl/certs/ca-certificates.crt'
+
+
+def test_get_ssl_context():
+    with mock.patch(
+        'datadog_checks.http_check.utils.ssl.SSLContext', side_effect=lambda _: mock.MagicMock()
+    ) as ssl_context:
+        context = get_ssl_context('foo', True)
+        assert get_ssl_context('foo', True) is context
+        context.load_verify_locations.assert_called_once_with('foo')
+        context.load_cert_chain.assert_not_called()
+
+        assert get_ssl_context('foo', False) is not context
+        get_ssl_context('foo', True, 'cert', 'key').load_cert_chain.assert_called_once_with('cert', keyfile='key')
+        assert ssl_context.call_count == 3
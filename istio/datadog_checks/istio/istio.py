@@ -31,56 +31,25 @@ class Istio(OpenMetricsBaseCheck):
         Process all the endpoints associated with this instance.
         All the endpoints themselves are optional, but at least one must be passed.
         """
-        processed = False
-        # Get the config for the istio_mesh instance
-        istio_mesh_endpoint = instance.get('istio_mesh_endpoint')
-        if istio_mesh_endpoint:
-            istio_mesh_config = self.config_map[istio_mesh_endpoint]
-
-            # Process istio_mesh
-            self.process(istio_mesh_config)
-            processed = True
-
-        # Get the config for the process_mixer instance
-        process_mixer_endpoint = instance.get('mixer_endpoint')
-        if process_mixer_endpoint:
-            process_mixer_config = self.config_map[process_mixer_endpoint]
-
-            # Process process_mixer
-            self.process(process_mixer_config)
-            processed = True
-
-        # Get the config for the process_pilot instance
-        process_pilot_endpoint = instance.get('pilot_endpoint')
-        if process_pilot_endpoint:
-            process_pilot_config = self.config_map[process_pilot_endpoint]
-
-            # Process process_pilot
-            self.process(process_pilot_config)
-            processed = True
-
-        # Get the config for the process_galley instance
-        process_galley_endpoint = instance.get('galley_endpoint')
-        if process_galley_endpoint:
-            process_galley_config = self.config_map[process_galley_endpoint]
-
-            # Process process_galley
-            self.process(process_galley_config)
-            processed = True
-
-        # Get the config for the process_citadel instance
-        process_citadel_endpoint = instance.get('citadel_endpoint')
-        if process_citadel_endpoint:
-            process_citadel_config = self.config_map[process_citadel_endpoint]
-
-            # Process process_citadel
-            self.process(process_citadel_config)
-            processed = True
+        scrapers = []
+        for endpoint_option in (
+            'istio_mesh_endpoint',
+            'mixer_endpoint',
+            'pilot_endpoint',
+            'galley_endpoint',
+            'citadel_endpoint',
+        ):
+            endpoint = instance.get(endpoint_option)
+            if endpoint:
+                scrapers.append((self.config_map[endpoint], None))
 
         # Check that at least 1 endpoint is configured
-        if not processed:
+        if not scrapers:
             raise CheckException("At least one of Mixer, Mesh, Pilot, Galley or Citadel endpoints must be configured")
 
+        # The endpoints are fetched concurrently, their metrics are then submitted in order
+        self.process_concurrently(scrapers)
+
     def create_generic_instances(self, instances):
         """
         Generalize each (single) Istio instance into OpenMetricsBaseCheck instances.
@@ -2,6 +2,7 @@
 # All rights reserved
 # Licensed under Simplified BSD License (see LICENSE)
 DEFAULT_KAFKA_TIMEOUT = 5
+DEFAULT_ZK_BATCH_SIZE = 500
 
 CONTEXT_UPPER_BOUND = 500
 
@@ -16,7 +16,7 @@ from six import string_types
 
 from datadog_checks.base import AgentCheck, ConfigurationError, is_affirmative
 
-from .constants import CONTEXT_UPPER_BOUND, DEFAULT_KAFKA_TIMEOUT, KAFKA_INTERNAL_TOPICS
+from .constants import CONTEXT_UPPER_BOUND, DEFAULT_KAFKA_TIMEOUT, DEFAULT_ZK_BATCH_SIZE, KAFKA_INTERNAL_TOPICS
 
 
 class LegacyKafkaCheck_0_10_2(AgentCheck):
@@ -60,6 +60,10 @@ class LegacyKafkaCheck_0_10_2(AgentCheck):
                 else:
                     raise ConfigurationError("zk_connect_str must be a string or list of strings")
 
+            self._zk_batch_size = int(init_config.get('zk_batch_size', DEFAULT_ZK_BATCH_SIZE))
+            if self._zk_batch_size < 1:
+                raise ConfigurationError('zk_batch_size must be a positive integer')
+
             self._zk_client = KazooClient(hosts=self._zk_hosts_ports, timeout=int(init_config.get('zk_timeout', 5)))
             self._zk_client.start()
 
@@ -159,16 +163,42 @@ class LegacyKafkaCheck_0_10_2(AgentCheck):
         if node_id is None:
             node_id = self._kafka_client.least_loaded_node()
 
-        while not self._kafka_client.ready(node_id):
-            # poll until the connection to broker is ready, otherwise send() will fail with NodeNotReadyError
-            self._kafka_client.poll()
+        return next(self._make_concurrent_reqs([(node_id, request)]))
+
+    def _make_concurrent_reqs(self, requests):
+        """
+        Send requests to their brokers all at once, rather than waiting for the response to each one before sending
+        the next, and block until all the responses are received.
+
+        :param requests: list of (node_id, request)
+        :return: generator of the responses, in the same order as the requests. When some requests failed, the
+            responses to the other ones are generated before the error of the first one that failed is raised.
+        """
+        # Initiate the connections to all the brokers first so that they are established concurrently
+        for node_id in {node_id for node_id, _ in requests}:
+            self._kafka_client.ready(node_id)
+
+        futures = []
+        for node_id, request in requests:
+            while not self._kafka_client.ready(node_id):
+                # poll until the connection to broker is ready, otherwise send() will fail with NodeNotReadyError
+                self._kafka_client.poll()
+            futures.append(self._kafka_client.send(node_id, request))
+
+        for future in futures:
+            # block until we get the response, polling also processes the responses to the other requests
+            self._kafka_client.poll(future=future)
+
+        error = None
+        for future in futures:
+            if future.failed():
+                if error is None:
+                    error = future.exception
+            else:
+                yield future.value
 
-        future = self._kafka_client.send(node_id, request)
-        self._kafka_client.poll(future=future)  # block until we get response.
-        if future.failed():
-            raise future.exception  # pylint: disable-msg=raising-bad-type
-        response = future.value
-        return response
+        if error is not None:
+            raise error  # pylint: disable-msg=raising-bad-type
 
     def _get_highwater_offsets(self):
         """
@@ -184,6 +214,8 @@ class LegacyKafkaCheck_0_10_2(AgentCheck):
 
         Sends one OffsetRequest per broker to get offsets for all partitions where that broker is the leader:
         https://cwiki.apache.org/confluence/display/KAFKA/A+Guide+To+The+Kafka+Protocol#AGuideToTheKafkaProtocol-OffsetAPI(AKAListOffset)
+
+        The requests are sent to all the brokers at once and their responses are polled together.
         """
         # If we aren't fetching all broker highwater offsets, then construct the unique set of topic partitions for
         # which this run of the check has at least once saved consumer offset. This is later used as a filter for
@@ -192,6 +224,7 @@ class LegacyKafkaCheck_0_10_2(AgentCheck):
             tps_with_consumer_offset = {(topic, partition) for (_, topic, partition) in self._kafka_consumer_offsets}
             tps_with_consumer_offset.update({(topic, partition) for (_, topic, partition) in self._zk_consumer_offsets})
 
+        requests = []
         for broker in self._kafka_client.cluster.brokers():
             broker_led_partitions = self._kafka_client.cluster.partitions_for_broker(broker.nodeId)
             if broker_led_partitions is None:
@@ -215,7 +248,9 @@ class LegacyKafkaCheck_0_10_2(AgentCheck):
                     for topic, partitions in partitions_grouped_by_topic.items()
                 ],
             )
-            response = self._make_blocking_req(request, node_id=broker.nodeId)
+            requests.append((broker.nodeId, request))
+
+        for response in self._make_concurrent_reqs(requests):
             self._process_highwater_offsets(response)
 
     def _process_highwater_offsets(self, response):
@@ -345,6 +380,8 @@ class LegacyKafkaCheck_0_10_2(AgentCheck):
         else:
             consumer_groups = self._consumer_groups
 
+        # The keys (consumer_group, topic, partition) of the offsets to read and their path
+        offset_paths = []
         for consumer_group, topics in consumer_groups.items():
             if not topics:  # If topics are't specified, fetch them from ZK
                 zk_path_topics = zk_path_topic_tmpl.format(group=consumer_group)
@@ -360,15 +397,19 @@ class LegacyKafkaCheck_0_10_2(AgentCheck):
                     zk_path = (zk_path_partition_tmpl + '{partition}/').format(
                         group=consumer_group, topic=topic, partition=partition
                     )
-                    try:
-                        consumer_offset = int(self._zk_client.get(zk_path)[0])
-                        key = (consumer_group, topic, partition)
-                        self._zk_consumer_offsets[key] = consumer_offset
-                    except NoNodeError:
-                        self.log.info('No zookeeper node at %s', zk_path)
-                        continue
-                    except Exception:
-                        self.log.exception('Could not read consumer offset from %s', zk_path)
+                    offset_paths.append(((consumer_group, topic, partition), zk_path))
+
+        # Read the offsets with asynchronous requests, a batch of them being pending at once
+        for i in range(0, len(offset_paths), self._zk_batch_size):
+            batch = offset_paths[i : i + self._zk_batch_size]
+            async_results = [(key, zk_path, self._zk_client.get_async(zk_path)) for key, zk_path in batch]
+            for key, zk_path, async_result in async_results:
+                try:
+                    self._zk_consumer_offsets[key] = int(async_result.get()[0])
+                except NoNodeError:
+                    self.log.info('No zookeeper node at %s', zk_path)
+                except Exception:
+                    self.log.exception('Could not read consumer offset from %s', zk_path)
 
     def _get_kafka_consumer_offsets(self):
         """
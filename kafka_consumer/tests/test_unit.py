@@ -0,0 +1,115 @@
+# (C) Datadog, Inc. 2019
+# All rights reserved
+# Licensed under Simplified BSD License (see LICENSE)
+import mock
+import pytest
+from kafka.errors import KafkaConnectionError
+from kafka.future import Future
+from kazoo.exceptions import NoNodeError
+
+from datadog_checks.base import ConfigurationError
+from datadog_checks.kafka_consumer.legacy_0_10_2 import LegacyKafkaCheck_0_10_2
+
+pytestmark = pytest.mark.unit
+
+INSTANCE = {
+    'kafka_connect_str': 'localhost:9092',
+    'zk_connect_str': 'localhost:2181',
+    'consumer_groups': {'my_consumer': {'marvel': [0, 1, 2, 3]}},
+}
+
+
+@pytest.fixture
+def kafka_client():
+    with mock.patch('datadog_checks.kafka_consumer.legacy_0_10_2.KafkaClient') as client_class:
+        yield client_class.return_value
+
+
+@pytest.fixture
+def zk_client():
+    with mock.patch('datadog_checks.kafka_consumer.legacy_0_10_2.KazooClient') as client_class:
+        yield client_class.return_value
+
+
+def test_zk_batch_size_validation(kafka_client, zk_client):
+    with pytest.raises(ConfigurationError):
+        LegacyKafkaCheck_0_10_2('kafka_consumer', {'zk_batch_size': 0}, [INSTANCE])
+
+
+def test_get_zk_consumer_offsets(kafka_client, zk_client):
+    """
+    The offsets are read by batches, a path that can't be read doesn't prevent reading the others.
+    """
+    check = LegacyKafkaCheck_0_10_2('kafka_consumer', {'zk_batch_size': 3}, [INSTANCE])
+    check._zk_consumer_offsets = {}
+    calls = []
+
+    def get_async(zk_path):
+        calls.append(('get_async', zk_path))
+
+        def get():
+            calls.append(('get', zk_path))
+            if zk_path.endswith('/1/'):
+                raise NoNodeError()
+            if zk_path.endswith('/2/'):
+                raise Exception('connection lost')
+            return b'42', None
+
+        return mock.Mock(get=get)
+
+    zk_client.get_async.side_effect = get_async
+    check._get_zk_consumer_offsets()
+
+    assert check._zk_consumer_offsets == {('my_consumer', 'marvel', 0): 42, ('my_consumer', 'marvel', 3): 42}
+    # The results of a batch are all retrieved before the requests of the next one are sent
+    paths = ['/consumers/my_consumer/offsets/marvel/{}/'.format(partition) for partition in range(4)]
+    assert calls == (
+        [('get_async', path) for path in paths[:3]]
+        + [('get', path) for path in paths[:3]]
+        + [('get_async', paths[3]), ('get', paths[3])]
+    )
+
+
+def _resolve_futures(futures, failures):
+    """
+    Returns a `poll` resolving the futures in the reverse order of the requests
+    """
+
+    def poll(future=None):
+        for node_id, pending in reversed(list(enumerate(futures))):
+            if not pending.is_done:
+                if node_id in failures:
+                    pending.failure(KafkaConnectionError('broker {} is down'.format(node_id)))
+                else:
+                    pending.success('response-{}'.format(node_id))
+
+    return poll
+
+
+def test_make_concurrent_reqs(kafka_client, zk_client):
+    check = LegacyKafkaCheck_0_10_2('kafka_consumer', {}, [INSTANCE])
+    futures = [Future() for _ in range(3)]
+    kafka_client.ready.return_value = True
+    kafka_client.send.side_effect = lambda node_id, request: futures[node_id]
+    kafka_client.poll.side_effect = _resolve_futures(futures, failures=())
+
+    responses = list(check._make_concurrent_reqs([(node_id, 'request') for node_id in range(3)]))
+
+    # All the requests are sent before waiting for the responses, which are returned in the order of the requests
+    assert [call[0][0] for call in kafka_client.send.call_args_list] == [0, 1, 2]
+    assert responses == ['response-0', 'response-1', 'response-2']
+
+
+def test_make_concurrent_reqs_failure(kafka_client, zk_client):
+    check = LegacyKafkaCheck_0_10_2('kafka_consumer', {}, [INSTANCE])
+    futures = [Future() for _ in range(3)]
+    kafka_client.ready.return_value = True
+    kafka_client.send.side_effect = lambda node_id, request: futures[node_id]
+    kafka_client.poll.side_effect = _resolve_futures(futures, failures=(1,))
+
+    # The responses of the other brokers are returned before the error is raised
+    responses = []
+    with pytest.raises(KafkaConnectionError, match='broker 1 is down'):
+        for response in check._make_concurrent_reqs([(node_id, 'request') for node_id in range(3)]):
+            responses.append(response)
+    assert responses == ['response-0', 'response-2']
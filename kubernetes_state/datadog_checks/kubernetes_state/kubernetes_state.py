@@ -114,6 +114,16 @@ class KubernetesState(OpenMetricsBaseCheck):
             self.monotonic_count(scraper_config['namespace'] + '.job.succeeded', job.count, list(job_tags))
             job.set_previous_and_reset_current_ts()
 
+    def _is_family_relevant(self, name, metric_type, scraper_config, metric_transformers):
+        if scraper_config['telemetry']:
+            # The collector telemetry is computed in `_filter_metric`, which needs to see unhandled families too
+            metric_type = scraper_config['type_overrides'].get(name, metric_type)
+            name = self._remove_metric_prefix(name, scraper_config)
+            return metric_type in self.METRIC_TYPES and (
+                name in scraper_config['label_joins'] or name not in scraper_config['ignore_metrics']
+            )
+        return super(KubernetesState, self)._is_family_relevant(name, metric_type, scraper_config, metric_transformers)
+
     def _filter_metric(self, metric, scraper_config):
         if scraper_config['telemetry']:
             # name is like "kube_pod_execution_duration"
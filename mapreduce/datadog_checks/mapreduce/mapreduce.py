@@ -40,6 +40,7 @@ MapReduce Reduce Task Metrics
 mapreduce.job.reduce.task.progress      The distribution of all reduce task progresses
 """
 
+from contextlib import contextmanager
 
 from requests.exceptions import ConnectionError, HTTPError, InvalidURL, Timeout
 from simplejson import JSONDecodeError
@@ -47,6 +48,7 @@ from six import iteritems, itervalues
 from six.moves.urllib.parse import urljoin, urlsplit, urlunsplit
 
 from datadog_checks.base import AgentCheck, is_affirmative
+from datadog_checks.base.utils.json_stream import iter_response_json_array
 
 
 class MapReduceCheck(AgentCheck):
@@ -64,6 +66,11 @@ class MapReduceCheck(AgentCheck):
     YARN_APPS_PATH = 'ws/v1/cluster/apps'
     MAPREDUCE_JOBS_PATH = 'ws/v1/mapreduce/jobs'
 
+    # Paths of the listings in the JSON responses
+    YARN_APPS_ITEMS_PATH = ('apps', 'app')
+    MAPREDUCE_JOBS_ITEMS_PATH = ('jobs', 'job')
+    MAPREDUCE_TASKS_ITEMS_PATH = ('tasks', 'task')
+
     # Application type and states to collect
     YARN_APPLICATION_TYPES = 'MAPREDUCE'
     YARN_APPLICATION_STATES = 'RUNNING'
@@ -268,9 +275,10 @@ class MapReduceCheck(AgentCheck):
         """
         Return a dictionary of {app_id: (app_name, tracking_url)} for the running MapReduce applications
         """
-        metrics_json = self._rest_request_to_json(
+        apps_json = self._rest_request_to_json_items(
             rm_address,
             self.YARN_APPS_PATH,
+            self.YARN_APPS_ITEMS_PATH,
             self.YARN_SERVICE_CHECK,
             states=self.YARN_APPLICATION_STATES,
             applicationTypes=self.YARN_APPLICATION_TYPES,
@@ -278,16 +286,13 @@ class MapReduceCheck(AgentCheck):
 
         running_apps = {}
 
-        if metrics_json.get('apps'):
-            if metrics_json['apps'].get('app') is not None:
-
-                for app_json in metrics_json['apps']['app']:
-                    app_id = app_json.get('id')
-                    tracking_url = app_json.get('trackingUrl')
-                    app_name = app_json.get('name')
+        for app_json in apps_json:
+            app_id = app_json.get('id')
+            tracking_url = app_json.get('trackingUrl')
+            app_name = app_json.get('name')
 
-                    if app_id and tracking_url and app_name:
-                        running_apps[app_id] = (app_name, tracking_url)
+            if app_id and tracking_url and app_name:
+                running_apps[app_id] = (app_name, tracking_url)
 
         return running_apps
 
@@ -307,37 +312,34 @@ class MapReduceCheck(AgentCheck):
 
         for app_name, tracking_url in itervalues(running_apps):
 
-            metrics_json = self._rest_request_to_json(
-                tracking_url, self.MAPREDUCE_JOBS_PATH, self.MAPREDUCE_SERVICE_CHECK
+            jobs_json = self._rest_request_to_json_items(
+                tracking_url, self.MAPREDUCE_JOBS_PATH, self.MAPREDUCE_JOBS_ITEMS_PATH, self.MAPREDUCE_SERVICE_CHECK
             )
 
-            if metrics_json.get('jobs'):
-                if metrics_json['jobs'].get('job'):
-
-                    for job_json in metrics_json['jobs']['job']:
-                        job_id = job_json.get('id')
-                        job_name = job_json.get('name')
-                        user_name = job_json.get('user')
+            for job_json in jobs_json:
+                job_id = job_json.get('id')
+                job_name = job_json.get('name')
+                user_name = job_json.get('user')
 
-                        if job_id and job_name and user_name:
+                if job_id and job_name and user_name:
 
-                            # Build the structure to hold the information for each job ID
-                            running_jobs[str(job_id)] = {
-                                'job_name': str(job_name),
-                                'app_name': str(app_name),
-                                'user_name': str(user_name),
-                                'tracking_url': self._join_url_dir(tracking_url, self.MAPREDUCE_JOBS_PATH, job_id),
-                            }
+                    # Build the structure to hold the information for each job ID
+                    running_jobs[str(job_id)] = {
+                        'job_name': str(job_name),
+                        'app_name': str(app_name),
+                        'user_name': str(user_name),
+                        'tracking_url': self._join_url_dir(tracking_url, self.MAPREDUCE_JOBS_PATH, job_id),
+                    }
 
-                            tags = [
-                                'app_name:' + str(app_name),
-                                'user_name:' + str(user_name),
-                                'job_name:' + str(job_name),
-                            ]
+                    tags = [
+                        'app_name:' + str(app_name),
+                        'user_name:' + str(user_name),
+                        'job_name:' + str(job_name),
+                    ]
 
-                            tags.extend(addl_tags)
+                    tags.extend(addl_tags)
 
-                            self._set_metrics_from_json(job_json, self.MAPREDUCE_JOB_METRICS, tags)
+                    self._set_metrics_from_json(job_json, self.MAPREDUCE_JOB_METRICS, tags)
 
         return running_jobs
 
@@ -402,31 +404,32 @@ class MapReduceCheck(AgentCheck):
         """
         for job_stats in itervalues(running_jobs):
 
-            metrics_json = self._rest_request_to_json(
-                job_stats['tracking_url'], 'tasks', self.MAPREDUCE_SERVICE_CHECK, tags=addl_tags
+            tasks_json = self._rest_request_to_json_items(
+                job_stats['tracking_url'],
+                'tasks',
+                self.MAPREDUCE_TASKS_ITEMS_PATH,
+                self.MAPREDUCE_SERVICE_CHECK,
+                tags=addl_tags,
             )
 
-            if metrics_json.get('tasks'):
-                if metrics_json['tasks'].get('task'):
-
-                    for task in metrics_json['tasks']['task']:
-                        task_type = task.get('type')
+            for task in tasks_json:
+                task_type = task.get('type')
 
-                        if task_type:
-                            tags = [
-                                'app_name:' + job_stats['app_name'],
-                                'user_name:' + job_stats['user_name'],
-                                'job_name:' + job_stats['job_name'],
-                                'task_type:' + str(task_type).lower(),
-                            ]
+                if task_type:
+                    tags = [
+                        'app_name:' + job_stats['app_name'],
+                        'user_name:' + job_stats['user_name'],
+                        'job_name:' + job_stats['job_name'],
+                        'task_type:' + str(task_type).lower(),
+                    ]
 
-                            tags.extend(addl_tags)
+                    tags.extend(addl_tags)
 
-                            if task_type == 'MAP':
-                                self._set_metrics_from_json(task, self.MAPREDUCE_MAP_TASK_METRICS, tags)
+                    if task_type == 'MAP':
+                        self._set_metrics_from_json(task, self.MAPREDUCE_MAP_TASK_METRICS, tags)
 
-                            elif task_type == 'REDUCE':
-                                self._set_metrics_from_json(task, self.MAPREDUCE_REDUCE_TASK_METRICS, tags)
+                    elif task_type == 'REDUCE':
+                        self._set_metrics_from_json(task, self.MAPREDUCE_REDUCE_TASK_METRICS, tags)
 
     def _set_metrics_from_json(self, metrics_json, metrics, tags):
         """
@@ -453,6 +456,30 @@ class MapReduceCheck(AgentCheck):
         """
         Query the given URL and return the JSON response
         """
+        url, service_check_tags = self._build_request(address, object_path, tags, *args, **kwargs)
+
+        with self._handle_request_errors(url, service_name, service_check_tags):
+            response = self.http.get(url)
+            response.raise_for_status()
+            return response.json()
+
+    def _rest_request_to_json_items(self, address, object_path, items_path, service_name, tags=None, *args, **kwargs):
+        """
+        Query the given URL and yield the items of the JSON array under `items_path` one at a time,
+        parsing the response while it is downloaded instead of loading it entirely
+        """
+        url, service_check_tags = self._build_request(address, object_path, tags, *args, **kwargs)
+
+        with self._handle_request_errors(url, service_name, service_check_tags):
+            response = self.http.get(url, stream=True)
+            response.raise_for_status()
+            for item in iter_response_json_array(response, items_path):
+                yield item
+
+    def _build_request(self, address, object_path, tags, *args, **kwargs):
+        """
+        Return the URL to query and the tags of its service check
+        """
         tags = [] if tags is None else tags
 
         service_check_tags = ['url:{}'.format(self._get_url_base(address))] + tags
@@ -474,10 +501,15 @@ class MapReduceCheck(AgentCheck):
             query = '&'.join(['{}={}'.format(key, value) for key, value in iteritems(kwargs)])
             url = urljoin(url, '?' + query)
 
+        return url, service_check_tags
+
+    @contextmanager
+    def _handle_request_errors(self, url, service_name, service_check_tags):
+        """
+        Report the request errors with a critical service check
+        """
         try:
-            response = self.http.get(url)
-            response.raise_for_status()
-            response_json = response.json()
+            yield
 
         except Timeout as e:
             self.service_check(
@@ -510,8 +542,6 @@ class MapReduceCheck(AgentCheck):
             self.service_check(service_name, AgentCheck.CRITICAL, tags=service_check_tags, message=str(e))
             raise
 
-        return response_json
-
     def _join_url_dir(self, url, *args):
         """
         Join a URL with multiple directories
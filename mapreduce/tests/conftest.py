@@ -97,6 +97,14 @@ def requests_get_mock(*args, **kwargs):
         def raise_for_status(self):
             return True
 
+        def iter_content(self, chunk_size=1, decode_unicode=False):
+            data = self.json_data.encode('utf-8')
+            for i in range(0, len(data), chunk_size):
+                yield data[i : i + chunk_size]
+
+        def close(self):
+            pass
+
     url = args[0]
 
     # The parameter that creates the query params (kwargs) is an unordered dict,
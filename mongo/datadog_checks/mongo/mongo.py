@@ -13,12 +13,14 @@ from six import PY3, iteritems, itervalues
 from six.moves.urllib.parse import unquote_plus, urlsplit
 
 from datadog_checks.base import AgentCheck, is_affirmative
+from datadog_checks.base.checks.libs.thread_pool import Pool
 from datadog_checks.base.utils.common import round_value
 
 if PY3:
     long = int
 
 DEFAULT_TIMEOUT = 30
+DEFAULT_DBSTATS_MAX_WORKERS = 4
 GAUGE = AgentCheck.gauge
 RATE = AgentCheck.rate
 ALLOWED_CUSTOM_METRICS_TYPES = ['gauge', 'rate', 'count', 'monotonic_count']
@@ -430,6 +432,16 @@ class MongoDb(AgentCheck):
         # List of metrics to collect per instance
         self.metrics_to_collect_by_instance = {}
 
+        # Metrics to collect per instance, resolved into their key paths and submission
+        self.metric_table_by_instance = {}
+
+        self._case_sensitive_metric_name_suffixes = [
+            (re.compile(pattern), repl) for pattern, repl in iteritems(self.CASE_SENSITIVE_METRIC_NAME_SUFFIXES)
+        ]
+
+        # MongoClients kept across runs, by server and connection settings
+        self._clients = {}
+
         self.collection_metrics_names = []
         for key in self.COLLECTION_METRICS:
             self.collection_metrics_names.append(key.split('.')[1])
@@ -537,6 +549,40 @@ class MongoDb(AgentCheck):
             self.metrics_to_collect_by_instance[instance_key] = self._build_metric_list_to_collect(additional_metrics)
         return self.metrics_to_collect_by_instance[instance_key]
 
+    def _get_metric_table(self, instance_key, metrics_to_collect):
+        """
+        Return and cache the metrics to collect resolved by `_build_metric_table`.
+        """
+        if instance_key not in self.metric_table_by_instance:
+            self.metric_table_by_instance[instance_key] = self._build_metric_table(metrics_to_collect)
+        return self.metric_table_by_instance[instance_key]
+
+    def _build_metric_table(self, metrics_to_collect):
+        """
+        Resolve the metrics to collect once, into lists of
+        (metric_name, key path of the value, submit_method, metric_name_alias) for:
+        * `status`: the metrics found in the serverStatus document
+        * `stats`: the metrics found in the dbstats document of each database
+        * `top`: the metrics found in the `top` totals of each namespace
+        """
+        table = {'status': [], 'stats': [], 'top': []}
+        for metric_name in metrics_to_collect:
+            submit_method, metric_name_alias = self._resolve_metric(metric_name, metrics_to_collect)
+            if metric_name.startswith('stats.'):
+                path = (metric_name.split('.')[1],)
+                table['stats'].append((metric_name, path, submit_method, metric_name_alias))
+            elif not metric_name.startswith('stats'):
+                path = tuple(metric_name.split('.'))
+                table['status'].append((metric_name, path, submit_method, metric_name_alias))
+
+        for metric_name in self.TOP_METRICS:
+            if metric_name in metrics_to_collect:
+                submit_method, metric_name_alias = self._resolve_metric(metric_name, metrics_to_collect, prefix="usage")
+                path = tuple(metric_name.split('.'))
+                table['top'].append((metric_name, path, submit_method, metric_name_alias))
+
+        return table
+
     def _resolve_metric(self, original_metric_name, metrics_to_collect, prefix=""):
         """
         Return the submit method and the metric name to use.
@@ -568,8 +614,8 @@ class MongoDb(AgentCheck):
         metric_suffix = "ps" if submit_method == RATE else ""
 
         # Replace case-sensitive metric name characters
-        for pattern, repl in iteritems(self.CASE_SENSITIVE_METRIC_NAME_SUFFIXES):
-            metric_name = re.compile(pattern).sub(repl, metric_name)
+        for pattern, repl in self._case_sensitive_metric_name_suffixes:
+            metric_name = pattern.sub(repl, metric_name)
 
         # Normalize, and wrap
         return u"{metric_prefix}{normalized_metric_name}{metric_suffix}".format(
@@ -578,6 +624,93 @@ class MongoDb(AgentCheck):
             metric_suffix=metric_suffix,
         )
 
+    def _get_client(self, server, timeout, ssl_params, read_preference, replicaset=None):
+        """
+        Returns a MongoClient for the server, reused across runs, and whether it was just created
+        (and needs to be authenticated).
+        """
+        key = (server, timeout, replicaset, tuple(sorted(iteritems(ssl_params))))
+        cli = self._clients.get(key)
+        if cli is not None:
+            return cli, False
+
+        options = {}
+        if replicaset is not None:
+            options['replicaset'] = replicaset
+        options.update(ssl_params)
+        cli = pymongo.mongo_client.MongoClient(
+            server,
+            socketTimeoutMS=timeout,
+            connectTimeoutMS=timeout,
+            serverSelectionTimeoutMS=timeout,
+            read_preference=read_preference,
+            **options
+        )
+        self._clients[key] = cli
+        return cli, True
+
+    def _evict_clients(self, server):
+        """
+        Closes the clients of a server, e.g. when it's unreachable or the authentication failed,
+        so that new ones get created and authenticated during the next run
+        """
+        for key in [key for key in self._clients if key[0] == server]:
+            cli = self._clients.pop(key)
+            try:
+                cli.close()
+            except Exception as e:
+                self.log.debug(u"Failed to close the client of `%s`: %s", key[0], e)
+
+    def _collect_dbstats(self, cli, dbnames, max_workers, timeout):
+        """
+        Runs the `dbstats` command on every database, concurrently with up to `max_workers` commands at once.
+        Databases whose stats can't be retrieved within `timeout` seconds, for all of them, are skipped.
+        """
+        dbstats = {}
+        deadline = time.time() + timeout
+        # The server aborts the commands still running at the deadline, freeing the workers waiting for them
+        max_time_ms = max(int(timeout * 1000), 1)
+        if max_workers <= 1 or len(dbnames) <= 1:
+            for db_n in dbnames:
+                # Each command only gets the time left until the deadline
+                stats, error = self._run_dbstats(cli, db_n, max(int((deadline - time.time()) * 1000), 1))
+                if error is not None:
+                    self.log.warning(u"Failed to collect the stats of database `%s`: %s", db_n, error)
+                    continue
+                dbstats[db_n] = {'stats': stats}
+            return dbstats
+
+        timed_out = False
+        pool = Pool(min(max_workers, len(dbnames)))
+        try:
+            results = [(db_n, pool.apply_async(self._run_dbstats, (cli, db_n, max_time_ms))) for db_n in dbnames]
+            for db_n, result in results:
+                try:
+                    stats, error = result.get(max(deadline - time.time(), 0))
+                except Exception as e:
+                    # Timed out
+                    stats, error = None, e
+                    timed_out = True
+
+                if error is not None:
+                    self.log.warning(u"Failed to collect the stats of database `%s`: %s", db_n, error)
+                    continue
+                dbstats[db_n] = {'stats': stats}
+        finally:
+            pool.terminate()
+            # Workers still waiting for a command exit once it completes or is aborted, don't wait for them
+            if not timed_out:
+                pool.join()
+
+        return dbstats
+
+    @staticmethod
+    def _run_dbstats(cli, db_name, max_time_ms):
+        try:
+            return cli[db_name].command('dbstats', maxTimeMS=max_time_ms), None
+        except Exception as e:
+            return None, e
+
     def _authenticate(self, database, username, password, use_x509, server_name, service_check_tags):
         """
         Authenticate to the database.
@@ -806,6 +939,7 @@ class MongoDb(AgentCheck):
         # Get the list of metrics to collect
         collect_tcmalloc_metrics = 'tcmalloc' in additional_metrics
         metrics_to_collect = self._get_metrics_to_collect(server, additional_metrics)
+        metric_table = self._get_metric_table(server, metrics_to_collect)
 
         # Tagging
         tags = instance.get('tags', [])
@@ -829,15 +963,10 @@ class MongoDb(AgentCheck):
             service_check_tags = service_check_tags + ["host:%s" % host, "port:%s" % port]
 
         timeout = float(instance.get('timeout', DEFAULT_TIMEOUT)) * 1000
+        dbstats_timeout = float(instance.get('dbstats_timeout', instance.get('timeout', DEFAULT_TIMEOUT)))
+        dbstats_max_workers = int(instance.get('dbstats_max_workers', DEFAULT_DBSTATS_MAX_WORKERS))
         try:
-            cli = pymongo.mongo_client.MongoClient(
-                server,
-                socketTimeoutMS=timeout,
-                connectTimeoutMS=timeout,
-                serverSelectionTimeoutMS=timeout,
-                read_preference=pymongo.ReadPreference.PRIMARY_PREFERRED,
-                **ssl_params
-            )
+            cli, new_client = self._get_client(server, timeout, ssl_params, pymongo.ReadPreference.PRIMARY_PREFERRED)
             # some commands can only go against the admin DB
             admindb = cli['admin']
             db = cli[db_name]
@@ -853,19 +982,26 @@ class MongoDb(AgentCheck):
             self.log.debug(u"A username is required to authenticate to `%s`", server)
             do_auth = False
 
-        if do_auth:
-            if auth_source:
-                msg = "authSource was specified in the the server URL: using '%s' as the authentication database"
-                self.log.info(msg, auth_source)
-                self._authenticate(
-                    cli[auth_source], username, password, use_x509, clean_server_name, service_check_tags
-                )
-            else:
-                self._authenticate(db, username, password, use_x509, clean_server_name, service_check_tags)
+        # Cached clients are already authenticated, and re-authenticate on their own when reconnecting
+        if do_auth and new_client:
+            try:
+                if auth_source:
+                    msg = "authSource was specified in the the server URL: using '%s' as the authentication database"
+                    self.log.info(msg, auth_source)
+                    self._authenticate(
+                        cli[auth_source], username, password, use_x509, clean_server_name, service_check_tags
+                    )
+                else:
+                    self._authenticate(db, username, password, use_x509, clean_server_name, service_check_tags)
+            except Exception:
+                self._evict_clients(server)
+                raise
 
+        # The serverStatus command validates the health of the connection, reused clients are dropped on failure
         try:
             status = db.command('serverStatus', tcmalloc=collect_tcmalloc_metrics)
         except Exception:
+            self._evict_clients(server)
             self.service_check(self.SERVICE_CHECK_NAME, AgentCheck.CRITICAL, tags=service_check_tags)
             raise
         else:
@@ -894,25 +1030,23 @@ class MongoDb(AgentCheck):
 
                     # need a new connection to deal with replica sets
                     setname = replSet.get('set')
-                    cli_rs = pymongo.mongo_client.MongoClient(
-                        server,
-                        socketTimeoutMS=timeout,
-                        connectTimeoutMS=timeout,
-                        serverSelectionTimeoutMS=timeout,
-                        replicaset=setname,
-                        read_preference=pymongo.ReadPreference.NEAREST,
-                        **ssl_params
+                    cli_rs, new_client = self._get_client(
+                        server, timeout, ssl_params, pymongo.ReadPreference.NEAREST, replicaset=setname
                     )
 
-                    if do_auth:
-                        if auth_source:
-                            self._authenticate(
-                                cli_rs[auth_source], username, password, use_x509, server, service_check_tags
-                            )
-                        else:
-                            self._authenticate(
-                                cli_rs[db_name], username, password, use_x509, server, service_check_tags
-                            )
+                    if do_auth and new_client:
+                        try:
+                            if auth_source:
+                                self._authenticate(
+                                    cli_rs[auth_source], username, password, use_x509, server, service_check_tags
+                                )
+                            else:
+                                self._authenticate(
+                                    cli_rs[db_name], username, password, use_x509, server, service_check_tags
+                                )
+                        except Exception:
+                            self._evict_clients(server)
+                            raise
 
                     # Replication set information
                     replset_name = replSet['set']
@@ -973,24 +1107,18 @@ class MongoDb(AgentCheck):
         dbnames = cli.database_names()
         self.gauge('mongodb.dbs', len(dbnames), tags=tags)
 
-        for db_n in dbnames:
-            db_aux = cli[db_n]
-            dbstats[db_n] = {'stats': db_aux.command('dbstats')}
+        dbstats.update(self._collect_dbstats(cli, dbnames, dbstats_max_workers, dbstats_timeout))
 
         # Go through the metrics and save the values
-        for metric_name in metrics_to_collect:
+        for metric_name, path, submit_method, metric_name_alias in metric_table['status']:
             # each metric is of the form: x.y.z with z optional
             # and can be found at status[x][y][z]
             value = status
-
-            if metric_name.startswith('stats'):
+            try:
+                for c in path:
+                    value = value[c]
+            except KeyError:
                 continue
-            else:
-                try:
-                    for c in metric_name.split("."):
-                        value = value[c]
-                except KeyError:
-                    continue
 
             # value is now status[x][y][z]
             if not isinstance(value, (int, long, float)):
@@ -1001,16 +1129,12 @@ class MongoDb(AgentCheck):
                 )
 
             # Submit the metric
-            submit_method, metric_name_alias = self._resolve_metric(metric_name, metrics_to_collect)
             submit_method(self, metric_name_alias, value, tags=tags)
 
         for st, value in iteritems(dbstats):
-            for metric_name in metrics_to_collect:
-                if not metric_name.startswith('stats.'):
-                    continue
-
+            for metric_name, (key,), submit_method, metric_name_alias in metric_table['stats']:
                 try:
-                    val = value['stats'][metric_name.split('.')[1]]
+                    val = value['stats'][key]
                 except KeyError:
                     continue
 
@@ -1028,7 +1152,6 @@ class MongoDb(AgentCheck):
                     u"db:{0}".format(st),
                 ]
 
-                submit_method, metric_name_alias = self._resolve_metric(metric_name, metrics_to_collect)
                 submit_method(self, metric_name_alias, val, tags=metrics_tags)
 
         if is_affirmative(instance.get('collections_indexes_stats')):
@@ -1052,12 +1175,12 @@ class MongoDb(AgentCheck):
                     ns_tags = tags + ["db:%s" % dbname, "collection:%s" % collname]
 
                     # iterate over DBTOP metrics
-                    for m in self.TOP_METRICS:
+                    for m, path, submit_method, metric_name_alias in metric_table['top']:
                         # each metric is of the form: x.y.z with z optional
                         # and can be found at ns_metrics[x][y][z]
                         value = ns_metrics
                         try:
-                            for c in m.split("."):
+                            for c in path:
                                 value = value[c]
                         except Exception:
                             continue
@@ -1071,7 +1194,6 @@ class MongoDb(AgentCheck):
                             )
 
                         # Submit the metric
-                        submit_method, metric_name_alias = self._resolve_metric(m, metrics_to_collect, prefix="usage")
                         submit_method(self, metric_name_alias, value, tags=ns_tags)
                         # Keep old incorrect metric
                         if metric_name_alias.endswith('countps'):
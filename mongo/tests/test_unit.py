@@ -1,6 +1,9 @@
 # (C) Datadog, Inc. 2018-2019
 # All rights reserved
 # Licensed under a 3-clause BSD style license (see LICENSE)
+import threading
+import time
+
 import mock
 import pytest
 from six import iteritems
@@ -140,3 +143,130 @@ def test_server_uri_sanitization(check):
     for server, expected_clean_name in server_names:
         _, _, _, _, clean_name, _ = _parse_uri(server, sanitize_username=True)
         assert expected_clean_name == clean_name
+
+
+def test_client_cache(check):
+    server = 'mongodb://localhost:27017/admin'
+    with mock.patch('pymongo.mongo_client.MongoClient') as mongo_client:
+        mongo_client.side_effect = lambda *args, **kwargs: mock.Mock()
+        cli, new_client = check._get_client(server, 30000, {}, 'primary')
+        assert new_client
+
+        # Clients are reused across runs
+        assert check._get_client(server, 30000, {}, 'primary') == (cli, False)
+
+        # Replica set members get their own client
+        cli_rs, new_client = check._get_client(server, 30000, {}, 'nearest', replicaset='rs0')
+        assert new_client
+        assert cli_rs is not cli
+
+        # Clients are dropped on failure
+        check._evict_clients(server)
+        cli.close.assert_called_once()
+        cli_rs.close.assert_called_once()
+        assert check._get_client(server, 30000, {}, 'primary')[1]
+
+
+@pytest.mark.parametrize('max_workers', [1, 4])
+def test_collect_dbstats(check, max_workers):
+    cli = mock.MagicMock()
+    cli.__getitem__.side_effect = lambda db_name: mock.Mock(command=mock.Mock(return_value={'db': db_name}))
+
+    dbstats = check._collect_dbstats(cli, ['admin', 'local', 'test'], max_workers, 5)
+    assert dbstats == {db_name: {'stats': {'db': db_name}} for db_name in ['admin', 'local', 'test']}
+
+
+@pytest.mark.parametrize('max_workers', [1, 4])
+def test_collect_dbstats_failure(check, max_workers):
+    def get_database(db_name):
+        database = mock.Mock()
+        if db_name == 'broken':
+            database.command.side_effect = Exception('unauthorized')
+        else:
+            database.command.return_value = {'db': db_name}
+        return database
+
+    cli = mock.MagicMock()
+    cli.__getitem__.side_effect = get_database
+    check.log = mock.Mock()
+
+    dbstats = check._collect_dbstats(cli, ['admin', 'broken', 'test'], max_workers, 5)
+    assert sorted(dbstats) == ['admin', 'test']
+    assert check.log.warning.call_count == 1
+
+
+def test_collect_dbstats_timeout(check):
+    """
+    The timeout bounds the collection of all the databases, not of each of them.
+    """
+    release = threading.Event()
+
+    def get_database(db_name):
+        def command(name, maxTimeMS):
+            if db_name.startswith('slow'):
+                release.wait(5)
+            return {'db': db_name, 'maxTimeMS': maxTimeMS}
+
+        return mock.Mock(command=command)
+
+    cli = mock.MagicMock()
+    cli.__getitem__.side_effect = get_database
+    check.log = mock.Mock()
+
+    start = time.time()
+    try:
+        dbstats = check._collect_dbstats(cli, ['admin', 'slow1', 'slow2', 'slow3'], 4, 0.5)
+        elapsed = time.time() - start
+    finally:
+        release.set()
+
+    assert elapsed < 1.5
+    assert dbstats == {'admin': {'stats': {'db': 'admin', 'maxTimeMS': 500}}}
+    assert check.log.warning.call_count == 3
+
+
+def test_collect_dbstats_serial_timeout(check):
+    """
+    The commands run one after the other are aborted by the server at the deadline.
+    """
+    cli = mock.MagicMock()
+    check.log = mock.Mock()
+
+    dbstats = check._collect_dbstats(cli, ['admin'], 1, 0.5)
+    assert dbstats == {'admin': {'stats': cli['admin'].command.return_value}}
+    max_time_ms = cli['admin'].command.call_args[1]['maxTimeMS']
+    assert 0 < max_time_ms <= 500
+
+
+def test_metric_table(check):
+    """
+    Metrics are resolved once per instance into the key paths of their values.
+    """
+    metrics_to_collect = {
+        'foo.bar': (RATE, 'bar.foo'),
+        'locks.Global.acquireCount.R': RATE,
+        'stats.dataSize': GAUGE,
+        'commands.count.total': RATE,
+    }
+    check.TOP_METRICS = {'commands.count.total': RATE, 'commands.remove': RATE}
+
+    table = check._get_metric_table('mongodb://localhost:27017', metrics_to_collect)
+    assert sorted(table['status']) == sorted(
+        [
+            ('commands.count.total', ('commands', 'count', 'total'), RATE, 'mongodb.commands.count.totalps'),
+            ('foo.bar', ('foo', 'bar'), RATE, 'mongodb.bar.foops'),
+            (
+                'locks.Global.acquireCount.R',
+                ('locks', 'Global', 'acquireCount', 'R'),
+                RATE,
+                'mongodb.locks.global.acquirecount.sharedps',
+            ),
+        ]
+    )
+    assert table['stats'] == [('stats.dataSize', ('dataSize',), GAUGE, 'mongodb.stats.datasize')]
+    assert table['top'] == [
+        ('commands.count.total', ('commands', 'count', 'total'), RATE, 'mongodb.usage.commands.count.totalps')
+    ]
+
+    # The table is cached per instance
+    assert check._get_metric_table('mongodb://localhost:27017', {}) is table
@@ -0,0 +1,344 @@
+# (C) Datadog, Inc. 2019
+# All rights reserved
+# Licensed under Simplified BSD License (see LICENSE)
+"""
+Parser of the InnoDB monitor output, as returned by `SHOW ENGINE INNODB STATUS`.
+
+The output is made of sections whose title is surrounded by lines of dashes:
+
+    ----------
+    SEMAPHORES
+    ----------
+    OS WAIT ARRAY INFO: reservation count 68, signal count 65
+    Mutex spin waits 79626940, rounds 157459864, OS waits 698719
+    ...
+
+The parser moves from one section to the next as it reads the lines, only matching each line
+against the compiled patterns of the section it belongs to.
+"""
+import re
+from collections import defaultdict
+
+SEMAPHORES = 'SEMAPHORES'
+TRANSACTIONS = 'TRANSACTIONS'
+FILE_IO = 'FILE I/O'
+INSERT_BUFFER = 'INSERT BUFFER AND ADAPTIVE HASH INDEX'
+LOG = 'LOG'
+BUFFER_POOL = 'BUFFER POOL AND MEMORY'
+ROW_OPERATIONS = 'ROW OPERATIONS'
+
+SECTION_RULE = re.compile(r'^-{3,}$')
+SECTION_TITLE = re.compile(r'^[A-Z][A-Z0-9 /]*$')
+
+# The pending operations of `Pending normal aio reads:` and `aio writes:` are reported as a total,
+# per I/O thread or both, e.g. `0`, `[0, 0, 0, 0]` or `0 [0, 0, 0, 0]`
+AIO_PENDING = r'(\d+)?\s*(?:\[([\d, ]*)\])?'
+
+
+def _set(*names):
+    """
+    Handler storing the groups of the match as the metrics `names`, in order
+    """
+
+    def handler(results, match):
+        for name, value in zip(names, match.groups()):
+            results[name] = int(value)
+
+    return handler
+
+
+def _add(*names):
+    """
+    Handler adding the groups of the match to the metrics `names`, in order
+    """
+
+    def handler(results, match):
+        for name, value in zip(names, match.groups()):
+            results[name] += int(value)
+
+    return handler
+
+
+def _semaphore_wait(results, match):
+    results['Innodb_semaphore_waits'] += 1
+    # Only whole seconds are counted
+    results['Innodb_semaphore_wait_time'] += int(float(match.group(1))) * 1000
+
+
+def _transaction(results, match):
+    results['Innodb_current_transactions'] += 1
+    if 'ACTIVE' in match.string:
+        results['Innodb_active_transactions'] += 1
+
+
+def _lock_wait(results, match):
+    results['Innodb_row_lock_time'] += int(match.group(1)) * 1000
+
+
+def _lock_structs(results, match):
+    state, lock_structs = match.groups()
+    results['Innodb_lock_structs'] += int(lock_structs)
+    if state == 'LOCK WAIT ':
+        results['Innodb_locked_transactions'] += 1
+
+
+def _aio_total(total, per_thread):
+    if total is not None:
+        return int(total)
+    if per_thread is not None:
+        return sum(int(value) for value in per_thread.split(',') if value.strip())
+
+
+def _pending_normal_aio(results, match):
+    reads = _aio_total(*match.group(1, 2))
+    writes = _aio_total(*match.group(3, 4))
+    if reads is not None and writes is not None:
+        results['Innodb_pending_normal_aio_reads'] = reads
+        results['Innodb_pending_normal_aio_writes'] = writes
+
+
+def _pending_aio(results, match):
+    # The values are omitted when there are no pending operations
+    results['Innodb_pending_ibuf_aio_reads'] = int(match.group(1) or 0)
+    results['Innodb_pending_aio_log_ios'] = int(match.group(2) or 0)
+    results['Innodb_pending_aio_sync_ios'] = int(match.group(3) or 0)
+
+
+def _ibuf(results, match):
+    size, free_list, segment_size, merges = match.groups()
+    results['Innodb_ibuf_size'] = int(size)
+    results['Innodb_ibuf_free_list'] = int(free_list)
+    results['Innodb_ibuf_segment_size'] = int(segment_size)
+    if merges is not None:
+        results['Innodb_ibuf_merges'] = int(merges)
+
+
+def _ibuf_merged_operations(results, match):
+    inserts, delete_marks, deletes = (int(value) for value in match.groups())
+    results['Innodb_ibuf_merged_inserts'] = inserts
+    results['Innodb_ibuf_merged_delete_marks'] = delete_marks
+    results['Innodb_ibuf_merged_deletes'] = deletes
+    results['Innodb_ibuf_merged'] = inserts + delete_marks + deletes
+
+
+def _hash_table(results, match):
+    results['Innodb_hash_index_cells_total'] = int(match.group(1))
+    # Some versions omit the used cells
+    results['Innodb_hash_index_cells_used'] = int(match.group(2) or 0)
+
+
+# Patterns matched at the start of the stripped lines of each section, along with the handler of their match.
+# Only the first pattern matching a line is handled.
+SECTION_PATTERNS = {
+    SEMAPHORES: [
+        # Mutex spin waits 79626940, rounds 157459864, OS waits 698719
+        (
+            r'Mutex spin waits (\d+), rounds (\d+), OS waits (\d+)',
+            _set('Innodb_mutex_spin_waits', 'Innodb_mutex_spin_rounds', 'Innodb_mutex_os_waits'),
+        ),
+        # Pre 5.5.17: RW-shared spins 3859028, OS waits 2100750; RW-excl spins 4641946, OS waits 1530310
+        (
+            r'RW-shared spins (\d+), OS waits (\d+); RW-excl spins (\d+), OS waits (\d+)',
+            _set(
+                'Innodb_s_lock_spin_waits',
+                'Innodb_s_lock_os_waits',
+                'Innodb_x_lock_spin_waits',
+                'Innodb_x_lock_os_waits',
+            ),
+        ),
+        # RW-shared spins 604733, rounds 8107431, OS waits 241268
+        (
+            r'RW-shared spins (\d+), rounds (\d+), OS waits (\d+)',
+            _set('Innodb_s_lock_spin_waits', 'Innodb_s_lock_spin_rounds', 'Innodb_s_lock_os_waits'),
+        ),
+        # RW-excl spins 604733, rounds 8107431, OS waits 241268
+        (
+            r'RW-excl spins (\d+), rounds (\d+), OS waits (\d+)',
+            _set('Innodb_x_lock_spin_waits', 'Innodb_x_lock_spin_rounds', 'Innodb_x_lock_os_waits'),
+        ),
+        # --Thread 907205 has waited at handler/ha_innodb.cc line 7156 for 1.00 seconds the semaphore:
+        (r'--Thread .* for (\d+(?:\.\d+)?) seconds the semaphore:', _semaphore_wait),
+    ],
+    TRANSACTIONS: [
+        # History list length 132
+        (r'History list length (\d+)', _set('Innodb_history_list_length')),
+        # ---TRANSACTION 0, not started, process no 13510, OS thread id 1170446656
+        (r'---TRANSACTION', _transaction),
+        # ------- TRX HAS BEEN WAITING 32 SEC FOR THIS LOCK TO BE GRANTED:
+        (r'------- TRX HAS BEEN WAITING (\d+) SEC', _lock_wait),
+        # mysql tables in use 2, locked 2
+        (r'mysql tables in use (\d+), locked (\d+)', _add('Innodb_tables_in_use', 'Innodb_locked_tables')),
+        # 23 lock struct(s), heap size 3024, undo log entries 27
+        # LOCK WAIT 12 lock struct(s), heap size 3024, undo log entries 5
+        # ROLLING BACK 127539 lock struct(s), heap size 15201832, 4411492 row lock(s), undo log entries 1042488
+        (r'(LOCK WAIT |ROLLING BACK )?(\d+) lock struct\(s\)', _lock_structs),
+    ],
+    FILE_IO: [
+        # 8782182 OS file reads, 15635445 OS file writes, 947800 OS fsyncs
+        (
+            r'(\d+) OS file reads, (\d+) OS file writes, (\d+) OS fsyncs',
+            _set('Innodb_os_file_reads', 'Innodb_os_file_writes', 'Innodb_os_file_fsyncs'),
+        ),
+        # Pending normal aio reads: 0, aio writes: 0,
+        # Pending normal aio reads: 0 [0, 0, 0, 0] , aio writes: 0 [0, 0, 0, 0] ,
+        # Pending normal aio reads: [0, 0, 0, 0] , aio writes: [0, 0, 0, 0] ,
+        (r'Pending normal aio reads:\s*{0}\s*,\s*aio writes:\s*{0}'.format(AIO_PENDING), _pending_normal_aio),
+        # ibuf aio reads: 0, log i/o's: 0, sync i/o's: 0
+        # ibuf aio reads:, log i/o's:, sync i/o's:
+        (r"ibuf aio reads:\s*(\d*), log i/o's:\s*(\d*), sync i/o's:\s*(\d*)", _pending_aio),
+        # Pending flushes (fsync) log: 0; buffer pool: 0
+        (
+            r'Pending flushes \(fsync\) log: (\d+); buffer pool: (\d+)',
+            _set('Innodb_pending_log_flushes', 'Innodb_pending_buffer_pool_flushes'),
+        ),
+    ],
+    INSERT_BUFFER: [
+        # Older InnoDB code seemed to be ready for an ibuf per tablespace
+        # Ibuf for space 0: size 1, free list len 887, seg size 889, is not empty
+        (
+            r'Ibuf for space 0: size (\d+), free list len (\d+), seg size (\d+)',
+            _set('Innodb_ibuf_size', 'Innodb_ibuf_free_list', 'Innodb_ibuf_segment_size'),
+        ),
+        # Ibuf: size 1, free list len 4634, seg size 4636, 0 merges
+        (r'Ibuf: size (\d+), free list len (\d+), seg size (\d+),(?: (\d+) merges)?', _ibuf),
+        # 19817685 inserts, 19817684 merged recs, 3552620 merges
+        (
+            r'(\d+) inserts, (\d+) merged recs, (\d+) merges',
+            _set('Innodb_ibuf_merged_inserts', 'Innodb_ibuf_merged', 'Innodb_ibuf_merges'),
+        ),
+        # Hash table size 4425293, used cells 4229064, ....
+        # Hash table size 57374437, node heap has 72964 buffer(s)
+        (r'Hash table size (\d+)(?:, used cells (\d+))?', _hash_table),
+    ],
+    LOG: [
+        # 3430041 log i/o's done, 17.44 log i/o's/second
+        (r"(\d+) log i/o's done, ", _set('Innodb_log_writes')),
+        # 0 pending log writes, 0 pending chkp writes
+        (
+            r'(\d+) pending log writes, (\d+) pending chkp writes',
+            _set('Innodb_pending_log_writes', 'Innodb_pending_checkpoint_writes'),
+        ),
+        # This number is NOT printed in hex in InnoDB plugin.
+        # Log sequence number 272588624
+        (r'Log sequence number\s+(\d+)', _set('Innodb_lsn_current')),
+        # Log flushed up to   272588624
+        (r'Log flushed up to\s+(\d+)', _set('Innodb_lsn_flushed')),
+        # Last checkpoint at  272588624
+        (r'Last checkpoint at\s+(\d+)', _set('Innodb_lsn_last_checkpoint')),
+    ],
+    BUFFER_POOL: [
+        # Total memory allocated 29642194944; in additional pool allocated 0
+        (
+            r'Total memory allocated (\d+); in additional pool allocated (\d+)',
+            _set('Innodb_mem_total', 'Innodb_mem_additional_pool'),
+        ),
+        # Adaptive hash index 1538240664     (186998824 + 1351241840)
+        (r'Adaptive hash index (\d+)', _set('Innodb_mem_adaptive_hash')),
+        # Page hash           11688584
+        (r'Page hash\s+(\d+)', _set('Innodb_mem_page_hash')),
+        # Dictionary cache    145525560      (140250984 + 5274576)
+        (r'Dictionary cache\s+(\d+)', _set('Innodb_mem_dictionary')),
+        # File system         313848         (82672 + 231176)
+        (r'File system\s+(\d+)', _set('Innodb_mem_file_system')),
+        # Lock system         29232616       (29219368 + 13248)
+        (r'Lock system\s+(\d+)', _set('Innodb_mem_lock_system')),
+        # Recovery system     0      (0 + 0)
+        (r'Recovery system\s+(\d+)', _set('Innodb_mem_recovery_system')),
+        # Threads             409336         (406936 + 2400)
+        (r'Threads\s+(\d+)', _set('Innodb_mem_thread_hash')),
+        # Buffer pool size        1769471
+        # but not: Buffer pool size, bytes 28991012864
+        (r'Buffer pool size\s+(\d+)', _set('Innodb_buffer_pool_pages_total')),
+        # Free buffers            0
+        (r'Free buffers\s+(\d+)', _set('Innodb_buffer_pool_pages_free')),
+        # Database pages          1696503
+        (r'Database pages\s+(\d+)', _set('Innodb_buffer_pool_pages_data')),
+        # Modified db pages       160602
+        (r'Modified db pages\s+(\d+)', _set('Innodb_buffer_pool_pages_dirty')),
+        # Pages read 15240822, created 1770238, written 21705836
+        # but not: Pages read ahead 0.00/s, evicted without access 0.06/s
+        (
+            r'Pages read (\d+), created (\d+), written (\d+)',
+            _set('Innodb_pages_read', 'Innodb_pages_created', 'Innodb_pages_written'),
+        ),
+    ],
+    ROW_OPERATIONS: [
+        # Number of rows inserted 50678311, updated 66425915, deleted 20605903, read 454561562
+        (
+            r'Number of rows inserted (\d+), updated (\d+), deleted (\d+), read (\d+)',
+            _set('Innodb_rows_inserted', 'Innodb_rows_updated', 'Innodb_rows_deleted', 'Innodb_rows_read'),
+        ),
+        # 0 queries inside InnoDB, 0 queries in queue
+        (
+            r'(\d+) queries inside InnoDB, (\d+) queries in queue',
+            _set('Innodb_queries_inside', 'Innodb_queries_queued'),
+        ),
+        # 1 read views open inside InnoDB
+        (r'(\d+) read views open inside InnoDB', _set('Innodb_read_views')),
+    ],
+}
+
+# Patterns of lines whose meaning depends on the line preceding them, by section and preceding line.
+# Since 5.5, the insert buffer reports both its merged and discarded operations as:
+#   merged operations:
+#    insert 593983, delete mark 387006, delete 73092
+FOLLOWING_LINE_PATTERNS = {
+    (INSERT_BUFFER, 'merged operations:'): (
+        r'insert (\d+), delete mark (\d+), delete (\d+)',
+        _ibuf_merged_operations,
+    )
+}
+
+
+class InnodbStatusParser(object):
+    """
+    Extracts the metrics of the InnoDB monitor output. The patterns are compiled once, the parser
+    is meant to be reused across check runs.
+
+    Only the aggregated buffer pool metrics are collected, the `INDIVIDUAL BUFFER POOL INFO` section
+    reported when there are several buffer pool instances being skipped.
+    """
+
+    def __init__(self):
+        self.section_patterns = {
+            section: [(re.compile(pattern), handler) for pattern, handler in patterns]
+            for section, patterns in SECTION_PATTERNS.items()
+        }
+        self.following_line_patterns = {
+            key: (re.compile(pattern), handler) for key, (pattern, handler) in FOLLOWING_LINE_PATTERNS.items()
+        }
+
+    def parse(self, text):
+        """
+        Returns a defaultdict(int) metric name -> integer value, e.g. {'Innodb_mutex_spin_waits': 79626940}
+        """
+        results = defaultdict(int)
+
+        section = None
+        patterns = ()
+        # The two previous lines, to detect the titles of the sections
+        prev_prev_line = prev_line = ''
+
+        for line in text.splitlines():
+            line = line.strip()
+
+            if SECTION_RULE.match(line) and SECTION_RULE.match(prev_prev_line) and SECTION_TITLE.match(prev_line):
+                section = prev_line
+                patterns = self.section_patterns.get(section, ())
+            else:
+                following = self.following_line_patterns.get((section, prev_line))
+                if following is not None:
+                    pattern, handler = following
+                    match = pattern.match(line)
+                    if match:
+                        handler(results, match)
+                else:
+                    for pattern, handler in patterns:
+                        match = pattern.match(line)
+                        if match:
+                            handler(results, match)
+                            break
+
+            prev_prev_line, prev_line = prev_line, line
+
+        return results
@@ -5,15 +5,20 @@
 from __future__ import division
 
 import re
+import threading
+import time
 import traceback
 from collections import defaultdict
 from contextlib import closing, contextmanager
+from functools import partial
 
 import pymysql
 from six import PY3, iteritems, itervalues, text_type
 
 from datadog_checks.base import AgentCheck, is_affirmative
 
+from .innodb_metrics import InnodbStatusParser
+
 try:
     import psutil
 
@@ -275,6 +280,64 @@ SYNTHETIC_VARS = {
 }
 
 
+class BackgroundQueries(object):
+    """
+    Runs slow queries in a worker thread, at most once per interval, on a connection of its own kept
+    open across runs. The results of the last completed run are returned in the meantime, so that the
+    check runs aren't held up by the queries.
+    """
+
+    def __init__(self, connect, interval, log):
+        """
+        :param connect: function returning a new connection
+        :param interval: minimum number of seconds between the start of two runs
+        """
+        self.connect = connect
+        self.interval = interval
+        self.log = log
+        self.results = {}
+        self._db = None
+        self._thread = None
+        self._last_run = None
+
+    def get_results(self, query):
+        """
+        Returns the results of the last completed run of `query`, a function of the connection returning
+        a dict, after starting a new run if the previous one is done and the interval elapsed since its start.
+        """
+        now = time.time()
+        if self._thread is not None and self._thread.is_alive():
+            self.log.debug("Background queries still running")
+        elif self._last_run is None or now - self._last_run >= self.interval:
+            self._last_run = now
+            self._thread = threading.Thread(target=self._run, args=(query,), name='mysql-background-queries')
+            self._thread.daemon = True
+            self._thread.start()
+
+        return self.results
+
+    def _run(self, query):
+        try:
+            if self._db is None:
+                self._db = self.connect()
+            else:
+                # The server may have closed the connection while it was idle
+                self._db.ping(reconnect=True)
+            self.results = query(self._db)
+        except Exception as e:
+            self.log.warning("Unable to run the background queries: %s", e)
+            self.results = {}
+            self.close()
+
+    def close(self):
+        if self._db is not None:
+            try:
+                self._db.close()
+            except Exception:
+                pass
+            self._db = None
+
+
 class MySql(AgentCheck):
     SERVICE_CHECK_NAME = 'mysql.can_connect'
     SLAVE_SERVICE_CHECK_NAME = 'mysql.replication.slave_running'
@@ -284,11 +347,22 @@ class MySql(AgentCheck):
         AgentCheck.__init__(self, name, init_config, agentConfig, instances)
         self.mysql_version = {}
         self.qcache_stats = {}
+        self._innodb_status_parser = InnodbStatusParser()
+        # Runners of the schema queries by host and queries, see the `schema_queries_interval` option
+        self._schema_queries = {}
 
     @classmethod
     def get_library_versions(cls):
         return {'pymysql': pymysql.__version__}
 
+    def cancel(self):
+        """
+        Closes the connections of the schema queries run in the background
+        """
+        for background_queries in itervalues(self._schema_queries):
+            background_queries.close()
+        self._schema_queries = {}
+
     def check(self, instance):
         (
             host,
@@ -310,13 +384,17 @@ class MySql(AgentCheck):
         if not (host and user) and not defaults_file:
             raise Exception("Mysql host and user are needed.")
 
-        with self._connect(host, port, mysql_sock, user, password, defaults_file, ssl, connect_timeout, tags) as db:
+        connect = partial(
+            self._open_connection, host, port, mysql_sock, user, password, defaults_file, ssl, connect_timeout
+        )
+
+        with self._connect(connect, host, port, mysql_sock, defaults_file, tags) as db:
             try:
                 # Metadata collection
                 self._collect_metadata(db)
 
                 # Metric collection
-                self._collect_metrics(db, tags, options, queries, max_custom_queries)
+                self._collect_metrics(db, tags, options, queries, max_custom_queries, connect)
                 self._collect_system_metrics(host, db, tags)
 
                 # keeping track of these:
@@ -380,7 +458,7 @@ class MySql(AgentCheck):
         return hostkey
 
     @contextmanager
-    def _connect(self, host, port, mysql_sock, user, password, defaults_file, ssl, connect_timeout, tags):
+    def _connect(self, connect, host, port, mysql_sock, defaults_file, tags):
         self.service_check_tags = [
             'server:%s' % (mysql_sock if mysql_sock != '' else host),
             'port:%s' % ('unix_socket' if port == 0 else port),
@@ -391,21 +469,9 @@ class MySql(AgentCheck):
 
         db = None
         try:
-            ssl = dict(ssl) if ssl else None
-
-            if defaults_file != '':
-                db = pymysql.connect(read_default_file=defaults_file, ssl=ssl, connect_timeout=connect_timeout)
-            elif mysql_sock != '':
+            if defaults_file == '' and mysql_sock != '':
                 self.service_check_tags = ['server:{0}'.format(mysql_sock), 'port:unix_socket'] + tags
-                db = pymysql.connect(
-                    unix_socket=mysql_sock, user=user, passwd=password, connect_timeout=connect_timeout
-                )
-            elif port:
-                db = pymysql.connect(
-                    host=host, port=port, user=user, passwd=password, ssl=ssl, connect_timeout=connect_timeout
-                )
-            else:
-                db = pymysql.connect(host=host, user=user, passwd=password, ssl=ssl, connect_timeout=connect_timeout)
+            db = connect()
             self.log.debug("Connected to MySQL")
             self.service_check_tags = list(set(self.service_check_tags))
             self.service_check(self.SERVICE_CHECK_NAME, AgentCheck.OK, tags=self.service_check_tags)
@@ -417,7 +483,21 @@ class MySql(AgentCheck):
             if db:
                 db.close()
 
-    def _collect_metrics(self, db, tags, options, queries, max_custom_queries):
+    def _open_connection(self, host, port, mysql_sock, user, password, defaults_file, ssl, connect_timeout):
+        ssl = dict(ssl) if ssl else None
+
+        if defaults_file != '':
+            return pymysql.connect(read_default_file=defaults_file, ssl=ssl, connect_timeout=connect_timeout)
+        elif mysql_sock != '':
+            return pymysql.connect(unix_socket=mysql_sock, user=user, passwd=password, connect_timeout=connect_timeout)
+        elif port:
+            return pymysql.connect(
+                host=host, port=port, user=user, passwd=password, ssl=ssl, connect_timeout=connect_timeout
+            )
+        else:
+            return pymysql.connect(host=host, user=user, passwd=password, ssl=ssl, connect_timeout=connect_timeout)
+
+    def _collect_metrics(self, db, tags, options, queries, max_custom_queries, connect=None):
 
         # Get aggregate of all VARS we want to collect
         metrics = STATUS_VARS
@@ -521,16 +601,26 @@ class MySql(AgentCheck):
 
         performance_schema_enabled = self._get_variable_enabled(results, 'performance_schema')
         above_560 = self._version_compatible(db, (5, 6, 0))
-        if is_affirmative(options.get('extra_performance_metrics', False)) and above_560 and performance_schema_enabled:
-            # report avg query response time per schema to Datadog
-            results['perf_digest_95th_percentile_avg_us'] = self._get_query_exec_time_95th_us(db)
-            results['query_run_time_avg'] = self._query_exec_time_per_schema(db)
-            metrics.update(PERFORMANCE_VARS)
+        performance_metrics = (
+            is_affirmative(options.get('extra_performance_metrics', False)) and above_560 and performance_schema_enabled
+        )
+        schema_size_metrics = is_affirmative(options.get('schema_size_metrics', False))
+        if performance_metrics or schema_size_metrics:
+            query = partial(
+                self._query_schema_results,
+                performance_metrics=performance_metrics,
+                schema_size_metrics=schema_size_metrics,
+            )
+            background_queries = self._get_schema_queries(options, connect, performance_metrics, schema_size_metrics)
+            if background_queries is not None:
+                results.update(background_queries.get_results(query))
+            else:
+                results.update(query(db))
 
-        if is_affirmative(options.get('schema_size_metrics', False)):
-            # report avg query response time per schema to Datadog
-            results['information_schema_size'] = self._query_size_per_schema(db)
-            metrics.update(SCHEMA_VARS)
+            if performance_metrics:
+                metrics.update(PERFORMANCE_VARS)
+            if schema_size_metrics:
+                metrics.update(SCHEMA_VARS)
 
         if is_affirmative(options.get('replication', False)):
             # Get replica stats
@@ -622,6 +712,36 @@ class MySql(AgentCheck):
             if len(queries) > max_custom_queries:
                 self.warning("Maximum number (%s) of custom queries reached.  Skipping the rest." % max_custom_queries)
 
+    def _get_schema_queries(self, options, connect, performance_metrics, schema_size_metrics):
+        """
+        Returns the runner of the schema queries of the instance if they're run in the background,
+        see the `schema_queries_interval` option, None otherwise
+        """
+        interval = int(options.get('schema_queries_interval', 0) or 0)
+        if interval <= 0 or connect is None:
+            return None
+
+        # Instances of the same host may run different queries
+        key = (self._get_host_key(), performance_metrics, schema_size_metrics)
+        background_queries = self._schema_queries.get(key)
+        if background_queries is None:
+            background_queries = self._schema_queries[key] = BackgroundQueries(connect, interval, self.log)
+        return background_queries
+
+    def _query_schema_results(self, db, performance_metrics, schema_size_metrics):
+        """
+        Runs the expensive performance_schema and information_schema queries
+        """
+        results = {}
+        if performance_metrics:
+            # report avg query response time per schema to Datadog
+            results['perf_digest_95th_percentile_avg_us'] = self._get_query_exec_time_95th_us(db)
+            results['query_run_time_avg'] = self._query_exec_time_per_schema(db)
+        if schema_size_metrics:
+            # report the size of each schema to Datadog
+            results['information_schema_size'] = self._query_size_per_schema(db)
+        return results
+
     def _is_master(self, slaves, results):
         # master uuid only collected in slaves
         master_host = self._collect_string('Master_Host', results)
@@ -936,10 +1056,6 @@ class MySql(AgentCheck):
             self.warning("Privileges error accessing the process tables (must grant PROCESS): %s" % str(e))
             return {}
 
-    @classmethod
-    def _are_values_numeric(cls, array):
-        return all(v.isdigit() for v in array)
-
     def _get_stats_from_innodb_status(self, db):
         # There are a number of important InnoDB metrics that are reported in
         # InnoDB status but are not otherwise present as part of the STATUS
@@ -970,291 +1086,7 @@ class MySql(AgentCheck):
         innodb_status = cursor.fetchone()
         innodb_status_text = innodb_status[2]
 
-        results = defaultdict(int)
-
-        # Here we now parse InnoDB STATUS one line at a time
-        # This is heavily inspired by the Percona monitoring plugins work
-        txn_seen = False
-        prev_line = ''
-        # Only return aggregated buffer pool metrics
-        buffer_id = -1
-        for line in innodb_status_text.splitlines():
-            line = line.strip()
-            row = re.split(" +", line)
-            row = [item.strip(',') for item in row]
-            row = [item.strip(';') for item in row]
-            row = [item.strip('[') for item in row]
-            row = [item.strip(']') for item in row]
-
-            if line.startswith('---BUFFER POOL'):
-                buffer_id = long(row[2])
-
-            # SEMAPHORES
-            if line.find('Mutex spin waits') == 0:
-                # Mutex spin waits 79626940, rounds 157459864, OS waits 698719
-                # Mutex spin waits 0, rounds 247280272495, OS waits 316513438
-                results['Innodb_mutex_spin_waits'] = long(row[3])
-                results['Innodb_mutex_spin_rounds'] = long(row[5])
-                results['Innodb_mutex_os_waits'] = long(row[8])
-            elif line.find('RW-shared spins') == 0 and line.find(';') > 0:
-                # RW-shared spins 3859028, OS waits 2100750; RW-excl spins
-                # 4641946, OS waits 1530310
-                results['Innodb_s_lock_spin_waits'] = long(row[2])
-                results['Innodb_x_lock_spin_waits'] = long(row[8])
-                results['Innodb_s_lock_os_waits'] = long(row[5])
-                results['Innodb_x_lock_os_waits'] = long(row[11])
-            elif line.find('RW-shared spins') == 0 and line.find('; RW-excl spins') == -1:
-                # Post 5.5.17 SHOW ENGINE INNODB STATUS syntax
-                # RW-shared spins 604733, rounds 8107431, OS waits 241268
-                results['Innodb_s_lock_spin_waits'] = long(row[2])
-                results['Innodb_s_lock_spin_rounds'] = long(row[4])
-                results['Innodb_s_lock_os_waits'] = long(row[7])
-            elif line.find('RW-excl spins') == 0:
-                # Post 5.5.17 SHOW ENGINE INNODB STATUS syntax
-                # RW-excl spins 604733, rounds 8107431, OS waits 241268
-                results['Innodb_x_lock_spin_waits'] = long(row[2])
-                results['Innodb_x_lock_spin_rounds'] = long(row[4])
-                results['Innodb_x_lock_os_waits'] = long(row[7])
-            elif line.find('seconds the semaphore:') > 0:
-                # --Thread 907205 has waited at handler/ha_innodb.cc line 7156 for 1.00 seconds the semaphore:
-                results['Innodb_semaphore_waits'] += 1
-                results['Innodb_semaphore_wait_time'] += long(float(row[9])) * 1000
-
-            # TRANSACTIONS
-            elif line.find('Trx id counter') == 0:
-                # The beginning of the TRANSACTIONS section: start counting
-                # transactions
-                # Trx id counter 0 1170664159
-                # Trx id counter 861B144C
-                txn_seen = True
-            elif line.find('History list length') == 0:
-                # History list length 132
-                results['Innodb_history_list_length'] = long(row[3])
-            elif txn_seen and line.find('---TRANSACTION') == 0:
-                # ---TRANSACTION 0, not started, process no 13510, OS thread id 1170446656
-                results['Innodb_current_transactions'] += 1
-                if line.find('ACTIVE') > 0:
-                    results['Innodb_active_transactions'] += 1
-            elif txn_seen and line.find('------- TRX HAS BEEN') == 0:
-                # ------- TRX HAS BEEN WAITING 32 SEC FOR THIS LOCK TO BE GRANTED:
-                results['Innodb_row_lock_time'] += long(row[5]) * 1000
-            elif line.find('read views open inside InnoDB') > 0:
-                # 1 read views open inside InnoDB
-                results['Innodb_read_views'] = long(row[0])
-            elif line.find('mysql tables in use') == 0:
-                # mysql tables in use 2, locked 2
-                results['Innodb_tables_in_use'] += long(row[4])
-                results['Innodb_locked_tables'] += long(row[6])
-            elif txn_seen and line.find('lock struct(s)') > 0:
-                # 23 lock struct(s), heap size 3024, undo log entries 27
-                # LOCK WAIT 12 lock struct(s), heap size 3024, undo log entries 5
-                # LOCK WAIT 2 lock struct(s), heap size 368
-                if line.find('LOCK WAIT') == 0:
-                    results['Innodb_lock_structs'] += long(row[2])
-                    results['Innodb_locked_transactions'] += 1
-                elif line.find('ROLLING BACK') == 0:
-                    # ROLLING BACK 127539 lock struct(s), heap size 15201832,
-                    # 4411492 row lock(s), undo log entries 1042488
-                    results['Innodb_lock_structs'] += long(row[2])
-                else:
-                    results['Innodb_lock_structs'] += long(row[0])
-
-            # FILE I/O
-            elif line.find(' OS file reads, ') > 0:
-                # 8782182 OS file reads, 15635445 OS file writes, 947800 OS
-                # fsyncs
-                results['Innodb_os_file_reads'] = long(row[0])
-                results['Innodb_os_file_writes'] = long(row[4])
-                results['Innodb_os_file_fsyncs'] = long(row[8])
-            elif line.find('Pending normal aio reads:') == 0:
-                try:
-                    if len(row) == 8:
-                        # (len(row) == 8)  Pending normal aio reads: 0, aio writes: 0,
-                        results['Innodb_pending_normal_aio_reads'] = long(row[4])
-                        results['Innodb_pending_normal_aio_writes'] = long(row[7])
-                    elif len(row) == 14:
-                        # (len(row) == 14) Pending normal aio reads: 0 [0, 0] , aio writes: 0 [0, 0] ,
-                        results['Innodb_pending_normal_aio_reads'] = long(row[4])
-                        results['Innodb_pending_normal_aio_writes'] = long(row[10])
-                    elif len(row) == 16:
-                        # (len(row) == 16) Pending normal aio reads: [0, 0, 0, 0] , aio writes: [0, 0, 0, 0] ,
-                        if self._are_values_numeric(row[4:8]) and self._are_values_numeric(row[11:15]):
-                            results['Innodb_pending_normal_aio_reads'] = (
-                                long(row[4]) + long(row[5]) + long(row[6]) + long(row[7])
-                            )
-                            results['Innodb_pending_normal_aio_writes'] = (
-                                long(row[11]) + long(row[12]) + long(row[13]) + long(row[14])
-                            )
-
-                        # (len(row) == 16) Pending normal aio reads: 0 [0, 0, 0, 0] , aio writes: 0 [0, 0] ,
-                        elif self._are_values_numeric(row[4:9]) and self._are_values_numeric(row[12:15]):
-                            results['Innodb_pending_normal_aio_reads'] = long(row[4])
-                            results['Innodb_pending_normal_aio_writes'] = long(row[12])
-                        else:
-                            self.log.warning("Can't parse result line %s" % line)
-                    elif len(row) == 18:
-                        # (len(row) == 18) Pending normal aio reads: 0 [0, 0, 0, 0] , aio writes: 0 [0, 0, 0, 0] ,
-                        results['Innodb_pending_normal_aio_reads'] = long(row[4])
-                        results['Innodb_pending_normal_aio_writes'] = long(row[12])
-                    elif len(row) == 22:
-                        # (len(row) == 22)
-                        # Pending normal aio reads: 0 [0, 0, 0, 0, 0, 0, 0, 0] , aio writes: 0 [0, 0, 0, 0] ,
-                        results['Innodb_pending_normal_aio_reads'] = long(row[4])
-                        results['Innodb_pending_normal_aio_writes'] = long(row[16])
-                except ValueError as e:
-                    self.log.warning("Can't parse result line %s: %s", line, e)
-            elif line.find('ibuf aio reads') == 0:
-                #  ibuf aio reads: 0, log i/o's: 0, sync i/o's: 0
-                #  or ibuf aio reads:, log i/o's:, sync i/o's:
-                if len(row) == 10:
-                    results['Innodb_pending_ibuf_aio_reads'] = long(row[3])
-                    results['Innodb_pending_aio_log_ios'] = long(row[6])
-                    results['Innodb_pending_aio_sync_ios'] = long(row[9])
-                elif len(row) == 7:
-                    results['Innodb_pending_ibuf_aio_reads'] = 0
-                    results['Innodb_pending_aio_log_ios'] = 0
-                    results['Innodb_pending_aio_sync_ios'] = 0
-            elif line.find('Pending flushes (fsync)') == 0:
-                # Pending flushes (fsync) log: 0; buffer pool: 0
-                results['Innodb_pending_log_flushes'] = long(row[4])
-                results['Innodb_pending_buffer_pool_flushes'] = long(row[7])
-
-            # INSERT BUFFER AND ADAPTIVE HASH INDEX
-            elif line.find('Ibuf for space 0: size ') == 0:
-                # Older InnoDB code seemed to be ready for an ibuf per tablespace.  It
-                # had two lines in the output.  Newer has just one line, see below.
-                # Ibuf for space 0: size 1, free list len 887, seg size 889, is not empty
-                # Ibuf for space 0: size 1, free list len 887, seg size 889,
-                results['Innodb_ibuf_size'] = long(row[5])
-                results['Innodb_ibuf_free_list'] = long(row[9])
-                results['Innodb_ibuf_segment_size'] = long(row[12])
-            elif line.find('Ibuf: size ') == 0:
-                # Ibuf: size 1, free list len 4634, seg size 4636,
-                results['Innodb_ibuf_size'] = long(row[2])
-                results['Innodb_ibuf_free_list'] = long(row[6])
-                results['Innodb_ibuf_segment_size'] = long(row[9])
-
-                if line.find('merges') > -1:
-                    results['Innodb_ibuf_merges'] = long(row[10])
-            elif line.find(', delete mark ') > 0 and prev_line.find('merged operations:') == 0:
-                # Output of show engine innodb status has changed in 5.5
-                # merged operations:
-                # insert 593983, delete mark 387006, delete 73092
-                results['Innodb_ibuf_merged_inserts'] = long(row[1])
-                results['Innodb_ibuf_merged_delete_marks'] = long(row[4])
-                results['Innodb_ibuf_merged_deletes'] = long(row[6])
-                results['Innodb_ibuf_merged'] = (
-                    results['Innodb_ibuf_merged_inserts']
-                    + results['Innodb_ibuf_merged_delete_marks']
-                    + results['Innodb_ibuf_merged_deletes']
-                )
-            elif line.find(' merged recs, ') > 0:
-                # 19817685 inserts, 19817684 merged recs, 3552620 merges
-                results['Innodb_ibuf_merged_inserts'] = long(row[0])
-                results['Innodb_ibuf_merged'] = long(row[2])
-                results['Innodb_ibuf_merges'] = long(row[5])
-            elif line.find('Hash table size ') == 0:
-                # In some versions of InnoDB, the used cells is omitted.
-                # Hash table size 4425293, used cells 4229064, ....
-                # Hash table size 57374437, node heap has 72964 buffer(s) <--
-                # no used cells
-                results['Innodb_hash_index_cells_total'] = long(row[3])
-                results['Innodb_hash_index_cells_used'] = long(row[6]) if line.find('used cells') > 0 else 0
-
-            # LOG
-            elif line.find(" log i/o's done, ") > 0:
-                # 3430041 log i/o's done, 17.44 log i/o's/second
-                # 520835887 log i/o's done, 17.28 log i/o's/second, 518724686
-                # syncs, 2980893 checkpoints
-                results['Innodb_log_writes'] = long(row[0])
-            elif line.find(" pending log writes, ") > 0:
-                # 0 pending log writes, 0 pending chkp writes
-                results['Innodb_pending_log_writes'] = long(row[0])
-                results['Innodb_pending_checkpoint_writes'] = long(row[4])
-            elif line.find("Log sequence number") == 0:
-                # This number is NOT printed in hex in InnoDB plugin.
-                # Log sequence number 272588624
-                results['Innodb_lsn_current'] = long(row[3])
-            elif line.find("Log flushed up to") == 0:
-                # This number is NOT printed in hex in InnoDB plugin.
-                # Log flushed up to   272588624
-                results['Innodb_lsn_flushed'] = long(row[4])
-            elif line.find("Last checkpoint at") == 0:
-                # Last checkpoint at  272588624
-                results['Innodb_lsn_last_checkpoint'] = long(row[3])
-
-            # BUFFER POOL AND MEMORY
-            elif line.find("Total memory allocated") == 0 and line.find("in additional pool allocated") > 0:
-                # Total memory allocated 29642194944; in additional pool allocated 0
-                # Total memory allocated by read views 96
-                results['Innodb_mem_total'] = long(row[3])
-                results['Innodb_mem_additional_pool'] = long(row[8])
-            elif line.find('Adaptive hash index ') == 0:
-                #   Adaptive hash index 1538240664     (186998824 + 1351241840)
-                results['Innodb_mem_adaptive_hash'] = long(row[3])
-            elif line.find('Page hash           ') == 0:
-                #   Page hash           11688584
-                results['Innodb_mem_page_hash'] = long(row[2])
-            elif line.find('Dictionary cache    ') == 0:
-                #   Dictionary cache    145525560      (140250984 + 5274576)
-                results['Innodb_mem_dictionary'] = long(row[2])
-            elif line.find('File system         ') == 0:
-                #   File system         313848         (82672 + 231176)
-                results['Innodb_mem_file_system'] = long(row[2])
-            elif line.find('Lock system         ') == 0:
-                #   Lock system         29232616       (29219368 + 13248)
-                results['Innodb_mem_lock_system'] = long(row[2])
-            elif line.find('Recovery system     ') == 0:
-                #   Recovery system     0      (0 + 0)
-                results['Innodb_mem_recovery_system'] = long(row[2])
-            elif line.find('Threads             ') == 0:
-                #   Threads             409336         (406936 + 2400)
-                results['Innodb_mem_thread_hash'] = long(row[1])
-            elif line.find("Buffer pool size ") == 0:
-                # The " " after size is necessary to avoid matching the wrong line:
-                # Buffer pool size        1769471
-                # Buffer pool size, bytes 28991012864
-                if buffer_id == -1:
-                    results['Innodb_buffer_pool_pages_total'] = long(row[3])
-            elif line.find("Free buffers") == 0:
-                # Free buffers            0
-                if buffer_id == -1:
-                    results['Innodb_buffer_pool_pages_free'] = long(row[2])
-            elif line.find("Database pages") == 0:
-                # Database pages          1696503
-                if buffer_id == -1:
-                    results['Innodb_buffer_pool_pages_data'] = long(row[2])
-
-            elif line.find("Modified db pages") == 0:
-                # Modified db pages       160602
-                if buffer_id == -1:
-                    results['Innodb_buffer_pool_pages_dirty'] = long(row[3])
-            elif line.find("Pages read ahead") == 0:
-                # Must do this BEFORE the next test, otherwise it'll get fooled by this
-                # line from the new plugin:
-                # Pages read ahead 0.00/s, evicted without access 0.06/s
-                pass
-            elif line.find("Pages read") == 0:
-                # Pages read 15240822, created 1770238, written 21705836
-                if buffer_id == -1:
-                    results['Innodb_pages_read'] = long(row[2])
-                    results['Innodb_pages_created'] = long(row[4])
-                    results['Innodb_pages_written'] = long(row[6])
-
-            # ROW OPERATIONS
-            elif line.find('Number of rows inserted') == 0:
-                # Number of rows inserted 50678311, updated 66425915, deleted
-                # 20605903, read 454561562
-                results['Innodb_rows_inserted'] = long(row[4])
-                results['Innodb_rows_updated'] = long(row[6])
-                results['Innodb_rows_deleted'] = long(row[8])
-                results['Innodb_rows_read'] = long(row[10])
-            elif line.find(" queries inside InnoDB, ") > 0:
-                # 0 queries inside InnoDB, 0 queries in queue
-                results['Innodb_queries_inside'] = long(row[0])
-                results['Innodb_queries_queued'] = long(row[4])
-
-            prev_line = line
+        results = self._innodb_status_parser.parse(innodb_status_text)
 
         # We need to calculate this metric separately
         try:
@@ -2,7 +2,9 @@
 # All rights reserved
 # Licensed under a 3-clause BSD style license (see LICENSE)
 import copy
+import os
 import subprocess
+import threading
 from os import environ
 
 import mock
@@ -247,3 +249,124 @@ def test__get_server_pid():
             # the pid should be none but without errors
             assert mysql_check._get_server_pid(None) is None
             assert mysql_check.log.exception.call_count == 0
+
+
+def _mock_innodb_status_db(fixture):
+    with open(os.path.join(common.FIXTURES_DIR, fixture)) as f:
+        innodb_status_text = f.read()
+
+    db = mock.MagicMock()
+    cursor = db.cursor.return_value
+    cursor.rowcount = 1
+    cursor.fetchone.return_value = ('InnoDB', '', innodb_status_text)
+    return db
+
+
+@pytest.mark.unit
+def test__get_stats_from_innodb_status():
+    mysql_check = MySql(common.CHECK_NAME, {}, {})
+    results = mysql_check._get_stats_from_innodb_status(_mock_innodb_status_db('innodb_status_5.7.txt'))
+
+    assert results['Innodb_s_lock_spin_waits'] == '604733'
+    assert results['Innodb_x_lock_spin_rounds'] == '61779'
+    assert results['Innodb_semaphore_waits'] == '2'
+    assert results['Innodb_semaphore_wait_time'] == '3000'
+    assert results['Innodb_history_list_length'] == '132'
+    # The transactions of the deadlock report aren't counted
+    assert results['Innodb_current_transactions'] == '3'
+    assert results['Innodb_active_transactions'] == '2'
+    assert results['Innodb_tables_in_use'] == '3'
+    assert results['Innodb_locked_tables'] == '3'
+    assert results['Innodb_lock_structs'] == '6'
+    assert results['Innodb_locked_transactions'] == '1'
+    assert results['Innodb_row_lock_time'] == '15000'
+    assert results['Innodb_pending_normal_aio_reads'] == '3'
+    assert results['Innodb_pending_normal_aio_writes'] == '3'
+    assert results['Innodb_pending_ibuf_aio_reads'] == '0'
+    assert results['Innodb_os_file_reads'] == '536'
+    assert results['Innodb_ibuf_merged'] == '9'
+    assert results['Innodb_ibuf_merged_inserts'] == '5'
+    assert results['Innodb_hash_index_cells_total'] == '34673'
+    assert results['Innodb_hash_index_cells_used'] == '0'
+    assert results['Innodb_checkpoint_age'] == '9'
+    # Only the aggregated buffer pool metrics are collected
+    assert results['Innodb_buffer_pool_pages_total'] == '16382'
+    assert results['Innodb_buffer_pool_pages_dirty'] == '7'
+    assert results['Innodb_pages_read'] == '490'
+    assert results['Innodb_rows_read'] == '12'
+    assert results['Innodb_read_views'] == '1'
+
+
+@pytest.mark.unit
+def test__get_stats_from_innodb_status_legacy():
+    mysql_check = MySql(common.CHECK_NAME, {}, {})
+    results = mysql_check._get_stats_from_innodb_status(_mock_innodb_status_db('innodb_status_5.1.txt'))
+
+    assert results['Innodb_mutex_spin_waits'] == '79626940'
+    assert results['Innodb_s_lock_os_waits'] == '2100750'
+    assert results['Innodb_x_lock_spin_waits'] == '4641946'
+    assert results['Innodb_lock_structs'] == '127539'
+    assert 'Innodb_locked_transactions' not in results
+    assert results['Innodb_pending_normal_aio_reads'] == '0'
+    assert results['Innodb_pending_aio_sync_ios'] == '5'
+    assert results['Innodb_ibuf_free_list'] == '887'
+    assert results['Innodb_ibuf_merges'] == '3552620'
+    assert results['Innodb_hash_index_cells_used'] == '4229064'
+    assert results['Innodb_mem_total'] == '29642194944'
+    assert results['Innodb_mem_thread_hash'] == '409336'
+    assert results['Innodb_buffer_pool_pages_total'] == '1769471'
+    assert results['Innodb_checkpoint_age'] == '8624'
+
+
+@pytest.mark.unit
+def test__collect_metrics_schema_queries_interval():
+    mysql_check = MySql(common.CHECK_NAME, {}, {})
+    schema_db = mock.MagicMock()
+    connect = mock.MagicMock(return_value=schema_db)
+    query_done = threading.Event()
+
+    def run_query(db):
+        query_done.wait()
+        return {'information_schema_size': {'schema:testdb': 3}}
+
+    query = mock.MagicMock(side_effect=run_query)
+    options = {'schema_queries_interval': 60}
+    mysql_check.host = 'localhost'
+    mysql_check.mysql_sock = ''
+    mysql_check.port = 3306
+    mysql_check.defaults_file = ''
+
+    background_queries = mysql_check._get_schema_queries(options, connect, False, True)
+    assert mysql_check._get_schema_queries(options, connect, False, True) is background_queries
+    assert mysql_check._get_schema_queries({}, connect, False, True) is None
+    # The instances of the same host running other queries have their own runner
+    other_queries = mysql_check._get_schema_queries(options, connect, True, True)
+    assert other_queries is not background_queries
+
+    # The first results are available once the queries completed in the background
+    assert background_queries.get_results(query) == {}
+    # Nothing is started while they're running
+    background_queries._last_run -= 60
+    assert background_queries.get_results(query) == {}
+    query_done.set()
+    background_queries._thread.join()
+    query.assert_called_once_with(schema_db)
+    background_queries._last_run += 60
+
+    # The queries aren't run again before the end of the interval, on the same connection
+    assert background_queries.get_results(query) == {'information_schema_size': {'schema:testdb': 3}}
+    assert query.call_count == 1
+
+    background_queries._last_run -= 60
+    background_queries.get_results(query)
+    background_queries._thread.join()
+    assert query.call_count == 2
+    assert connect.call_count == 1
+    schema_db.ping.assert_called_once_with(reconnect=True)
+
+    # The connections are closed when the check is cancelled
+    with mock.patch.object(other_queries, 'close') as close_other_queries:
+        mysql_check.cancel()
+    schema_db.close.assert_called_once_with()
+    close_other_queries.assert_called_once_with()
+    assert mysql_check._schema_queries == {}
@@ -19,6 +19,8 @@ from datadog_checks.base.utils.common import pattern_filter
 from datadog_checks.base.utils.platform import Platform
 from datadog_checks.base.utils.subprocess_output import SubprocessOutputEmptyError, get_subprocess_output
 
+from .procfs import CounterFileParser, count_socket_states
+
 if PY3:
     long = int
 
@@ -35,6 +37,29 @@ SOLARIS_TCP_METRICS = [
     (re.compile(r"\s*tcpInSegs\s*=\s*(\d+)\s*"), 'system.net.tcp.out_segs'),
 ]
 
+NSTAT_METRICS_NAMES = {
+    'Tcp': {
+        'RetransSegs': 'system.net.tcp.retrans_segs',
+        'InSegs': 'system.net.tcp.in_segs',
+        'OutSegs': 'system.net.tcp.out_segs',
+    },
+    'TcpExt': {
+        'ListenOverflows': 'system.net.tcp.listen_overflows',
+        'ListenDrops': 'system.net.tcp.listen_drops',
+        'TCPBacklogDrop': 'system.net.tcp.backlog_drops',
+        'TCPRetransFail': 'system.net.tcp.failed_retransmits',
+    },
+    'Udp': {
+        'InDatagrams': 'system.net.udp.in_datagrams',
+        'NoPorts': 'system.net.udp.no_ports',
+        'InErrors': 'system.net.udp.in_errors',
+        'OutDatagrams': 'system.net.udp.out_datagrams',
+        'RcvbufErrors': 'system.net.udp.rcv_buf_errors',
+        'SndbufErrors': 'system.net.udp.snd_buf_errors',
+        'InCsumErrors': 'system.net.udp.in_csum_errors',
+    },
+}
+
 
 class Network(AgentCheck):
 
@@ -49,12 +74,16 @@ class Network(AgentCheck):
         if instances is not None and len(instances) > 1:
             raise Exception("Network check only supports one configured instance.")
 
+        # The positions of the counters in /proc/net/netstat and /proc/net/snmp are cached across runs
+        self._nstat_parser = CounterFileParser(NSTAT_METRICS_NAMES)
+
     def check(self, instance):
         if instance is None:
             instance = {}
 
         self._excluded_ifaces = instance.get('excluded_interfaces', [])
         self._collect_cx_state = instance.get('collect_connection_state', False)
+        self._collect_cx_state_from_procfs = instance.get('collect_connection_state_from_procfs', False)
         self._collect_rate_metrics = instance.get('collect_rate_metrics', True)
         self._collect_count_metrics = instance.get('collect_count_metrics', False)
 
@@ -279,14 +308,17 @@ class Network(AgentCheck):
         """
         _check_linux can be run inside a container and still collects the network metrics from the host
         For that procfs_path can be set to something like "/host/proc"
-        When a custom procfs_path is set, the collect_connection_state option is ignored
+        When a custom procfs_path is set, the collect_connection_state option is ignored,
+        unless collect_connection_state_from_procfs is set as well
         """
         proc_location = self.agentConfig.get('procfs_path', '/proc').rstrip('/')
         custom_tags = instance.get('tags', [])
 
         net_proc_base_location = self._get_net_proc_base_location(proc_location)
 
-        if self._is_collect_cx_state_runnable(net_proc_base_location):
+        if self._collect_cx_state and self._collect_cx_state_from_procfs:
+            self._cx_state_procfs(net_proc_base_location, custom_tags)
+        elif self._is_collect_cx_state_runnable(net_proc_base_location):
             try:
                 self.log.debug("Using `ss` to collect connection state")
                 # Try using `ss` for increased performance over `netstat`
@@ -365,54 +397,16 @@ class Network(AgentCheck):
         for f in ['netstat', 'snmp']:
             proc_data_path = "{}/net/{}".format(net_proc_base_location, f)
             try:
-                with open(proc_data_path, 'r') as netstat:
-                    while True:
-                        n_header = netstat.readline()
-                        if not n_header:
-                            break  # No more? Abort!
-                        n_data = netstat.readline()
-
-                        h_parts = n_header.strip().split(' ')
-                        h_values = n_data.strip().split(' ')
-                        ns_category = h_parts[0][:-1]
-                        netstat_data[ns_category] = {}
-                        # Turn the data into a dictionary
-                        for idx, hpart in enumerate(h_parts[1:]):
-                            netstat_data[ns_category][hpart] = h_values[idx + 1]
+                netstat_data.update(self._nstat_parser.parse(proc_data_path))
             except IOError:
                 # On Openshift, /proc/net/snmp is only readable by root
                 self.log.debug("Unable to read %s.", proc_data_path)
 
-        nstat_metrics_names = {
-            'Tcp': {
-                'RetransSegs': 'system.net.tcp.retrans_segs',
-                'InSegs': 'system.net.tcp.in_segs',
-                'OutSegs': 'system.net.tcp.out_segs',
-            },
-            'TcpExt': {
-                'ListenOverflows': 'system.net.tcp.listen_overflows',
-                'ListenDrops': 'system.net.tcp.listen_drops',
-                'TCPBacklogDrop': 'system.net.tcp.backlog_drops',
-                'TCPRetransFail': 'system.net.tcp.failed_retransmits',
-            },
-            'Udp': {
-                'InDatagrams': 'system.net.udp.in_datagrams',
-                'NoPorts': 'system.net.udp.no_ports',
-                'InErrors': 'system.net.udp.in_errors',
-                'OutDatagrams': 'system.net.udp.out_datagrams',
-                'RcvbufErrors': 'system.net.udp.rcv_buf_errors',
-                'SndbufErrors': 'system.net.udp.snd_buf_errors',
-                'InCsumErrors': 'system.net.udp.in_csum_errors',
-            },
-        }
-
-        # Skip the first line, as it's junk
-        for k in nstat_metrics_names:
-            for met in nstat_metrics_names[k]:
-                if met in netstat_data.get(k, {}):
-                    self._submit_netmetric(
-                        nstat_metrics_names[k][met], self._parse_value(netstat_data[k][met]), tags=custom_tags
-                    )
+        for category, metric_names in iteritems(NSTAT_METRICS_NAMES):
+            category_data = netstat_data.get(category, {})
+            for counter, metric in iteritems(metric_names):
+                if counter in category_data:
+                    self._submit_netmetric(metric, self._parse_value(category_data[counter]), tags=custom_tags)
 
         # Get the conntrack -S information
         conntrack_path = instance.get('conntrack_path')
@@ -493,6 +487,32 @@ class Network(AgentCheck):
         except SubprocessOutputEmptyError:
             self.log.debug("Couldn't use {} to get conntrack stats".format(conntrack_path))
 
+    def _cx_state_procfs(self, net_proc_base_location, tags):
+        """
+        Count the connections by state from the /proc/net/{tcp,tcp6,udp,udp6} socket tables,
+        without spawning `ss` or `netstat`, so a custom procfs_path is supported
+        """
+        metrics = self._get_metrics()
+        for ip_version, suffix in (('4', ''), ('6', '6')):
+            tcp_path = "{}/net/tcp{}".format(net_proc_base_location, suffix)
+            try:
+                for state, count in iteritems(count_socket_states(tcp_path)):
+                    if state in self.tcp_states['netstat']:
+                        metrics[self.cx_state_gauge['tcp' + ip_version, self.tcp_states['netstat'][state]]] += count
+            except IOError:
+                # e.g. without IPv6 support
+                self.log.debug("Unable to read %s.", tcp_path)
+
+            udp_path = "{}/net/udp{}".format(net_proc_base_location, suffix)
+            try:
+                count = sum(itervalues(count_socket_states(udp_path)))
+                metrics[self.cx_state_gauge['udp' + ip_version, 'connections']] = count
+            except IOError:
+                self.log.debug("Unable to read %s.", udp_path)
+
+        for metric, value in iteritems(metrics):
+            self.gauge(metric, value, tags=tags)
+
     def _get_metrics(self):
         return {val: 0 for val in itervalues(self.cx_state_gauge)}
 
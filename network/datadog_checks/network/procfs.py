@@ -0,0 +1,109 @@
+# (C) Datadog, Inc. 2019
+# All rights reserved
+# Licensed under Simplified BSD License (see LICENSE)
+import re
+from collections import Counter
+
+# Size of the chunks the socket tables are read by, they can hold hundreds of thousands of lines
+READ_CHUNK_SIZE = 1024 * 1024
+
+# Names of the `st` column values of /proc/net/tcp{,6}, as displayed by `netstat`
+# https://github.com/torvalds/linux/blob/v4.19/include/net/tcp_states.h
+TCP_STATES = {
+    b'01': 'ESTABLISHED',
+    b'02': 'SYN_SENT',
+    b'03': 'SYN_RECV',
+    b'04': 'FIN_WAIT1',
+    b'05': 'FIN_WAIT2',
+    b'06': 'TIME_WAIT',
+    b'07': 'CLOSE',
+    b'08': 'CLOSE_WAIT',
+    b'09': 'LAST_ACK',
+    b'0A': 'LISTEN',
+    b'0B': 'CLOSING',
+}
+
+# `   0: 0100007F:BC8F 00000000:0000 0A 00000000:00000000 ...`, capturing the state of the socket
+SOCKET_LINE = re.compile(br'^\s*\d+:\s+\S+\s+\S+\s+([0-9A-F]{2})\s', re.MULTILINE)
+
+
+def count_socket_states(path):
+    """
+    Counts the sockets of a /proc/net/{tcp,tcp6,udp,udp6} table by state in a single pass,
+    reading it by large chunks and matching the lines of each chunk at once.
+
+    Returns a dict netstat state name -> count, e.g. {'ESTABLISHED': 12, 'LISTEN': 3}, states unknown
+    to `TCP_STATES` being kept as their hexadecimal value. Raises IOError if the table can't be read.
+    """
+    counts = Counter()
+    with open(path, 'rb') as table:
+        remainder = b''
+        while True:
+            chunk = table.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+
+            # Only match complete lines, the last one of a chunk may continue in the next one
+            end = chunk.rfind(b'\n') + 1
+            if not end:
+                remainder += chunk
+                continue
+            counts.update(SOCKET_LINE.findall(remainder + chunk[:end]))
+            remainder = chunk[end:]
+
+        if remainder:
+            counts.update(SOCKET_LINE.findall(remainder))
+
+    return {TCP_STATES.get(state, state): count for state, count in counts.items()}
+
+
+class CounterFileParser(object):
+    """
+    Parses the counters files of /proc/net, e.g. `netstat` and `snmp`, made of pairs of lines:
+
+        Tcp: RtoAlgorithm RtoMin RtoMax MaxConn ActiveOpens PassiveOpens AttemptFails ...
+        Tcp: 1 200 120000 -1 2543 107 6 ...
+
+    Only the wanted counters are extracted. Their position in the value line is computed once per
+    header line and cached, as the headers stay the same for the lifetime of the kernel.
+    """
+
+    def __init__(self, wanted):
+        """
+        :param wanted: dict category -> collection of counter names, e.g. {'Tcp': ['RetransSegs']}
+        """
+        self.wanted = wanted
+        self._indexes = {}
+
+    def parse(self, path):
+        """
+        Returns a dict category -> dict counter name -> string value of the wanted counters found in the file.
+        Raises IOError if the file can't be read.
+        """
+        counters = {}
+        with open(path, 'r') as f:
+            lines = f.read().splitlines()
+
+        for header, values in zip(lines[::2], lines[1::2]):
+            category, indexes = self._get_indexes(header)
+            if not indexes:
+                continue
+
+            values = values.split()
+            category_counters = counters.setdefault(category, {})
+            for name, index in indexes:
+                if index < len(values):
+                    category_counters[name] = values[index]
+
+        return counters
+
+    def _get_indexes(self, header):
+        cached = self._indexes.get(header)
+        if cached is None:
+            parts = header.split()
+            category = parts[0][:-1] if parts else ''
+            wanted = self.wanted.get(category, ())
+            # Values are at the same position in their line as the counter names in the header
+            indexes = [(name, i) for i, name in enumerate(parts) if i and name in wanted]
+            cached = self._indexes[header] = (category, indexes)
+        return cached
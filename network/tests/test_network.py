@@ -13,6 +13,7 @@ from six import PY3, iteritems
 
 from datadog_checks.dev import EnvVars
 from datadog_checks.network import Network
+from datadog_checks.network.procfs import count_socket_states
 
 from . import common
 
@@ -123,6 +124,41 @@ def test_cx_state_mocked(is_linux, aggregator, check):
             aggregator.assert_metric(metric, value=value)
 
 
+@mock.patch('datadog_checks.network.network.Platform.is_linux', return_value=True)
+def test_cx_state_procfs(is_linux, aggregator, check):
+    instance = {'collect_connection_state': True, 'collect_connection_state_from_procfs': True}
+    with mock.patch('datadog_checks.network.network.get_subprocess_output') as out:
+        check._get_net_proc_base_location = lambda x: FIXTURE_DIR
+        check.check(instance)
+        out.assert_not_called()
+
+    for metric, value in iteritems(CX_STATE_GAUGES_VALUES):
+        aggregator.assert_metric(metric, value=value)
+
+
+def test_count_socket_states_chunks():
+    path = os.path.join(FIXTURE_DIR, 'net', 'tcp6')
+    expected = {'ESTABLISHED': 1, 'LISTEN': 1, 'CLOSE_WAIT': 1, 'TIME_WAIT': 1}
+    assert count_socket_states(path) == expected
+    # Lines split across chunks are counted once
+    with mock.patch('datadog_checks.network.procfs.READ_CHUNK_SIZE', 7):
+        assert count_socket_states(path) == expected
+
+
+@mock.patch('datadog_checks.network.network.Platform.is_linux', return_value=True)
+def test_proc_net_counters(is_linux, aggregator, check):
+    check._get_net_proc_base_location = lambda x: FIXTURE_DIR
+    for _ in range(2):
+        check.check({})
+        aggregator.assert_metric('system.net.tcp.retrans_segs', value=1138, count=1)
+        aggregator.assert_metric('system.net.tcp.in_segs', value=2756493, count=1)
+        aggregator.assert_metric('system.net.tcp.listen_drops', value=9, count=1)
+        aggregator.assert_metric('system.net.tcp.failed_retransmits', value=1, count=1)
+        aggregator.assert_metric('system.net.udp.no_ports', value=27, count=1)
+        aggregator.assert_metric('system.net.udp.in_csum_errors', value=0, count=1)
+        aggregator.reset()
+
+
 def test_add_conntrack_stats_metrics(aggregator, check):
     mocked_conntrack_stats = (
         "cpu=0 found=27644 invalid=19060 ignore=485633411 insert=0 insert_failed=1 "
@@ -11,6 +11,7 @@ from openstack.config.loader import OpenStackConfig
 from six import iteritems, itervalues
 
 from datadog_checks.base import AgentCheck, is_affirmative
+from datadog_checks.base.checks.libs.thread_pool import Pool
 from datadog_checks.base.utils.common import pattern_filter
 
 from .api import ApiFactory
@@ -24,10 +25,14 @@ from .exceptions import (
     MissingNovaEndpoint,
 )
 from .retry import BackOffRetry
+from .settings import DEFAULT_MAX_CONCURRENT_REQUESTS
 from .utils import traced
 
 SOURCE_TYPE = 'openstack'
 
+# Key of the flavors request among the concurrent diagnostics requests, which are keyed by server id
+FLAVORS_REQUEST_KEY = object()
+
 NOVA_HYPERVISOR_METRICS = [
     'current_workload',
     'disk_available_least',
@@ -207,6 +212,7 @@ class OpenStackControllerCheck(AgentCheck):
         use_shortname=False,
         collect_hypervisor_metrics=True,
         collect_hypervisor_load=False,
+        max_concurrent_requests=1,
     ):
         """
         Submits stats for all hypervisors registered to this control plane
@@ -225,7 +231,17 @@ class OpenStackControllerCheck(AgentCheck):
                 hyp_project_names[hypervisor_hostname].add(server['project_name'])
 
         hypervisors = self.get_os_hypervisors_detail()
+
+        # Load averages take a request per hypervisor, fetch them beforehand
+        loads = None
+        if collect_hypervisor_metrics and collect_hypervisor_load and max_concurrent_requests > 1:
+            loads = self.fetch_concurrently(
+                {hyp['id']: (self.get_loads_for_single_hypervisor, (hyp['id'],)) for hyp in hypervisors},
+                max_concurrent_requests,
+            )
+
         for hyp in hypervisors:
+            prefetched_loads = None if loads is None else loads.get(hyp['id'])
             self.get_stats_for_single_hypervisor(
                 hyp,
                 hyp_project_names,
@@ -233,6 +249,7 @@ class OpenStackControllerCheck(AgentCheck):
                 use_shortname=use_shortname,
                 collect_hypervisor_metrics=collect_hypervisor_metrics,
                 collect_hypervisor_load=collect_hypervisor_load,
+                prefetched_loads=prefetched_loads,
             )
         if not hypervisors:
             self.warning("Unable to collect any hypervisors from Nova response.")
@@ -245,7 +262,11 @@ class OpenStackControllerCheck(AgentCheck):
         use_shortname=False,
         collect_hypervisor_metrics=True,
         collect_hypervisor_load=True,
+        prefetched_loads=None,
     ):
+        """
+        `prefetched_loads` is the (result, error) of `get_loads_for_single_hypervisor` when already fetched
+        """
         hyp_hostname = hyp.get('hypervisor_hostname')
         custom_tags = custom_tags or []
         tags = [
@@ -287,7 +308,10 @@ class OpenStackControllerCheck(AgentCheck):
         # If the Agent is installed on the hypervisors, system.load.1/5/15 is available as a system metric
         if collect_hypervisor_load:
             try:
-                load_averages = self.get_loads_for_single_hypervisor(hyp['id'])
+                if prefetched_loads is None:
+                    load_averages = self.get_loads_for_single_hypervisor(hyp['id'])
+                else:
+                    load_averages = self._get_prefetched(prefetched_loads)
             except Exception as e:
                 self.warning('Unable to get loads averages for hypervisor {}: {}'.format(hyp['id'], e))
                 load_averages = []
@@ -307,8 +331,12 @@ class OpenStackControllerCheck(AgentCheck):
             if tenant_to_name.get(server.get('tenant_id'))
         }
 
-    def update_servers_cache(self, cached_servers, tenant_to_name, changes_since):
-        servers = copy.deepcopy(cached_servers)
+    def update_servers_cache(self, cached_servers, tenant_to_name, changes_since, exclude_server_id_rules=None):
+        """
+        Updates the cached servers in place with the servers changed since the last run
+        """
+        servers = cached_servers
+        exclude_server_id_rules = exclude_server_id_rules or []
 
         query_params = {"all_tenants": True, 'changes-since': changes_since}
         updated_servers = self.get_servers_detail(query_params)
@@ -320,7 +348,9 @@ class OpenStackControllerCheck(AgentCheck):
 
             if updated_server_status == 'ACTIVE':
                 # Add or update the cache
-                if tenant_to_name.get(updated_server.get('tenant_id')):
+                if tenant_to_name.get(updated_server.get('tenant_id')) and not any(
+                    re.match(rule, updated_server_id) for rule in exclude_server_id_rules
+                ):
                     servers[updated_server_id] = self.create_server_object(updated_server, tenant_to_name)
             else:
                 # Remove from the cache if it exists
@@ -375,22 +405,28 @@ class OpenStackControllerCheck(AgentCheck):
         # NOTE: updated_time need to be set at the beginning of this method in order to no miss servers changes.
         changes_since = datetime.utcnow().isoformat()
         if cached_servers is None:
-            updated_servers = self.get_active_servers(tenant_to_name)
+            servers = self.get_active_servers(tenant_to_name)
+
+            # Filter out excluded servers
+            for server_id in list(servers):
+                if any(re.match(rule, server_id) for rule in exclude_server_id_rules):
+                    del servers[server_id]
         else:
+            # Servers are filtered as they're added to the cache
             previous_changes_since = self.servers_cache.get('changes_since')
-            updated_servers = self.update_servers_cache(cached_servers, tenant_to_name, previous_changes_since)
-
-        # Filter out excluded servers
-        servers = {}
-        for updated_server_id, updated_server in iteritems(updated_servers):
-            if not any([re.match(rule, updated_server_id) for rule in exclude_server_id_rules]):
-                servers[updated_server_id] = updated_server
+            servers = self.update_servers_cache(
+                cached_servers, tenant_to_name, previous_changes_since, exclude_server_id_rules
+            )
 
         # Initialize or update cache for this instance
         self.servers_cache = {'servers': servers, 'changes_since': changes_since}
         return servers
 
-    def collect_server_diagnostic_metrics(self, server_details, tags=None, use_shortname=False):
+    def collect_server_diagnostic_metrics(self, server_details, tags=None, use_shortname=False, prefetched_stats=None):
+        """
+        `prefetched_stats` is the (result, error) of `get_server_diagnostics` when already fetched
+        """
+
         def _is_valid_metric(label):
             return label in NOVA_SERVER_METRICS or any(seg in label for seg in NOVA_SERVER_INTERFACE_SEGMENTS)
 
@@ -411,7 +447,10 @@ class OpenStackControllerCheck(AgentCheck):
         project_name = server_details.get('project_name')
 
         try:
-            server_stats = self.get_server_diagnostics(server_id)
+            if prefetched_stats is None:
+                server_stats = self.get_server_diagnostics(server_id)
+            else:
+                server_stats = self._get_prefetched(prefetched_stats)
         except InstancePowerOffFailure:  # 409 response code came back fro nova
             self.log.debug("Server %s is powered off and cannot be monitored", server_id)
             return
@@ -692,6 +731,7 @@ class OpenStackControllerCheck(AgentCheck):
         collect_server_diagnostic_metrics = is_affirmative(instance.get('collect_server_diagnostic_metrics', True))
         collect_server_flavor_metrics = is_affirmative(instance.get('collect_server_flavor_metrics', True))
         use_shortname = is_affirmative(instance.get('use_shortname', False))
+        max_concurrent_requests = int(instance.get('max_concurrent_requests', DEFAULT_MAX_CONCURRENT_REQUESTS))
 
         try:
             # Authenticate and add the instance api to apis cache
@@ -724,18 +764,46 @@ class OpenStackControllerCheck(AgentCheck):
                 use_shortname=use_shortname,
                 collect_hypervisor_metrics=collect_hypervisor_metrics,
                 collect_hypervisor_load=collect_hypervisor_load,
+                max_concurrent_requests=max_concurrent_requests,
             )
 
             if collect_server_diagnostic_metrics or collect_server_flavor_metrics:
-                if collect_server_diagnostic_metrics:
-                    self.log.debug("Fetch stats from %s server(s)" % len(servers))
-                    for server in itervalues(servers):
-                        self.collect_server_diagnostic_metrics(server, tags=custom_tags, use_shortname=use_shortname)
+                # If flavors are not part of servers detail (new in version 2.47) then we need to fetch them
+                fetch_flavors = (
+                    collect_server_flavor_metrics and len(servers) >= 1 and 'flavor_id' in next(itervalues(servers))
+                )
+
+                if collect_server_diagnostic_metrics and max_concurrent_requests > 1:
+                    self.log.debug("Fetch stats from %s server(s) concurrently" % len(servers))
+                    requests_by_key = {server_id: (self.get_server_diagnostics, (server_id,)) for server_id in servers}
+                    if fetch_flavors:
+                        requests_by_key[FLAVORS_REQUEST_KEY] = (self.get_flavors, ())
+                    prefetched = self.fetch_concurrently(requests_by_key, max_concurrent_requests)
+
+                    # The diagnostics that couldn't be fetched are logged as warnings, as when fetched one by one
+                    for server_id, server in iteritems(servers):
+                        self.collect_server_diagnostic_metrics(
+                            server,
+                            tags=custom_tags,
+                            use_shortname=use_shortname,
+                            prefetched_stats=prefetched[server_id],
+                        )
+                else:
+                    prefetched = {}
+                    if collect_server_diagnostic_metrics:
+                        self.log.debug("Fetch stats from %s server(s)" % len(servers))
+                        for server in itervalues(servers):
+                            self.collect_server_diagnostic_metrics(
+                                server, tags=custom_tags, use_shortname=use_shortname
+                            )
+
                 if collect_server_flavor_metrics:
-                    if len(servers) >= 1 and 'flavor_id' in next(itervalues(servers)):
+                    if fetch_flavors:
                         self.log.debug("Fetch server flavors")
-                        # If flavors are not part of servers detail (new in version 2.47) then we need to fetch them
-                        flavors = self.get_flavors()
+                        if FLAVORS_REQUEST_KEY in prefetched:
+                            flavors = self._get_prefetched(prefetched[FLAVORS_REQUEST_KEY])
+                        else:
+                            flavors = self.get_flavors()
                     else:
                         flavors = None
                     for server in itervalues(servers):
@@ -771,6 +839,44 @@ class OpenStackControllerCheck(AgentCheck):
 
         self._backoff.reset_backoff()
 
+    def fetch_concurrently(self, requests_by_key, max_workers):
+        """
+        Runs API requests on a bounded thread pool, each one being limited by the configured request timeout.
+        `requests_by_key` maps keys to (function, args) pairs.
+
+        Returns the dict key -> (result, error) of the requests, their errors are left to the caller.
+        """
+        results = {}
+        if not requests_by_key:
+            return results
+
+        pool = Pool(min(max_workers, len(requests_by_key)))
+        try:
+            async_results = [
+                (key, pool.apply_async(self._fetch, (func, args))) for key, (func, args) in iteritems(requests_by_key)
+            ]
+            for key, async_result in async_results:
+                results[key] = async_result.get()
+        finally:
+            pool.terminate()
+            pool.join()
+
+        return results
+
+    @staticmethod
+    def _fetch(func, args):
+        try:
+            return func(*args), None
+        except Exception as e:
+            return None, e
+
+    @staticmethod
+    def _get_prefetched(prefetched):
+        result, error = prefetched
+        if error is not None:
+            raise error
+        return result
+
     def do_backoff(self, tags):
         backoff_interval, retries = self._backoff.do_backoff()
 
@@ -2,9 +2,11 @@
 # All rights reserved
 # Licensed under Simplified BSD License (see LICENSE)
 import copy
+import re
 
 import mock
 import pytest
+import requests
 from mock import ANY
 
 from datadog_checks.base import AgentCheck
@@ -367,3 +369,92 @@ def test_missing_keystone_server_url():
 
     with pytest.raises(IncompleteConfig):
         check._get_keystone_server_url(instance)
+
+
+def test_fetch_concurrently():
+    check = OpenStackControllerCheck("test", {'ssl_verify': False}, {}, instances=[common.KEYSTONE_INSTANCE])
+    timeout = requests.exceptions.Timeout('Read timed out')
+
+    def get_server_diagnostics(server_id):
+        if server_id == 'broken':
+            raise requests.exceptions.HTTPError('Not found')
+        if server_id == 'slow':
+            raise timeout
+        return {'memory': len(server_id)}
+
+    requests_by_key = {
+        server_id: (get_server_diagnostics, (server_id,)) for server_id in ['a', 'bb', 'broken', 'slow', 'cccc']
+    }
+    results = check.fetch_concurrently(requests_by_key, 2)
+
+    # Errors are returned with the results of the other requests
+    assert results['a'] == ({'memory': 1}, None)
+    assert results['bb'] == ({'memory': 2}, None)
+    assert results['cccc'] == ({'memory': 4}, None)
+    assert results['broken'][0] is None
+    assert isinstance(results['broken'][1], requests.exceptions.HTTPError)
+    assert results['slow'] == (None, timeout)
+
+
+@mock.patch('datadog_checks.openstack_controller.api.ApiFactory.create', return_value=mock.MagicMock(AbstractApi))
+def test_check_server_diagnostics_timeout(mock_api, aggregator):
+    """
+    A server whose diagnostics time out doesn't prevent collecting the other servers and the networks
+    """
+    instance = copy.deepcopy(common.KEYSTONE_INSTANCE)
+    instance['collect_server_flavor_metrics'] = False
+    check = OpenStackControllerCheck("test", {'ssl_verify': False}, {}, instances=[instance])
+    servers = {
+        server_id: {'server_id': server_id, 'server_name': server_id, 'project_name': 'testproj'}
+        for server_id in ['server-1', 'server-2', 'server-3']
+    }
+
+    def get_server_diagnostics(server_id):
+        if server_id == 'server-2':
+            raise requests.exceptions.Timeout('Read timed out')
+        return {'memory': 1024}
+
+    with mock.patch.multiple(
+        check,
+        get_projects=mock.Mock(return_value={}),
+        populate_servers_cache=mock.Mock(return_value=servers),
+        collect_hypervisors_metrics=mock.DEFAULT,
+        get_server_diagnostics=mock.Mock(side_effect=get_server_diagnostics),
+        _get_host_aggregate_tag=mock.Mock(side_effect=lambda *args, **kwargs: []),
+        collect_networks_metrics=mock.DEFAULT,
+        do_backoff=mock.DEFAULT,
+        warning=mock.DEFAULT,
+    ) as mocks:
+        check.check(instance)
+
+    for server_id in ['server-1', 'server-3']:
+        aggregator.assert_metric(
+            'openstack.nova.server.memory',
+            value=1024,
+            tags=['availability_zone:NA', 'nova_managed_server', 'project_name:testproj', 'server_name:' + server_id],
+            hostname=server_id,
+            count=1,
+        )
+    aggregator.assert_metric('openstack.nova.server.memory', count=2)
+    assert mocks['warning'].call_count == 1
+    mocks['collect_networks_metrics'].assert_called_once()
+    mocks['do_backoff'].assert_not_called()
+
+
+@mock.patch(
+    'datadog_checks.openstack_controller.OpenStackControllerCheck.get_servers_detail',
+    return_value=common.MOCK_NOVA_SERVERS,
+)
+def test_populate_servers_cache_in_place(servers_detail, aggregator):
+    check = OpenStackControllerCheck("test", {'ssl_verify': False}, {}, instances=[common.KEYSTONE_INSTANCE])
+    check.servers_cache = copy.deepcopy(common.SERVERS_CACHE_MOCK)
+    cached_servers = check.servers_cache['servers']
+
+    servers = check.populate_servers_cache(
+        {'testproj': {"id": '6f70656e737461636b20342065766572', "name": "testproj"}}, [re.compile('server_newly')]
+    )
+
+    assert servers is cached_servers
+    assert 'server-1' not in servers
+    assert 'server_newly_added' not in servers
+    assert 'other-1' in servers
@@ -10,14 +10,17 @@ import time
 from collections import defaultdict
 
 import psutil
-from six import iteritems
+from six import iteritems, itervalues
 
 from datadog_checks.checks import AgentCheck
 from datadog_checks.config import _is_affirmative
 from datadog_checks.utils.platform import Platform
 
+from .procfs import ProcfsReader
+
 DEFAULT_AD_CACHE_DURATION = 120
 DEFAULT_PID_CACHE_DURATION = 120
+DEFAULT_SHARED_PROCESS_LIST_CACHE_DURATION = 10
 
 
 ATTR_TO_METRIC = {
@@ -53,6 +56,42 @@ ATTR_TO_METRIC_RATE = {
 }
 
 
+class ProcessInfo(object):
+    """
+    Process of the process table snapshot, whose attributes are read at most once
+    per snapshot and only when an instance needs them.
+    """
+
+    __slots__ = ('pid', 'process', '_name', '_cmdline', '_username')
+
+    def __init__(self, process):
+        self.pid = process.pid
+        self.process = process
+        self._name = None
+        self._cmdline = None
+        self._username = None
+
+    # Failures, e.g. psutil.AccessDenied, are not cached: they are raised again on the next access
+
+    def name(self):
+        if self._name is None:
+            self._name = self.process.name()
+        return self._name
+
+    def cmdline(self):
+        """
+        Returns the command line joined in a single string, as searched by `search_string` patterns
+        """
+        if self._cmdline is None:
+            self._cmdline = ' '.join(self.process.cmdline())
+        return self._cmdline
+
+    def username(self):
+        if self._username is None:
+            self._username = self.process.username()
+        return self._username
+
+
 class ProcessCheck(AgentCheck):
     def __init__(self, name, init_config, agentConfig, instances=None):
         AgentCheck.__init__(self, name, init_config, agentConfig, instances)
@@ -73,6 +112,17 @@ class ProcessCheck(AgentCheck):
         self.pid_cache = {}
         self.pid_cache_duration = int(init_config.get('pid_cache_duration', DEFAULT_PID_CACHE_DURATION))
 
+        # The process table is walked once for all the instances, the snapshot is
+        # shared by the instances looking for their PIDs during the same check run
+        self.last_process_table_ts = 0
+        self.process_table = {}
+        self.shared_process_list_cache_duration = int(
+            init_config.get('shared_process_list_cache_duration', DEFAULT_SHARED_PROCESS_LIST_CACHE_DURATION)
+        )
+
+        # Matchers compiled from the `search_string` of each instance, indexed by instance
+        self.matchers = {}
+
         self._conflicting_procfs = False
         self._deprecated_init_procfs = False
         if Platform.is_linux():
@@ -87,6 +137,13 @@ class ProcessCheck(AgentCheck):
         # Process cache, indexed by instance
         self.process_cache = defaultdict(dict)
 
+        # On Linux, the stats can be read straight from procfs rather than through psutil
+        self.use_procfs_reader = Platform.is_linux() and _is_affirmative(init_config.get('use_procfs_reader', False))
+        self._procfs_reader = None
+
+        # Last CPU time of each process read from procfs, indexed by instance
+        self.procfs_cpu_cache = defaultdict(dict)
+
     def should_refresh_ad_cache(self, name):
         now = time.time()
         return now - self.last_ad_cache_ts.get(name, 0) > self.access_denied_cache_duration
@@ -95,6 +152,63 @@ class ProcessCheck(AgentCheck):
         now = time.time()
         return now - self.last_pid_cache_ts.get(name, 0) > self.pid_cache_duration
 
+    def get_process_table(self):
+        """
+        Returns the snapshot of the process table, a dictionary of ProcessInfo indexed by PID
+        """
+        now = time.time()
+        if now - self.last_process_table_ts > self.shared_process_list_cache_duration:
+            self.process_table = {proc.pid: ProcessInfo(proc) for proc in psutil.process_iter()}
+            self.last_process_table_ts = now
+        return self.process_table
+
+    def get_matcher(self, name, search_string, exact_match):
+        """
+        Returns a function telling whether a ProcessInfo matches one of the strings of `search_string`
+        """
+        key = (tuple(search_string), exact_match)
+        cached = self.matchers.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        # FIXME 8.x: All has been deprecated
+        # from the doc, should be removed
+        if 'All' in search_string:
+
+            def matcher(proc):
+                return True
+
+        elif exact_match:
+            if os.name == 'nt':
+                names = {string.lower() for string in search_string}
+
+                def matcher(proc):
+                    return proc.name().lower() in names
+
+            else:
+                names = set(search_string)
+
+                def matcher(proc):
+                    return proc.name() in names
+
+        else:
+            if os.name == 'nt':
+                patterns = [re.compile(string.lower()) for string in search_string]
+
+                def matcher(proc):
+                    cmdline = proc.cmdline().lower()
+                    return any(pattern.search(cmdline) for pattern in patterns)
+
+            else:
+                patterns = [re.compile(string) for string in search_string]
+
+                def matcher(proc):
+                    cmdline = proc.cmdline()
+                    return any(pattern.search(cmdline) for pattern in patterns)
+
+        self.matchers[name] = (key, matcher)
+        return matcher
+
     def find_pids(self, name, search_string, exact_match, ignore_ad=True):
         """
         Create a set of pids of selected processes.
@@ -108,53 +222,31 @@ class ProcessCheck(AgentCheck):
             ad_error_logger = self.log.error
 
         refresh_ad_cache = self.should_refresh_ad_cache(name)
+        matcher = self.get_matcher(name, search_string, exact_match)
 
         matching_pids = set()
 
-        for proc in psutil.process_iter():
+        for proc in itervalues(self.get_process_table()):
             # Skip access denied processes
             if not refresh_ad_cache and proc.pid in self.ad_cache:
                 continue
 
-            found = False
-            for string in search_string:
-                try:
-                    # FIXME 8.x: All has been deprecated
-                    # from the doc, should be removed
-                    if string == 'All':
-                        found = True
-                    if exact_match:
-                        if os.name == 'nt':
-                            if proc.name().lower() == string.lower():
-                                found = True
-                        else:
-                            if proc.name() == string:
-                                found = True
-
-                    else:
-                        cmdline = proc.cmdline()
-                        if os.name == 'nt':
-                            lstring = string.lower()
-                            if re.search(lstring, ' '.join(cmdline).lower()):
-                                found = True
-                        else:
-                            if re.search(string, ' '.join(cmdline)):
-                                found = True
-                except psutil.NoSuchProcess:
-                    self.log.warning('Process disappeared while scanning')
-                except psutil.AccessDenied as e:
-                    ad_error_logger('Access denied to process with PID {}'.format(proc.pid))
-                    ad_error_logger('Error: {}'.format(e))
-                    if refresh_ad_cache:
-                        self.ad_cache.add(proc.pid)
-                    if not ignore_ad:
-                        raise
-                else:
-                    if refresh_ad_cache:
-                        self.ad_cache.discard(proc.pid)
-                    if found:
-                        matching_pids.add(proc.pid)
-                        break
+            try:
+                found = matcher(proc)
+            except psutil.NoSuchProcess:
+                self.log.warning('Process disappeared while scanning')
+            except psutil.AccessDenied as e:
+                ad_error_logger('Access denied to process with PID {}'.format(proc.pid))
+                ad_error_logger('Error: {}'.format(e))
+                if refresh_ad_cache:
+                    self.ad_cache.add(proc.pid)
+                if not ignore_ad:
+                    raise
+            else:
+                if refresh_ad_cache:
+                    self.ad_cache.discard(proc.pid)
+                if found:
+                    matching_pids.add(proc.pid)
 
         self.pid_cache[name] = matching_pids
         self.last_pid_cache_ts[name] = time.time()
@@ -198,25 +290,100 @@ class ProcessCheck(AgentCheck):
         except psutil.AccessDenied:
             self.log.debug("psutil was denied access for method {}".format(method))
             if method == 'num_fds' and Platform.is_unix() and try_sudo:
-                try:
-                    # It is up the agent's packager to grant
-                    # corresponding sudo policy on unix platforms
-                    ls_args = ['sudo', 'ls', '/proc/{}/fd/'.format(process.pid)]
-                    process_ls = subprocess.check_output(ls_args)
-                    result = len(process_ls.splitlines())
-
-                except subprocess.CalledProcessError as e:
-                    self.log.exception(
-                        "trying to retrieve {} with sudo failed with return code {}".format(method, e.returncode)
-                    )
-                except Exception:
-                    self.log.exception("trying to retrieve {} with sudo also failed".format(method))
+                result = self.num_fds_with_sudo(process.pid)
         except psutil.NoSuchProcess:
             self.warning("Process {} disappeared while scanning".format(process.pid))
 
         return result
 
+    def num_fds_with_sudo(self, pid):
+        try:
+            # It is up the agent's packager to grant
+            # corresponding sudo policy on unix platforms
+            ls_args = ['sudo', 'ls', '/proc/{}/fd/'.format(pid)]
+            process_ls = subprocess.check_output(ls_args)
+            return len(process_ls.splitlines())
+        except subprocess.CalledProcessError as e:
+            self.log.exception("trying to retrieve num_fds with sudo failed with return code {}".format(e.returncode))
+        except Exception:
+            self.log.exception("trying to retrieve num_fds with sudo also failed")
+
+    def get_procfs_reader(self):
+        if self._procfs_reader is None or self._procfs_reader.procfs_path != psutil.PROCFS_PATH:
+            self._procfs_reader = ProcfsReader(psutil.PROCFS_PATH)
+        return self._procfs_reader
+
+    def get_process_state_from_procfs(self, name, pids, try_sudo):
+        """
+        Same as `get_process_state`, reading the stats of each process in a single pass over its procfs files
+        """
+        st = defaultdict(list)
+        reader = self.get_procfs_reader()
+        cpu_count = psutil.cpu_count()
+
+        # Remove from cache the processes that are not in `pids`
+        cpu_cache = self.procfs_cpu_cache[name]
+        for pid in set(cpu_cache) - pids:
+            del cpu_cache[pid]
+
+        for pid in pids:
+            st['pids'].append(pid)
+
+            try:
+                stats = reader.read_stats(pid)
+            except psutil.NoSuchProcess:
+                self.warning('Process {} disappeared while scanning'.format(pid))
+                # reset the PID cache now, something changed
+                self.last_pid_cache_ts[name] = 0
+                cpu_cache.pop(pid, None)
+                continue
+
+            if stats['open_fd'] is None and try_sudo:
+                stats['open_fd'] = self.num_fds_with_sudo(pid)
+
+            for attr in (
+                'rss',
+                'vms',
+                'mem_pct',
+                'real',
+                'ctx_swtch_vol',
+                'ctx_swtch_invol',
+                'thr',
+                'open_fd',
+                'r_count',
+                'w_count',
+                'r_bytes',
+                'w_bytes',
+                'minflt',
+                'cminflt',
+                'majflt',
+                'cmajflt',
+            ):
+                st[attr].append(stats[attr])
+
+            now = time.time()
+            create_time = stats['create_time']
+            previous = cpu_cache.get(pid)
+            cpu_cache[pid] = (create_time, stats['cpu_time'], now)
+            # Like psutil, the CPU percentage is only computed from the second sample of a
+            # process, making sure the PID wasn't reused in the meantime
+            if previous is not None and previous[0] == create_time and now > previous[2]:
+                cpu_percent = (stats['cpu_time'] - previous[1]) / (now - previous[2]) * 100
+                st['cpu'].append(cpu_percent)
+                if cpu_count > 0:
+                    st['cpu_norm'].append(cpu_percent / cpu_count)
+                else:
+                    self.log.debug('could not calculate the normalized cpu pct, cpu_count: {}'.format(cpu_count))
+
+            if create_time is not None:
+                st['run_time'].append(now - create_time)
+
+        return st
+
     def get_process_state(self, name, pids, try_sudo):
+        if self.use_procfs_reader:
+            return self.get_process_state_from_procfs(name, pids, try_sudo)
+
         st = defaultdict(list)
 
         # Remove from cache the processes that are not in `pids`
@@ -477,9 +644,12 @@ class ProcessCheck(AgentCheck):
         :return: set of filtered pids
         """
         filtered_pids = set()
+        process_table = self.get_process_table()
         for pid in pids:
             try:
-                proc = psutil.Process(pid)
+                proc = process_table.get(pid)
+                if proc is None:
+                    proc = psutil.Process(pid)
                 if proc.username() == user:
                     self.log.debug("Collecting pid {} belonging to {}".format(pid, user))
                     filtered_pids.add(pid)
@@ -0,0 +1,153 @@
+# (C) Datadog, Inc. 2019
+# All rights reserved
+# Licensed under a 3-clause BSD style license (see LICENSE)
+import errno
+import os
+
+import psutil
+
+# Size of the chunks procfs files are read by, large enough for a single read of most of them
+READ_CHUNK_SIZE = 4096
+
+# Indexes of the fields of /proc/<pid>/stat, counted from the one following the command name
+# http://man7.org/linux/man-pages/man5/proc.5.html
+STAT_MINFLT = 7
+STAT_CMINFLT = 8
+STAT_MAJFLT = 9
+STAT_CMAJFLT = 10
+STAT_UTIME = 11
+STAT_STIME = 12
+STAT_NUM_THREADS = 17
+STAT_STARTTIME = 19
+
+# Lines of /proc/<pid>/status and /proc/<pid>/io, and the stat they hold
+STATUS_FIELDS = {b'voluntary_ctxt_switches': 'ctx_swtch_vol', b'nonvoluntary_ctxt_switches': 'ctx_swtch_invol'}
+IO_FIELDS = {b'syscr': 'r_count', b'syscw': 'w_count', b'read_bytes': 'r_bytes', b'write_bytes': 'w_bytes'}
+
+# Errors meaning the process doesn't exist anymore
+GONE_ERRNOS = (errno.ENOENT, errno.ESRCH)
+# Errors meaning the agent isn't allowed to read the file
+DENIED_ERRNOS = (errno.EACCES, errno.EPERM)
+
+
+class ProcfsReader(object):
+    """
+    Reads the stats of processes straight from procfs on Linux, going through the `stat`, `statm`,
+    `status` and `io` files and the `fd` directory of each process once, instead of calling a psutil
+    accessor (which opens and parses its own files) per stat.
+
+    The stats are the ones collected through psutil, under the same names:
+    rss, vms, real, mem_pct, ctx_swtch_vol, ctx_swtch_invol, thr, open_fd, r_count, w_count, r_bytes,
+    w_bytes, minflt, cminflt, majflt, cmajflt, along with the `cpu_time` (in seconds) and `create_time`
+    (as a timestamp) of the process. A stat that can't be read is None.
+    """
+
+    def __init__(self, procfs_path):
+        self.procfs_path = procfs_path
+        self.page_size = os.sysconf('SC_PAGE_SIZE')
+        self.clock_ticks = os.sysconf('SC_CLK_TCK')
+        self.boot_time = self._read_boot_time()
+        self.total_memory = self._read_total_memory()
+
+    def read_stats(self, pid):
+        """
+        Raises psutil.NoSuchProcess if the process doesn't exist anymore
+        """
+        process_path = '{}/{}'.format(self.procfs_path, pid)
+        try:
+            stat = self._read_file(process_path + '/stat')
+            statm = self._read_file(process_path + '/statm')
+        except (IOError, OSError) as e:
+            if e.errno in GONE_ERRNOS:
+                raise psutil.NoSuchProcess(pid)
+            raise
+
+        stats = {}
+
+        # The command name may contain spaces and parenthesis, the fields start after the last one
+        fields = stat[stat.rfind(b')') + 2 :].split()
+        stats['minflt'] = int(fields[STAT_MINFLT])
+        stats['cminflt'] = int(fields[STAT_CMINFLT])
+        stats['majflt'] = int(fields[STAT_MAJFLT])
+        stats['cmajflt'] = int(fields[STAT_CMAJFLT])
+        stats['thr'] = int(fields[STAT_NUM_THREADS])
+        stats['cpu_time'] = (int(fields[STAT_UTIME]) + int(fields[STAT_STIME])) / float(self.clock_ticks)
+        stats['create_time'] = None
+        if self.boot_time is not None:
+            stats['create_time'] = self.boot_time + int(fields[STAT_STARTTIME]) / float(self.clock_ticks)
+
+        vms, rss, shared = statm.split()[:3]
+        stats['vms'] = int(vms) * self.page_size
+        stats['rss'] = int(rss) * self.page_size
+        stats['real'] = stats['rss'] - int(shared) * self.page_size
+        stats['mem_pct'] = None
+        if self.total_memory:
+            stats['mem_pct'] = stats['rss'] / float(self.total_memory) * 100
+
+        self._read_fields(process_path + '/status', b':', STATUS_FIELDS, stats)
+        self._read_fields(process_path + '/io', b': ', IO_FIELDS, stats)
+
+        try:
+            stats['open_fd'] = len(os.listdir(process_path + '/fd'))
+        except (IOError, OSError) as e:
+            if e.errno not in DENIED_ERRNOS + GONE_ERRNOS:
+                raise
+            stats['open_fd'] = None
+
+        return stats
+
+    def _read_fields(self, path, separator, fields, stats):
+        """
+        Reads the `<name><separator><value>` lines of a file whose name is in `fields`
+        """
+        for stat_name in fields.values():
+            stats[stat_name] = None
+
+        try:
+            content = self._read_file(path)
+        except (IOError, OSError) as e:
+            # Denied for processes of other users, missing without I/O accounting
+            if e.errno not in DENIED_ERRNOS + GONE_ERRNOS:
+                raise
+            return
+
+        for line in content.splitlines():
+            name, _, value = line.partition(separator)
+            stat_name = fields.get(name)
+            if stat_name is not None:
+                stats[stat_name] = int(value)
+
+    def _read_boot_time(self):
+        try:
+            for line in self._read_file('{}/stat'.format(self.procfs_path)).splitlines():
+                if line.startswith(b'btime'):
+                    return float(line.split()[1])
+        except (IOError, OSError):
+            pass
+
+    def _read_total_memory(self):
+        try:
+            for line in self._read_file('{}/meminfo'.format(self.procfs_path)).splitlines():
+                if line.startswith(b'MemTotal:'):
+                    # The value is in kB
+                    return int(line.split()[1]) * 1024
+        except (IOError, OSError):
+            pass
+
+    @staticmethod
+    def _read_file(path):
+        """
+        Reads a whole file with raw system calls, skipping the buffering and decoding of file objects
+        """
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            chunks = []
+            while True:
+                chunk = os.read(fd, READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        finally:
+            os.close(fd)
+
+        return b''.join(chunks)
@@ -2,6 +2,7 @@
 # All rights reserved
 # Licensed under a 3-clause BSD style license (see LICENSE)
 import os
+import sys
 
 import psutil
 import pytest
@@ -9,6 +10,7 @@ from mock import patch
 from six import iteritems
 
 from datadog_checks.process import ProcessCheck
+from datadog_checks.process.procfs import ProcfsReader
 
 from . import common
 
@@ -78,6 +80,25 @@ def test_psutil_wrapper_accessors_fail(aggregator):
     assert 'vms' not in meminfo
 
 
+def test_process_table_shared_by_instances(aggregator):
+    process = ProcessCheck(common.CHECK_NAME, {}, {})
+
+    with patch('psutil.process_iter', wraps=psutil.process_iter) as process_iter:
+        python_pids = process.find_pids('py', ['python'], False)
+        pytest_pids = process.find_pids('pytest', ['.*python.*pytest'], False)
+
+    # The process table is walked once for both instances
+    assert process_iter.call_count == 1
+    assert os.getpid() in python_pids
+    assert os.getpid() in pytest_pids
+
+    # A new snapshot is taken once it is too old
+    process.last_process_table_ts = 0
+    process.last_pid_cache_ts = {}
+    with patch('psutil.process_iter', return_value=[]):
+        assert process.find_pids('py', ['python'], False) == set()
+
+
 def test_ad_cache(aggregator):
     config = {'instances': [{'name': 'python', 'search_string': ['python'], 'ignore_denied_access': 'false'}]}
     process = ProcessCheck(common.CHECK_NAME, {}, {}, config['instances'])
@@ -331,6 +352,68 @@ def test_relocated_procfs(aggregator):
     aggregator.assert_service_check('process.up', count=1, tags=expected_tags)
 
 
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='procfs is only available on Linux')
+def test_procfs_reader(tmpdir):
+    procfs = tmpdir.mkdir('proc')
+    procfs.join('stat').write('cpu  13034 0 18596 380856797 2013 2 2962 0 0 0\nbtime 1448632481\n')
+    procfs.join('meminfo').write('MemTotal:        2048 kB\nMemFree:         1024 kB\n')
+    process = procfs.mkdir('1')
+    # The command name may contain spaces and parenthesis
+    process.join('stat').write('1 (my (proc) name) S 0 1 1 0 -1 0 1 2 3 4 500 300 0 0 20 0 7 0 1000 0 0')
+    process.join('statm').write('10970 300 100 77 0 2242 0')
+    process.join('status').write('Name:\tname\nvoluntary_ctxt_switches:\t5\nnonvoluntary_ctxt_switches:\t6\n')
+    process.join('io').write('rchar: 1\nwchar: 2\nsyscr: 3\nsyscw: 4\nread_bytes: 5\nwrite_bytes: 6\n')
+    process.mkdir('fd').join('0').write('')
+
+    reader = ProcfsReader(str(procfs))
+    stats = reader.read_stats(1)
+
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    clock_ticks = float(os.sysconf('SC_CLK_TCK'))
+    assert stats == {
+        'minflt': 1,
+        'cminflt': 2,
+        'majflt': 3,
+        'cmajflt': 4,
+        'thr': 7,
+        'cpu_time': 800 / clock_ticks,
+        'create_time': 1448632481 + 1000 / clock_ticks,
+        'vms': 10970 * page_size,
+        'rss': 300 * page_size,
+        'real': 200 * page_size,
+        'mem_pct': 300 * page_size / (2048 * 1024.0) * 100,
+        'ctx_swtch_vol': 5,
+        'ctx_swtch_invol': 6,
+        'r_count': 3,
+        'w_count': 4,
+        'r_bytes': 5,
+        'w_bytes': 6,
+        'open_fd': 1,
+    }
+
+    with pytest.raises(psutil.NoSuchProcess):
+        reader.read_stats(2)
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='procfs is only available on Linux')
+def test_check_real_process_procfs_reader(aggregator):
+    instance = {'name': 'py', 'pid': os.getpid()}
+    process = ProcessCheck(common.CHECK_NAME, {'use_procfs_reader': True}, {})
+    expected_tags = generate_expected_tags(instance)
+
+    with patch.object(ProcessCheck, 'psutil_wrapper') as psutil_wrapper:
+        process.check(instance)
+        process.check(instance)
+        psutil_wrapper.assert_not_called()
+
+    for mname in common.PROCESS_METRIC:
+        aggregator.assert_metric(mname, at_least=1, tags=expected_tags)
+    for sname in common.PAGEFAULT_STAT:
+        aggregator.assert_metric('system.processes.mem.page_faults.' + sname, at_least=1, tags=expected_tags)
+    aggregator.assert_metric('system.processes.cpu.pct', count=1, tags=expected_tags)
+    aggregator.assert_metric('system.processes.cpu.normalized_pct', count=1, tags=expected_tags)
+
+
 def test_process_service_check(aggregator):
     process = ProcessCheck(common.CHECK_NAME, {}, {})
 
@@ -13,6 +13,7 @@ from six import iteritems
 from six.moves.urllib.parse import quote_plus, urljoin, urlparse
 
 from datadog_checks.base import AgentCheck, is_affirmative
+from datadog_checks.base.utils.lru import LRUCache
 
 EVENT_TYPE = SOURCE_TYPE_NAME = 'rabbitmq'
 EXCHANGE_TYPE = 'exchanges'
@@ -128,11 +129,57 @@ TAGS_MAP = {
 
 METRIC_SUFFIX = {EXCHANGE_TYPE: "exchange", QUEUE_TYPE: "queue", NODE_TYPE: "node", OVERVIEW_TYPE: "overview"}
 
+# Fields of the listings used by the check, the only ones requested when `restrict_columns` is enabled
+# Nested fields are separated by dots, e.g. `message_stats.ack`
+COLUMNS = {
+    EXCHANGE_TYPE: ['name', 'vhost'] + [path.replace('/', '.') for path, _, _ in EXCHANGE_ATTRIBUTES],
+    QUEUE_TYPE: ['name', 'vhost', 'node', 'policy'] + [path.replace('/', '.') for path, _, _ in QUEUE_ATTRIBUTES],
+    NODE_TYPE: ['name'] + [path.replace('/', '.') for path, _, _ in NODE_ATTRIBUTES],
+    CONNECTION_TYPE: ['vhost', 'state'],
+}
+
+# Listings that can be requested by pages
+PAGINATED_TYPES = (EXCHANGE_TYPE, QUEUE_TYPE)
+# The management API doesn't serve larger pages
+MAX_PAGE_SIZE = 500
+
+# Number of object names whose filtering result is remembered across runs, and of tag lists
+FILTER_CACHE_SIZE = 100000
+TAGS_CACHE_SIZE = 10000
+
 
 class RabbitMQException(Exception):
     pass
 
 
+class ObjectFilter(object):
+    """
+    Matches the names of the objects of a type against the regexes of the configuration,
+    compiled once. The result of each name is remembered across runs as names rarely change.
+    """
+
+    def __init__(self, regexes):
+        self.regexes = [re.compile(regex) for regex in regexes]
+        self._matches = LRUCache(FILTER_CACHE_SIZE)
+
+    def __bool__(self):
+        return bool(self.regexes)
+
+    __nonzero__ = __bool__
+
+    def match(self, name):
+        """
+        Returns None if no regex matches the name, else the match of the first matching regex
+        """
+        return self._matches.get_or_compute(name, self._search)
+
+    def _search(self, name):
+        for regex in self.regexes:
+            match = regex.search(name)
+            if match:
+                return match
+
+
 class RabbitMQ(AgentCheck):
 
     """This check is for gathering statistics from the RabbitMQ
@@ -150,6 +197,9 @@ class RabbitMQ(AgentCheck):
         super(RabbitMQ, self).__init__(name, init_config, instances)
         self.already_alerted = []
         self.cached_vhosts = {}  # this is used to send CRITICAL rabbitmq.aliveness check if the server goes down
+        # Compiled regex filters by object type and regexes
+        self._object_filters = {}
+        self._tags_cache = LRUCache(TAGS_CACHE_SIZE)
 
     def _get_config(self, instance):
         # make sure 'rabbitmq_api_url' is present and get parameters
@@ -283,9 +333,9 @@ class RabbitMQ(AgentCheck):
                     message="Could not contact aliveness API",
                 )
 
-    def _get_data(self, url):
+    def _get_data(self, url, params=None):
         try:
-            r = self.http.get(url)
+            r = self.http.get(url, params=params)
             r.raise_for_status()
             return r.json()
         except RequestException as e:
@@ -293,8 +343,49 @@ class RabbitMQ(AgentCheck):
         except ValueError as e:
             raise RabbitMQException('Cannot parse JSON response from API url: {} {}'.format(url, str(e)))
 
+    def _get_listing(self, instance, url, object_type):
+        """
+        Query a listing of the management API, only asking for the fields used by the check and
+        by pages when configured to
+        """
+        params = {}
+        if is_affirmative(instance.get('restrict_columns', False)):
+            params['columns'] = ','.join(COLUMNS[object_type])
+
+        page_size = min(int(instance.get('page_size', 0)), MAX_PAGE_SIZE)
+        if page_size <= 0 or object_type not in PAGINATED_TYPES:
+            return self._get_data(url, params or None)
+
+        data = []
+        params['page_size'] = page_size
+        page = 1
+        while True:
+            response = self._get_data(url, dict(params, page=page))
+            data.extend(response.get('items', []))
+            # The page count is 0 when there is nothing to list
+            if page >= response.get('page_count', 0):
+                return data
+            page += 1
+
+    def _get_object_filter(self, object_type, regex_filters):
+        key = (object_type, tuple(regex_filters))
+        object_filter = self._object_filters.get(key)
+        if object_filter is None:
+            object_filter = self._object_filters[key] = ObjectFilter(regex_filters)
+        return object_filter
+
     def _filter_list(self, data, explicit_filters, regex_filters, object_type, tag_families):
         if explicit_filters or regex_filters:
+            # Each explicit filter only matches the first object with its name
+            explicit_filters = set(explicit_filters)
+            object_filter = self._get_object_filter(object_type, regex_filters)
+            tag_families = is_affirmative(tag_families)
+            family_key = None
+            if object_type == QUEUE_TYPE:
+                family_key = 'queue_family'
+            elif object_type == EXCHANGE_TYPE:
+                family_key = 'exchange_family'
+
             matching_lines = []
             for data_line in data:
                 name = data_line.get("name")
@@ -303,56 +394,41 @@ class RabbitMQ(AgentCheck):
                     explicit_filters.remove(name)
                     continue
 
-                match_found = False
-                for p in regex_filters:
-                    match = re.search(p, name)
-                    if match:
-                        if is_affirmative(tag_families) and match.groups():
-                            if object_type == QUEUE_TYPE:
-                                data_line["queue_family"] = match.groups()[0]
-                            if object_type == EXCHANGE_TYPE:
-                                data_line["exchange_family"] = match.groups()[0]
+                match = object_filter.match(name) if object_filter else None
+
+                # Absolute names work only for queues and exchanges
+                if match is None and family_key is not None:
+                    absolute_name = '{}/{}'.format(data_line.get("vhost"), name)
+                    if absolute_name in explicit_filters:
                         matching_lines.append(data_line)
-                        match_found = True
-                        break
+                        explicit_filters.remove(absolute_name)
+                        continue
 
-                if match_found:
-                    continue
+                    match = object_filter.match(absolute_name) if object_filter else None
 
-                # Absolute names work only for queues and exchanges
-                if object_type != QUEUE_TYPE and object_type != EXCHANGE_TYPE:
-                    continue
-                absolute_name = '{}/{}'.format(data_line.get("vhost"), name)
-                if absolute_name in explicit_filters:
+                if match is not None:
+                    if tag_families and family_key is not None and match.groups():
+                        data_line[family_key] = match.groups()[0]
                     matching_lines.append(data_line)
-                    explicit_filters.remove(absolute_name)
-                    continue
 
-                for p in regex_filters:
-                    match = re.search(p, absolute_name)
-                    if match:
-                        if is_affirmative(tag_families) and match.groups():
-                            if object_type == QUEUE_TYPE:
-                                data_line["queue_family"] = match.groups()[0]
-                            if object_type == EXCHANGE_TYPE:
-                                data_line["exchange_family"] = match.groups()[0]
-                        matching_lines.append(data_line)
-                        match_found = True
-                        break
-                if match_found:
-                    continue
             return matching_lines
         return data
 
     def _get_tags(self, data, object_type, custom_tags):
-        tags = []
         tag_list = TAGS_MAP[object_type]
-        for t in tag_list:
-            tag = data.get(t)
-            if tag:
-                # FIXME 6.x: remove this suffix or unify (sc doesn't have it)
-                tags.append('{}_{}:{}'.format(TAG_PREFIX, tag_list[t], tag))
-        return tags + custom_tags
+        # The tags of an object only change with its tagged fields, they are built once for all runs
+        key = (object_type, tuple(data.get(t) for t in tag_list), tuple(custom_tags))
+        tags = self._tags_cache.get(key)
+        if tags is None:
+            tags = []
+            for t in tag_list:
+                tag = data.get(t)
+                if tag:
+                    # FIXME 6.x: remove this suffix or unify (sc doesn't have it)
+                    tags.append('{}_{}:{}'.format(TAG_PREFIX, tag_list[t], tag))
+            tags = tags + custom_tags
+            self._tags_cache.set(key, tags)
+        return tags
 
     def get_stats(self, instance, base_url, object_type, max_detailed, filters, limit_vhosts, custom_tags):
         """
@@ -375,11 +451,11 @@ class RabbitMQ(AgentCheck):
             for vhost in limit_vhosts:
                 url = '{}/{}'.format(object_type, quote_plus(vhost))
                 try:
-                    data += self._get_data(urljoin(base_url, url))
+                    data += self._get_listing(instance, urljoin(base_url, url), object_type)
                 except Exception as e:
                     self.log.debug("Couldn't grab queue data from vhost, {}: {}".format(vhost, e))
         else:
-            data = self._get_data(urljoin(base_url, object_type))
+            data = self._get_listing(instance, urljoin(base_url, object_type), object_type)
 
         """ data is a list of nodes or queues:
         data = [
@@ -569,14 +645,14 @@ class RabbitMQ(AgentCheck):
             for vhost in vhosts:
                 url = "vhosts/{}/{}".format(quote_plus(vhost), object_type)
                 try:
-                    data += self._get_data(urljoin(base_url, url))
+                    data += self._get_listing(instance, urljoin(base_url, url), object_type)
                 except Exception as e:
                     # This will happen if there is no connection data to grab
                     self.log.debug("Couldn't grab connection data from vhost, {}: {}".format(vhost, e))
 
         # sometimes it seems to need to fall back to this
         if grab_all_data or not len(data):
-            data = self._get_data(urljoin(base_url, object_type))
+            data = self._get_listing(instance, urljoin(base_url, object_type), object_type)
 
         stats = {vhost: 0 for vhost in vhosts}
         connection_states = defaultdict(int)
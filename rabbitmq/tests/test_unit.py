@@ -7,7 +7,7 @@ import pytest
 import requests
 
 from datadog_checks.rabbitmq import RabbitMQ
-from datadog_checks.rabbitmq.rabbitmq import NODE_TYPE, RabbitMQException
+from datadog_checks.rabbitmq.rabbitmq import NODE_TYPE, QUEUE_TYPE, RabbitMQException
 
 pytestmark = pytest.mark.unit
 
@@ -89,3 +89,66 @@ def test__get_metrics(check, aggregator):
     assert check._get_metrics(data, NODE_TYPE, []) == 3
     assert check._get_metrics(data, NODE_TYPE, [], 2) == 2
     assert check._get_metrics(data, NODE_TYPE, [], 5) == 3
+
+
+@pytest.mark.unit
+def test__filter_list(check):
+    data = [
+        {'name': 'orders', 'vhost': '/'},
+        {'name': 'orders', 'vhost': 'other'},
+        {'name': 'payments.eu', 'vhost': '/'},
+        {'name': 'logs', 'vhost': 'audit'},
+        {'name': 'misc', 'vhost': '/'},
+    ]
+
+    for _ in range(2):
+        lines = [dict(line) for line in data]
+        matching = check._filter_list(lines, ['orders', 'audit/logs'], [r'^(payments)\.'], QUEUE_TYPE, True)
+
+        # Explicit names only match the first queue with that name
+        assert matching == [
+            {'name': 'orders', 'vhost': '/'},
+            {'name': 'payments.eu', 'vhost': '/', 'queue_family': 'payments'},
+            {'name': 'logs', 'vhost': 'audit'},
+        ]
+
+    # Regexes are compiled once and their result is reused across runs
+    object_filter = check._get_object_filter(QUEUE_TYPE, [r'^(payments)\.'])
+    assert object_filter._matches.hits > 0
+
+
+@pytest.mark.unit
+def test__get_listing(check):
+    check._get_data = mock.MagicMock()
+    check._get_data.side_effect = [
+        {'items': [{'name': 'q1'}, {'name': 'q2'}], 'page': 1, 'page_count': 2},
+        {'items': [{'name': 'q3'}], 'page': 2, 'page_count': 2},
+    ]
+
+    instance = {'restrict_columns': True, 'page_size': 2}
+    assert check._get_listing(instance, 'http://example.com/api/queues', QUEUE_TYPE) == [
+        {'name': 'q1'},
+        {'name': 'q2'},
+        {'name': 'q3'},
+    ]
+
+    calls = check._get_data.call_args_list
+    assert [call[0][1]['page'] for call in calls] == [1, 2]
+    params = calls[-1][0][1]
+    assert params['page_size'] == 2
+    assert params['columns'].startswith('name,vhost,node,policy,')
+    assert 'message_stats.ack_details.rate' in params['columns'].split(',')
+
+    # Nodes can't be listed by pages
+    check._get_data.side_effect = [[{'name': 'rabbit@host'}]]
+    assert check._get_listing(instance, 'http://example.com/api/nodes', NODE_TYPE) == [{'name': 'rabbit@host'}]
+
+
+@pytest.mark.unit
+def test__get_tags(check):
+    data = {'name': 'q1', 'vhost': '/', 'node': 'rabbit@host'}
+
+    tags = check._get_tags(data, QUEUE_TYPE, ['foo:bar'])
+    assert sorted(tags) == ['foo:bar', 'rabbitmq_node:rabbit@host', 'rabbitmq_queue:q1', 'rabbitmq_vhost:/']
+    assert check._get_tags(dict(data), QUEUE_TYPE, ['foo:bar']) is tags
+    assert check._get_tags(dict(data, policy='ha'), QUEUE_TYPE, ['foo:bar']) is not tags
@@ -6,7 +6,7 @@ from __future__ import division
 import re
 import time
 from collections import defaultdict
-from copy import deepcopy
+from itertools import islice
 
 import redis
 from six import iteritems
@@ -20,6 +20,24 @@ MAX_SLOW_ENTRIES_KEY = "slowlog-max-len"
 REPL_KEY = 'master_link_status'
 LINK_DOWN_KEY = 'master_link_down_since_seconds'
 
+# Number of keys whose type and length are requested in a single pipeline, also used as the `COUNT` hint of `SCAN`
+DEFAULT_KEYS_BATCH_SIZE = 1000
+
+# Commands returning the length of a key by type
+KEY_LENGTH_COMMANDS = {'list': 'llen', 'set': 'scard', 'zset': 'zcard', 'hash': 'hlen'}
+
+
+def batches(iterable, size):
+    """
+    Yields lists of at most `size` consecutive items of `iterable`
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
 
 class Redis(AgentCheck):
     db_key_pattern = re.compile(r'^db\d+')
@@ -271,61 +289,56 @@ class Redis(AgentCheck):
                 return
             databases = [instance_db]
 
+        batch_size = int(instance.get('keys_batch_size', DEFAULT_KEYS_BATCH_SIZE))
+        max_scanned_keys = int(instance.get('max_scanned_keys', 0))
+        keys_telemetry = is_affirmative(instance.get('keys_telemetry', False))
+        scanned_keys = 0
+
         # maps a key to the total length across databases
         lengths_overall = defaultdict(int)
 
-        # don't overwrite the configured instance, use a copy
-        tmp_instance = deepcopy(instance)
-
         for db in databases:
             lengths = defaultdict(lambda: defaultdict(int))
-            tmp_instance['db'] = db
-            db_conn = self._get_conn(tmp_instance)
+            if db == instance.get('db', 0):
+                db_conn = conn
+            else:
+                # don't overwrite the configured instance, use a copy
+                db_conn = self._get_conn(dict(instance, db=db))
 
             for key_pattern in key_list:
+                if max_scanned_keys and scanned_keys >= max_scanned_keys:
+                    break
+
+                start = time.time()
                 if re.search(r"(?<!\\)[*?[]", key_pattern):
-                    keys = db_conn.scan_iter(match=key_pattern)
+                    keys = db_conn.scan_iter(match=key_pattern, count=batch_size)
                 else:
                     keys = [key_pattern]
 
-                for key in keys:
+                if max_scanned_keys:
+                    keys = islice(keys, max_scanned_keys - scanned_keys)
+
+                pattern_keys = 0
+                for key, key_type, keylen in self._get_key_lengths(db_conn, keys, batch_size):
+                    pattern_keys += 1
                     text_key = ensure_unicode(key)
-                    try:
-                        key_type = ensure_unicode(db_conn.type(key))
-                    except redis.ResponseError:
-                        self.log.info("key {} on remote server; skipping".format(text_key))
-                        continue
-
-                    if key_type == 'list':
-                        keylen = db_conn.llen(key)
-                        lengths[text_key]["length"] += keylen
-                        lengths_overall[text_key] += keylen
-                    elif key_type == 'set':
-                        keylen = db_conn.scard(key)
-                        lengths[text_key]["length"] += keylen
-                        lengths_overall[text_key] += keylen
-                    elif key_type == 'zset':
-                        keylen = db_conn.zcard(key)
-                        lengths[text_key]["length"] += keylen
-                        lengths_overall[text_key] += keylen
-                    elif key_type == 'hash':
-                        keylen = db_conn.hlen(key)
-                        lengths[text_key]["length"] += keylen
-                        lengths_overall[text_key] += keylen
-                    elif key_type == 'string':
-                        # Send 1 if the key exists as a string
-                        lengths[text_key]["length"] += 1
-                        lengths_overall[text_key] += 1
-                    else:
-                        # If the type is unknown, it might be because the key doesn't exist,
-                        # which can be because the list is empty. So always send 0 in that case.
-                        lengths[text_key]["length"] += 0
-                        lengths_overall[text_key] += 0
+                    lengths[text_key]["length"] += keylen
+                    lengths_overall[text_key] += keylen
 
                     # Tagging with key_type since the same key can exist with a
                     # different key_type in another db
                     lengths[text_key]["key_type"] = key_type
 
+                scanned_keys += pattern_keys
+                elapsed = time.time() - start
+                self.log.debug(
+                    "Got the length of %s keys matching %s in db%s in %.3fs", pattern_keys, key_pattern, db, elapsed
+                )
+                if keys_telemetry:
+                    telemetry_tags = tags + ['key_pattern:{}'.format(key_pattern), 'redis_db:db{}'.format(db)]
+                    self.gauge('redis.key.scan_time_ms', round_value(elapsed * 1000, 2), tags=telemetry_tags)
+                    self.gauge('redis.key.scanned', pattern_keys, tags=telemetry_tags)
+
             # Send the metrics for each db in the redis instance.
             for key, total in iteritems(lengths):
                 # Only send non-zeros if tagged per db.
@@ -337,6 +350,12 @@ class Redis(AgentCheck):
                         + ['key:{}'.format(key), 'key_type:{}'.format(total["key_type"]), 'redis_db:db{}'.format(db)],
                     )
 
+        if max_scanned_keys and scanned_keys >= max_scanned_keys:
+            self.warning(
+                "Maximum number of scanned keys ({}) reached, the length of the remaining keys "
+                "isn't collected".format(max_scanned_keys)
+            )
+
         # Warn if a key is missing from the entire redis instance.
         # Send 0 if the key is missing/empty from the entire redis instance.
         for key, total in iteritems(lengths_overall):
@@ -348,6 +367,47 @@ class Redis(AgentCheck):
                 self.gauge('redis.key.length', 0, tags=key_tags)
                 self.warning("{} key not found in redis".format(key))
 
+    def _get_key_lengths(self, conn, keys, batch_size):
+        """
+        Yields the (key, type, length) of `keys`, requesting the types of a batch of keys then their lengths
+        in two pipelines, instead of two round trips per key. The length is 1 for strings and 0 for keys of
+        another type, or that don't exist.
+        """
+        for batch in batches(keys, batch_size):
+            pipeline = conn.pipeline(transaction=False)
+            for key in batch:
+                pipeline.type(key)
+            key_types = pipeline.execute(raise_on_error=False)
+
+            pipeline = conn.pipeline(transaction=False)
+            queued = []
+            for key, key_type in zip(batch, key_types):
+                if isinstance(key_type, redis.ResponseError):
+                    self.log.info("key {} on remote server; skipping".format(ensure_unicode(key)))
+                    continue
+
+                key_type = ensure_unicode(key_type)
+                command = KEY_LENGTH_COMMANDS.get(key_type)
+                if command is not None:
+                    getattr(pipeline, command)(key)
+                    queued.append((key, key_type))
+                elif key_type == 'string':
+                    # Send 1 if the key exists as a string
+                    yield key, key_type, 1
+                else:
+                    # If the type is unknown, it might be because the key doesn't exist,
+                    # which can be because the list is empty. So always send 0 in that case.
+                    yield key, key_type, 0
+
+            if not queued:
+                continue
+
+            for (key, key_type), keylen in zip(queued, pipeline.execute(raise_on_error=False)):
+                if isinstance(keylen, redis.ResponseError):
+                    self.log.info("key {} on remote server; skipping".format(ensure_unicode(key)))
+                    continue
+                yield key, key_type, keylen
+
     def _check_replication(self, info, tags):
         # Save the replication delay for each slave
         for key in info:
@@ -57,3 +57,81 @@ def test__check_command_stats_host(check, aggregator):
     expected_tags = ['foo:bar', 'command:lpush']
     aggregator.assert_metric('redis.command.calls', value=4, count=1, tags=expected_tags)
     aggregator.assert_metric('redis.command.usec_per_call', value=14.00, count=1, tags=expected_tags)
+
+
+def _mock_key_conn(keys):
+    """
+    Mock a connection to a database holding `keys`, a dict key -> (type, length)
+    """
+    conn = mock.MagicMock()
+    executed = []
+    conn.info.return_value = {'db0': {'keys': len(keys), 'expires': 0}}
+    conn.scan_iter.side_effect = lambda match, count: iter(sorted(k for k in keys if k.startswith(match[:-1])))
+
+    def pipeline(transaction=True):
+        commands = []
+        pipe = mock.MagicMock()
+        pipe.type.side_effect = lambda key: commands.append(keys.get(key, ('none', 0))[0])
+        for command in ('llen', 'scard', 'zcard', 'hlen'):
+            getattr(pipe, command).side_effect = lambda key: commands.append(keys[key][1])
+        pipe.execute.side_effect = lambda raise_on_error: executed.append(commands) or list(commands)
+        return pipe
+
+    conn.pipeline.side_effect = pipeline
+    conn.executed = executed
+    return conn
+
+
+def test__check_key_lengths_batches(check, aggregator):
+    keys = {'queue:{}'.format(i): ('list', i) for i in range(1, 6)}
+    keys['queue:set'] = ('set', 7)
+    keys['queue:string'] = ('string', None)
+    conn = _mock_key_conn(keys)
+    instance = {'keys': ['queue:*', 'missing'], 'keys_batch_size': 3, 'keys_telemetry': True}
+
+    check._check_key_lengths(conn, instance, ['foo:bar'])
+
+    conn.scan_iter.assert_called_once_with(match='queue:*', count=3)
+    # 7 keys matching the pattern by batches of 3, plus the missing key: a round trip for the types of each batch
+    # and another one for their lengths, unless they're all strings or missing
+    assert conn.executed == [
+        ['list', 'list', 'list'],
+        [1, 2, 3],
+        ['list', 'list', 'set'],
+        [4, 5, 7],
+        ['string'],
+        ['none'],
+    ]
+    for i in range(1, 6):
+        aggregator.assert_metric(
+            'redis.key.length',
+            value=i,
+            count=1,
+            tags=['foo:bar', 'key:queue:{}'.format(i), 'key_type:list', 'redis_db:db0'],
+        )
+    aggregator.assert_metric(
+        'redis.key.length', value=7, count=1, tags=['foo:bar', 'key:queue:set', 'key_type:set', 'redis_db:db0']
+    )
+    aggregator.assert_metric(
+        'redis.key.length', value=1, count=1, tags=['foo:bar', 'key:queue:string', 'key_type:string', 'redis_db:db0']
+    )
+    aggregator.assert_metric('redis.key.length', value=0, count=1, tags=['key:missing', 'foo:bar'])
+    aggregator.assert_metric(
+        'redis.key.scanned', value=7, count=1, tags=['foo:bar', 'key_pattern:queue:*', 'redis_db:db0']
+    )
+    aggregator.assert_metric('redis.key.scan_time_ms', count=1, tags=['foo:bar', 'key_pattern:queue:*', 'redis_db:db0'])
+    aggregator.assert_metric(
+        'redis.key.scanned', value=1, count=1, tags=['foo:bar', 'key_pattern:missing', 'redis_db:db0']
+    )
+
+
+def test__check_key_lengths_max_scanned_keys(check, aggregator):
+    conn = _mock_key_conn({'queue:{}'.format(i): ('list', i) for i in range(1, 6)})
+    instance = {'keys': ['queue:*', 'other'], 'max_scanned_keys': 2}
+
+    check._check_key_lengths(conn, instance, [])
+
+    assert len(aggregator.metrics('redis.key.length')) == 2
+    aggregator.assert_metric('redis.key.length', value=1, tags=['key:queue:1', 'key_type:list', 'redis_db:db0'])
+    aggregator.assert_metric('redis.key.length', value=2, tags=['key:queue:2', 'key_type:list', 'redis_db:db0'])
+    assert len(check.warnings) == 1
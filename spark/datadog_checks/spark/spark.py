@@ -2,6 +2,9 @@
 # All rights reserved
 # Licensed under a 3-clause BSD style license (see LICENSE)
 
+import threading
+from contextlib import contextmanager
+
 from bs4 import BeautifulSoup
 from requests.exceptions import ConnectionError, HTTPError, InvalidURL, Timeout
 from simplejson import JSONDecodeError
@@ -9,6 +12,8 @@ from six import iteritems
 from six.moves.urllib.parse import urljoin, urlparse, urlsplit, urlunsplit
 
 from datadog_checks.base import AgentCheck, ConfigurationError, is_affirmative
+from datadog_checks.base.checks.libs.thread_pool import Pool
+from datadog_checks.base.utils.json_stream import iter_response_json_array
 
 # Identifier for cluster master address in `spark.yaml`
 MASTER_ADDRESS = 'spark_url'
@@ -32,11 +37,20 @@ MESOS_SERVICE_CHECK = 'spark.mesos_master.can_connect'
 
 # URL Paths
 YARN_APPS_PATH = 'ws/v1/cluster/apps'
+YARN_APPS_ITEMS_PATH = ('apps', 'app')
 SPARK_APPS_PATH = 'api/v1/applications'
 SPARK_MASTER_STATE_PATH = '/json/'
 SPARK_MASTER_APP_PATH = '/app/'
 MESOS_MASTER_APP_PATH = '/frameworks'
 
+# Endpoints of the applications queried by the collectors
+SPARK_APP_ENDPOINTS = ('jobs', 'stages', 'executors', 'storage/rdd')
+SPARK_STREAMING_STATISTICS_ENDPOINT = 'streaming/statistics'
+
+# Number of requests sent at once to all the ApplicationMasters, and to a single one
+DEFAULT_MAX_CONCURRENT_REQUESTS = 8
+DEFAULT_MAX_REQUESTS_PER_APP = 2
+
 # Application type and states to collect
 YARN_APPLICATION_TYPES = 'SPARK'
 APPLICATION_STATES = 'RUNNING'
@@ -49,6 +63,9 @@ STAGE_EVENT = 'stage'
 ERROR_STATUS = 'FAILED'
 SUCCESS_STATUS = ['SUCCEEDED', 'COMPLETE']
 
+# Status of the stages that won't change anymore
+STAGE_COMPLETE_STATUS = 'COMPLETE'
+
 # Event source type
 SOURCE_TYPE_NAME = 'spark'
 
@@ -148,6 +165,11 @@ class SparkCheck(AgentCheck):
         'ssl_key': {'name': 'tls_private_key'},
     }
 
+    def __init__(self, *args, **kwargs):
+        super(SparkCheck, self).__init__(*args, **kwargs)
+        # (stageId, attemptId) of the completed stages already submitted, by application id
+        self._completed_stages = {}
+
     def check(self, instance):
         # Get additional tags from the conf file
         tags = instance.get('tags', [])
@@ -163,21 +185,24 @@ class SparkCheck(AgentCheck):
 
         spark_apps = self._get_running_apps(instance)
 
+        # Query the endpoints of all the applications at once, the collectors then process the responses
+        responses = self._fetch_app_responses(instance, spark_apps, tags)
+
         # Get the job metrics
-        self._spark_job_metrics(instance, spark_apps, tags)
+        self._spark_job_metrics(instance, spark_apps, tags, responses)
 
         # Get the stage metrics
-        self._spark_stage_metrics(instance, spark_apps, tags)
+        self._spark_stage_metrics(instance, spark_apps, tags, responses)
 
         # Get the executor metrics
-        self._spark_executor_metrics(instance, spark_apps, tags)
+        self._spark_executor_metrics(instance, spark_apps, tags, responses)
 
         # Get the rdd metrics
-        self._spark_rdd_metrics(instance, spark_apps, tags)
+        self._spark_rdd_metrics(instance, spark_apps, tags, responses)
 
         # Get the streaming statistics metrics
         if is_affirmative(instance.get('streaming_metrics', True)):
-            self._spark_streaming_statistics_metrics(instance, spark_apps, tags)
+            self._spark_streaming_statistics_metrics(instance, spark_apps, tags, responses)
 
         # Report success after gathering all metrics from the ApplicationMaster
         if spark_apps:
@@ -229,9 +254,8 @@ class SparkCheck(AgentCheck):
         """
         Determine what mode was specified
         """
-        tags = instance.get('tags', [])
-        if tags is None:
-            tags = []
+        # Copy the tags, they must not accumulate in the instance between runs
+        tags = list(instance.get('tags') or [])
         master_address = self._get_master_address(instance)
         # Get the cluster name from the instance configuration
         cluster_name = instance.get('cluster_name')
@@ -384,9 +408,10 @@ class SparkCheck(AgentCheck):
         The `app_id` returned is that of the YARN application. This will eventually be mapped into
         a Spark application ID.
         """
-        metrics_json = self._rest_request_to_json(
+        apps_json = self._rest_request_to_json_items(
             rm_address,
             YARN_APPS_PATH,
+            YARN_APPS_ITEMS_PATH,
             YARN_SERVICE_CHECK,
             tags,
             states=APPLICATION_STATES,
@@ -395,16 +420,13 @@ class SparkCheck(AgentCheck):
 
         running_apps = {}
 
-        if metrics_json.get('apps'):
-            if metrics_json['apps'].get('app') is not None:
+        for app_json in apps_json:
+            app_id = app_json.get('id')
+            tracking_url = app_json.get('trackingUrl')
+            app_name = app_json.get('name')
 
-                for app_json in metrics_json['apps']['app']:
-                    app_id = app_json.get('id')
-                    tracking_url = app_json.get('trackingUrl')
-                    app_name = app_json.get('name')
-
-                    if app_id and tracking_url and app_name:
-                        running_apps[app_id] = (app_name, tracking_url)
+            if app_id and tracking_url and app_name:
+                running_apps[app_id] = (app_name, tracking_url)
 
         return running_apps
 
@@ -416,7 +438,7 @@ class SparkCheck(AgentCheck):
         """
         spark_apps = {}
         for app_id, (app_name, tracking_url) in iteritems(running_apps):
-            response = self._rest_request_to_json(tracking_url, SPARK_APPS_PATH, SPARK_SERVICE_CHECK, tags)
+            response = self._rest_request_to_json_items(tracking_url, SPARK_APPS_PATH, (), SPARK_SERVICE_CHECK, tags)
 
             for app in response:
                 app_id = app.get('id')
@@ -427,16 +449,13 @@ class SparkCheck(AgentCheck):
 
         return spark_apps
 
-    def _spark_job_metrics(self, instance, running_apps, addl_tags):
+    def _spark_job_metrics(self, instance, running_apps, addl_tags, responses=None):
         """
         Get metrics for each Spark job.
         """
         for app_id, (app_name, tracking_url) in iteritems(running_apps):
 
-            base_url = self._get_request_url(instance, tracking_url)
-            response = self._rest_request_to_json(
-                base_url, SPARK_APPS_PATH, SPARK_SERVICE_CHECK, addl_tags, app_id, 'jobs'
-            )
+            response = self._get_app_response(instance, app_id, tracking_url, addl_tags, 'jobs', responses)
 
             for job in response:
 
@@ -449,21 +468,30 @@ class SparkCheck(AgentCheck):
                 self._set_metrics_from_json(tags, job, SPARK_JOB_METRICS)
                 self._set_metric('spark.job.count', COUNT, 1, tags)
 
-    def _spark_stage_metrics(self, instance, running_apps, addl_tags):
+    def _spark_stage_metrics(self, instance, running_apps, addl_tags, responses=None):
         """
         Get metrics for each Spark stage.
         """
+        skip_completed_stages = is_affirmative(instance.get('skip_completed_stages', False))
+        completed_stages = {}
+
         for app_id, (app_name, tracking_url) in iteritems(running_apps):
 
-            base_url = self._get_request_url(instance, tracking_url)
-            response = self._rest_request_to_json(
-                base_url, SPARK_APPS_PATH, SPARK_SERVICE_CHECK, addl_tags, app_id, 'stages'
-            )
+            response = self._get_app_response(instance, app_id, tracking_url, addl_tags, 'stages', responses)
+            submitted_stages = self._completed_stages.get(app_id, ())
+            completed_stages[app_id] = set()
 
             for stage in response:
 
                 status = stage.get('status')
 
+                if skip_completed_stages and status == STAGE_COMPLETE_STATUS:
+                    # A completed stage doesn't change anymore, it is only submitted during the first run it is seen
+                    stage_key = (stage.get('stageId'), stage.get('attemptId'))
+                    completed_stages[app_id].add(stage_key)
+                    if stage_key in submitted_stages:
+                        continue
+
                 tags = ['app_name:%s' % str(app_name)]
                 tags.extend(addl_tags)
                 tags.append('status:%s' % str(status).lower())
@@ -471,16 +499,16 @@ class SparkCheck(AgentCheck):
                 self._set_metrics_from_json(tags, stage, SPARK_STAGE_METRICS)
                 self._set_metric('spark.stage.count', COUNT, 1, tags)
 
-    def _spark_executor_metrics(self, instance, running_apps, addl_tags):
+        # Only the stages still listed by the running applications are remembered
+        self._completed_stages = completed_stages
+
+    def _spark_executor_metrics(self, instance, running_apps, addl_tags, responses=None):
         """
         Get metrics for each Spark executor.
         """
         for app_id, (app_name, tracking_url) in iteritems(running_apps):
 
-            base_url = self._get_request_url(instance, tracking_url)
-            response = self._rest_request_to_json(
-                base_url, SPARK_APPS_PATH, SPARK_SERVICE_CHECK, addl_tags, app_id, 'executors'
-            )
+            response = self._get_app_response(instance, app_id, tracking_url, addl_tags, 'executors', responses)
 
             tags = ['app_name:%s' % str(app_name)]
             tags.extend(addl_tags)
@@ -494,16 +522,13 @@ class SparkCheck(AgentCheck):
             if len(response):
                 self._set_metric('spark.executor.count', COUNT, len(response), tags)
 
-    def _spark_rdd_metrics(self, instance, running_apps, addl_tags):
+    def _spark_rdd_metrics(self, instance, running_apps, addl_tags, responses=None):
         """
         Get metrics for each Spark RDD.
         """
         for app_id, (app_name, tracking_url) in iteritems(running_apps):
 
-            base_url = self._get_request_url(instance, tracking_url)
-            response = self._rest_request_to_json(
-                base_url, SPARK_APPS_PATH, SPARK_SERVICE_CHECK, addl_tags, app_id, 'storage/rdd'
-            )
+            response = self._get_app_response(instance, app_id, tracking_url, addl_tags, 'storage/rdd', responses)
 
             tags = ['app_name:%s' % str(app_name)]
             tags.extend(addl_tags)
@@ -514,15 +539,14 @@ class SparkCheck(AgentCheck):
             if len(response):
                 self._set_metric('spark.rdd.count', COUNT, len(response), tags)
 
-    def _spark_streaming_statistics_metrics(self, instance, running_apps, addl_tags):
+    def _spark_streaming_statistics_metrics(self, instance, running_apps, addl_tags, responses=None):
         """
         Get metrics for each application streaming statistics.
         """
         for app_id, (app_name, tracking_url) in iteritems(running_apps):
             try:
-                base_url = self._get_request_url(instance, tracking_url)
-                response = self._rest_request_to_json(
-                    base_url, SPARK_APPS_PATH, SPARK_SERVICE_CHECK, addl_tags, app_id, 'streaming/statistics'
+                response = self._get_app_response(
+                    instance, app_id, tracking_url, addl_tags, SPARK_STREAMING_STATISTICS_ENDPOINT, responses
                 )
                 self.log.debug('streaming/statistics: %s', response)
                 tags = ['app_name:%s' % str(app_name)]
@@ -536,6 +560,73 @@ class SparkCheck(AgentCheck):
                 if e.response.status_code != 404:
                     raise
 
+    def _fetch_app_responses(self, instance, running_apps, addl_tags):
+        """
+        Query the endpoints of the running applications on a bounded thread pool, without sending more than
+        `max_requests_per_app` requests at once to the ApplicationMaster of a single application.
+
+        Returns the dict (app_id, endpoint) -> (response JSON, error) processed by the collectors,
+        or None when requests are sent one at a time by the collectors themselves.
+        """
+        max_workers = int(instance.get('max_concurrent_requests', DEFAULT_MAX_CONCURRENT_REQUESTS))
+        max_requests_per_app = int(instance.get('max_requests_per_app', DEFAULT_MAX_REQUESTS_PER_APP))
+        if max_workers <= 1 or not running_apps:
+            return None
+
+        endpoints = list(SPARK_APP_ENDPOINTS)
+        if is_affirmative(instance.get('streaming_metrics', True)):
+            endpoints.append(SPARK_STREAMING_STATISTICS_ENDPOINT)
+
+        app_requests = {}
+        for app_id, (_, tracking_url) in iteritems(running_apps):
+            base_url = self._get_request_url(instance, tracking_url)
+            app_requests[app_id] = (base_url, threading.BoundedSemaphore(max(max_requests_per_app, 1)))
+
+        # Requests are queued endpoint by endpoint, so that the workers rarely wait for the limit of an application
+        queued_requests = [
+            ((app_id, endpoint), (base_url, app_id, endpoint, addl_tags, app_limit))
+            for endpoint in endpoints
+            for app_id, (base_url, app_limit) in iteritems(app_requests)
+        ]
+
+        responses = {}
+        pool = Pool(min(max_workers, len(queued_requests)))
+        try:
+            async_results = [(key, pool.apply_async(self._fetch_app_endpoint, args)) for key, args in queued_requests]
+            for key, async_result in async_results:
+                responses[key] = async_result.get()
+        finally:
+            pool.terminate()
+            pool.join()
+
+        return responses
+
+    def _fetch_app_endpoint(self, base_url, app_id, endpoint, addl_tags, app_limit):
+        with app_limit:
+            try:
+                return (
+                    self._rest_request_to_json(
+                        base_url, SPARK_APPS_PATH, SPARK_SERVICE_CHECK, addl_tags, app_id, endpoint
+                    ),
+                    None,
+                )
+            except Exception as e:
+                return None, e
+
+    def _get_app_response(self, instance, app_id, tracking_url, addl_tags, endpoint, responses=None):
+        """
+        Return the JSON response of an application endpoint, either prefetched or queried on the spot.
+        Errors of prefetched requests are raised, their service checks were already sent.
+        """
+        if responses is not None:
+            response, error = responses[(app_id, endpoint)]
+            if error is not None:
+                raise error
+            return response
+
+        base_url = self._get_request_url(instance, tracking_url)
+        return self._rest_request_to_json(base_url, SPARK_APPS_PATH, SPARK_SERVICE_CHECK, addl_tags, app_id, endpoint)
+
     def _set_metrics_from_json(self, tags, metrics_json, metrics):
         """
         Parse the JSON response and set the metrics
@@ -568,6 +659,51 @@ class SparkCheck(AgentCheck):
         """
         Query the given URL and return the response
         """
+        url, service_check_tags = self._build_request(url, object_path, tags, *args, **kwargs)
+
+        with self._handle_request_errors(url, service_name, service_check_tags):
+            response = self.http.get(url)
+            response.raise_for_status()
+
+        return response
+
+    def _rest_request_to_json(self, address, object_path, service_name, tags, *args, **kwargs):
+        """
+        Query the given URL and return the JSON response
+        """
+        response = self._rest_request(address, object_path, service_name, tags, *args, **kwargs)
+
+        try:
+            response_json = response.json()
+
+        except JSONDecodeError as e:
+            self.service_check(
+                service_name,
+                AgentCheck.CRITICAL,
+                tags=['url:%s' % self._get_url_base(address)] + tags,
+                message='JSON Parse failed: {0}'.format(e),
+            )
+            raise
+
+        return response_json
+
+    def _rest_request_to_json_items(self, address, object_path, items_path, service_name, tags, *args, **kwargs):
+        """
+        Query the given URL and yield the items of the JSON array under `items_path` one at a time,
+        parsing the response while it is downloaded instead of loading it entirely
+        """
+        url, service_check_tags = self._build_request(address, object_path, tags, *args, **kwargs)
+
+        with self._handle_request_errors(url, service_name, service_check_tags):
+            response = self.http.get(url, stream=True)
+            response.raise_for_status()
+            for item in iter_response_json_array(response, items_path):
+                yield item
+
+    def _build_request(self, url, object_path, tags, *args, **kwargs):
+        """
+        Return the URL to query and the tags of its service check
+        """
         service_check_tags = ['url:%s' % self._get_url_base(url)] + tags
 
         if object_path:
@@ -583,11 +719,16 @@ class SparkCheck(AgentCheck):
             query = '&'.join(['{0}={1}'.format(key, value) for key, value in iteritems(kwargs)])
             url = urljoin(url, '?' + query)
 
-        try:
-            self.log.debug('Spark check URL: %s' % url)
-            response = self.http.get(url)
+        self.log.debug('Spark check URL: %s' % url)
+        return url, service_check_tags
 
-            response.raise_for_status()
+    @contextmanager
+    def _handle_request_errors(self, url, service_name, service_check_tags):
+        """
+        Report the request errors with a critical service check
+        """
+        try:
+            yield
 
         except Timeout as e:
             self.service_check(
@@ -611,29 +752,6 @@ class SparkCheck(AgentCheck):
             self.service_check(service_name, AgentCheck.CRITICAL, tags=service_check_tags, message=str(e))
             raise
 
-        else:
-            return response
-
-    def _rest_request_to_json(self, address, object_path, service_name, tags, *args, **kwargs):
-        """
-        Query the given URL and return the JSON response
-        """
-        response = self._rest_request(address, object_path, service_name, tags, *args, **kwargs)
-
-        try:
-            response_json = response.json()
-
-        except JSONDecodeError as e:
-            self.service_check(
-                service_name,
-                AgentCheck.CRITICAL,
-                tags=['url:%s' % self._get_url_base(address)] + tags,
-                message='JSON Parse failed: {0}'.format(e),
-            )
-            raise
-
-        return response_json
-
     @classmethod
     def _join_url_dir(cls, url, *args):
         """
@@ -133,8 +133,24 @@ FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
 CERTIFICATE_DIR = os.path.join(os.path.dirname(__file__), 'certificate')
 
 
+class MockStreamedResponse(object):
+    """
+    Serves the body of the mocked responses by chunks, as for the requests sent with `stream=True`
+    """
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        data = self.json_data
+        if not isinstance(data, bytes):
+            data = data.encode('utf-8')
+        for i in range(0, len(data), chunk_size):
+            yield data[i : i + chunk_size]
+
+    def close(self):
+        pass
+
+
 def yarn_requests_get_mock(*args, **kwargs):
-    class MockResponse:
+    class MockResponse(MockStreamedResponse):
         def __init__(self, json_data, status_code):
             self.json_data = json_data
             self.status_code = status_code
@@ -195,7 +211,7 @@ def yarn_requests_auth_mock(*args, **kwargs):
 
 
 def mesos_requests_get_mock(*args, **kwargs):
-    class MockMesosResponse:
+    class MockMesosResponse(MockStreamedResponse):
         def __init__(self, json_data, status_code):
             self.json_data = json_data
             self.status_code = status_code
@@ -245,7 +261,7 @@ def mesos_requests_get_mock(*args, **kwargs):
 
 
 def standalone_requests_get_mock(*args, **kwargs):
-    class MockStandaloneResponse:
+    class MockStandaloneResponse(MockStreamedResponse):
         text = ''
 
         def __init__(self, json_data, status_code):
@@ -303,7 +319,7 @@ def standalone_requests_get_mock(*args, **kwargs):
 
 
 def standalone_requests_pre20_get_mock(*args, **kwargs):
-    class MockStandaloneResponse:
+    class MockStandaloneResponse(MockStreamedResponse):
         text = ''
 
         def __init__(self, json_data, status_code):
@@ -811,6 +827,56 @@ def test_standalone_pre20(aggregator):
         aggregator.assert_all_metrics_covered()
 
 
+@pytest.mark.unit
+@pytest.mark.parametrize('max_concurrent_requests', [1, 8])
+def test_yarn_requests_per_app(aggregator, max_concurrent_requests):
+    lock = threading.Lock()
+    in_flight = [0]
+    max_in_flight = [0]
+
+    def requests_get_mock(*args, **kwargs):
+        # Only the requests to the ApplicationMaster are limited
+        if not Url(args[0]) == YARN_APP_URL:
+            with lock:
+                in_flight[0] += 1
+                max_in_flight[0] = max(max_in_flight[0], in_flight[0])
+            time.sleep(0.05)
+            with lock:
+                in_flight[0] -= 1
+        return yarn_requests_get_mock(*args, **kwargs)
+
+    config = dict(YARN_CONFIG, max_concurrent_requests=max_concurrent_requests, max_requests_per_app=2)
+    with mock.patch('requests.get', requests_get_mock):
+        c = SparkCheck('spark', {}, [config])
+        c.check(config)
+
+    assert max_in_flight[0] == min(max_concurrent_requests, 2)
+    for metric, value in iteritems(SPARK_STAGE_RUNNING_METRIC_VALUES):
+        aggregator.assert_metric(metric, value=value, tags=SPARK_STAGE_RUNNING_METRIC_TAGS + CUSTOM_TAGS)
+    for metric, value in iteritems(SPARK_STREAMING_STATISTICS_METRIC_VALUES):
+        aggregator.assert_metric(metric, value=value, tags=SPARK_METRIC_TAGS + CUSTOM_TAGS)
+
+
+@pytest.mark.unit
+def test_yarn_skip_completed_stages(aggregator):
+    config = dict(YARN_CONFIG, skip_completed_stages=True)
+    with mock.patch('requests.get', yarn_requests_get_mock):
+        c = SparkCheck('spark', {}, [config])
+        c.check(config)
+
+        for metric, value in iteritems(SPARK_STAGE_COMPLETE_METRIC_VALUES):
+            aggregator.assert_metric(metric, value=value, tags=SPARK_STAGE_COMPLETE_METRIC_TAGS + CUSTOM_TAGS)
+
+        aggregator.reset()
+        c.check(config)
+
+        # Completed stages are only submitted once, running ones every time
+        for metric in SPARK_STAGE_COMPLETE_METRIC_VALUES:
+            aggregator.assert_metric(metric, count=0, tags=SPARK_STAGE_COMPLETE_METRIC_TAGS + CUSTOM_TAGS)
+        for metric, value in iteritems(SPARK_STAGE_RUNNING_METRIC_VALUES):
+            aggregator.assert_metric(metric, value=value, tags=SPARK_STAGE_RUNNING_METRIC_TAGS + CUSTOM_TAGS)
+
+
 @pytest.mark.unit
 def test_ssl():
     run_ssl_server()
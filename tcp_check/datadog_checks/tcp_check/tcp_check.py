@@ -5,6 +5,7 @@ import socket
 import time
 
 from datadog_checks.base.checks import NetworkCheck, Status
+from datadog_checks.base.utils.resolver import gethostbyname
 
 
 class BadConfException(Exception):
@@ -23,6 +24,10 @@ class TCPCheck(NetworkCheck):
         timeout = float(instance.get('timeout', 10))
         response_time = instance.get('collect_response_time', False)
         custom_tags = instance.get('tags', [])
+        dns_cache_ttl = float(instance.get('dns_cache_ttl', self.init_config.get('dns_cache_ttl', 0)))
+        dns_cache_negative_ttl = float(
+            instance.get('dns_cache_negative_ttl', self.init_config.get('dns_cache_negative_ttl', 0))
+        )
         socket_type = None
         try:
             port = int(port)
@@ -47,7 +52,7 @@ class TCPCheck(NetworkCheck):
 
         if socket_type is None:
             try:
-                addr = socket.gethostbyname(url)
+                addr = gethostbyname(url, dns_cache_ttl, dns_cache_negative_ttl)
                 socket_type = socket.AF_INET
             except Exception:
                 msg = "URL: {} is not a correct IPv4, IPv6 or hostname".format(url)
@@ -1,8 +1,15 @@
 # (C) Datadog, Inc. 2010-2017
 # All rights reserved
 # Licensed under Simplified BSD License (see LICENSE)
+import socket
 from copy import deepcopy
 
+import mock
+import pytest
+
+from datadog_checks.base.utils.resolver import clear_cache
+from datadog_checks.tcp_check.tcp_check import BadConfException
+
 from . import common
 
 
@@ -44,3 +51,38 @@ def test_response_time(aggregator, check):
     expected_tags = ['url:datadoghq.com:80', 'instance:instance:response_time', 'foo:bar']
     aggregator.assert_metric('network.tcp.response_time', tags=expected_tags)
     aggregator.assert_all_metrics_covered()
+
+
+@pytest.mark.parametrize('dns_cache_ttl, resolutions', [(0, 2), (60, 1)])
+def test_dns_cache_ttl(check, dns_cache_ttl, resolutions):
+    """
+    Addresses are reused for `dns_cache_ttl` seconds
+    """
+    clear_cache()
+    instance = {'host': 'cached.example.org', 'port': 80, 'dns_cache_ttl': dns_cache_ttl}
+    with mock.patch('datadog_checks.base.utils.resolver.socket.gethostbyname', return_value='10.0.0.1') as resolve:
+        assert check._load_conf(instance)[0] == '10.0.0.1'
+        assert check._load_conf(instance)[0] == '10.0.0.1'
+
+    assert resolve.call_count == resolutions
+
+
+@pytest.mark.parametrize('dns_cache_negative_ttl, resolutions', [(0, 2), (30, 1)])
+def test_dns_cache_negative_ttl(check, dns_cache_negative_ttl, resolutions):
+    """
+    Failed resolutions are reused for `dns_cache_negative_ttl` seconds, even when addresses are cached
+    """
+    clear_cache()
+    instance = {
+        'host': 'unknown.example.org',
+        'port': 80,
+        'dns_cache_ttl': 60,
+        'dns_cache_negative_ttl': dns_cache_negative_ttl,
+    }
+    error = socket.gaierror(socket.EAI_NONAME, 'Name or service not known')
+    with mock.patch('datadog_checks.base.utils.resolver.socket.gethostbyname', side_effect=error) as resolve:
+        for _ in range(2):
+            with pytest.raises(BadConfException):
+                check._load_conf(instance)
+
+    assert resolve.call_count == resolutions
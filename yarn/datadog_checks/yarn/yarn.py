@@ -1,11 +1,14 @@
 # (C) Datadog, Inc. 2018
 # All rights reserved
 # Licensed under a 3-clause BSD style license (see LICENSE)
+from contextlib import contextmanager
+
 from requests.exceptions import ConnectionError, HTTPError, InvalidURL, SSLError, Timeout
 from six import iteritems
 from six.moves.urllib.parse import urljoin, urlsplit, urlunsplit
 
 from datadog_checks.base import AgentCheck, is_affirmative
+from datadog_checks.base.utils.json_stream import iter_response_json_array
 
 # Default settings
 DEFAULT_RM_URI = 'http://localhost:8088'
@@ -19,9 +22,11 @@ YARN_CLUSTER_METRICS_PATH = '/ws/v1/cluster/metrics'
 
 # Path to retrieve YARN APPS
 YARN_APPS_PATH = '/ws/v1/cluster/apps'
+YARN_APPS_ITEMS_PATH = ('apps', 'app')
 
 # Path to retrieve node statistics
 YARN_NODES_PATH = '/ws/v1/cluster/nodes'
+YARN_NODES_ITEMS_PATH = ('nodes', 'node')
 
 # Path to retrieve queue statistics
 YARN_SCHEDULER_PATH = '/ws/v1/cluster/scheduler'
@@ -203,41 +208,39 @@ class YarnCheck(AgentCheck):
         """
         Get metrics for running applications
         """
-        metrics_json = self._rest_request_to_json(rm_address, YARN_APPS_PATH, addl_tags, states=YARN_APPLICATION_STATES)
-
-        if metrics_json and metrics_json['apps'] is not None and metrics_json['apps']['app'] is not None:
+        apps_json = self._rest_request_to_json_items(
+            rm_address, YARN_APPS_PATH, YARN_APPS_ITEMS_PATH, addl_tags, states=YARN_APPLICATION_STATES
+        )
 
-            for app_json in metrics_json['apps']['app']:
+        for app_json in apps_json:
 
-                tags = []
-                for dd_tag, yarn_key in iteritems(app_tags):
-                    try:
-                        val = app_json[yarn_key]
-                        if val:
-                            tags.append('{tag}:{value}'.format(tag=dd_tag, value=val))
-                    except KeyError:
-                        self.log.error("Invalid value {} for application_tag".format(yarn_key))
+            tags = []
+            for dd_tag, yarn_key in iteritems(app_tags):
+                try:
+                    val = app_json[yarn_key]
+                    if val:
+                        tags.append('{tag}:{value}'.format(tag=dd_tag, value=val))
+                except KeyError:
+                    self.log.error("Invalid value {} for application_tag".format(yarn_key))
 
-                tags.extend(addl_tags)
+            tags.extend(addl_tags)
 
-                self._set_yarn_metrics_from_json(tags, app_json, DEPRECATED_YARN_APP_METRICS)
-                self._set_yarn_metrics_from_json(tags, app_json, YARN_APP_METRICS)
+            self._set_yarn_metrics_from_json(tags, app_json, DEPRECATED_YARN_APP_METRICS)
+            self._set_yarn_metrics_from_json(tags, app_json, YARN_APP_METRICS)
 
     def _yarn_node_metrics(self, rm_address, addl_tags):
         """
         Get metrics related to YARN nodes
         """
-        metrics_json = self._rest_request_to_json(rm_address, YARN_NODES_PATH, addl_tags)
+        nodes_json = self._rest_request_to_json_items(rm_address, YARN_NODES_PATH, YARN_NODES_ITEMS_PATH, addl_tags)
 
-        if metrics_json and metrics_json['nodes'] is not None and metrics_json['nodes']['node'] is not None:
+        for node_json in nodes_json:
+            node_id = node_json['id']
 
-            for node_json in metrics_json['nodes']['node']:
-                node_id = node_json['id']
-
-                tags = ['node_id:{}'.format(str(node_id))]
-                tags.extend(addl_tags)
+            tags = ['node_id:{}'.format(str(node_id))]
+            tags.extend(addl_tags)
 
-                self._set_yarn_metrics_from_json(tags, node_json, YARN_NODE_METRICS)
+            self._set_yarn_metrics_from_json(tags, node_json, YARN_NODE_METRICS)
 
     def _yarn_scheduler_metrics(self, rm_address, addl_tags, queue_blacklist):
         """
@@ -324,6 +327,46 @@ class YarnCheck(AgentCheck):
         """
         Query the given URL and return the JSON response
         """
+        url, service_check_tags = self._build_request(url, object_path, tags, *args, **kwargs)
+
+        with self._handle_request_errors(url, service_check_tags):
+            response = self.http.get(url)
+            response.raise_for_status()
+            response_json = response.json()
+
+        self.service_check(
+            SERVICE_CHECK_NAME,
+            AgentCheck.OK,
+            tags=service_check_tags,
+            message="Connection to {} was successful".format(url),
+        )
+
+        return response_json
+
+    def _rest_request_to_json_items(self, url, object_path, items_path, tags, *args, **kwargs):
+        """
+        Query the given URL and yield the items of the JSON array under `items_path` one at a time,
+        parsing the response while it is downloaded instead of loading it entirely
+        """
+        url, service_check_tags = self._build_request(url, object_path, tags, *args, **kwargs)
+
+        with self._handle_request_errors(url, service_check_tags):
+            response = self.http.get(url, stream=True)
+            response.raise_for_status()
+            for item in iter_response_json_array(response, items_path):
+                yield item
+
+        self.service_check(
+            SERVICE_CHECK_NAME,
+            AgentCheck.OK,
+            tags=service_check_tags,
+            message="Connection to {} was successful".format(url),
+        )
+
+    def _build_request(self, url, object_path, tags, *args, **kwargs):
+        """
+        Return the URL to query and the tags of its service check
+        """
         service_check_tags = ['url:{}'.format(self._get_url_base(url))] + tags
         service_check_tags = list(set(service_check_tags))
 
@@ -342,10 +385,15 @@ class YarnCheck(AgentCheck):
             query = '&'.join(['{}={}'.format(key, value) for key, value in iteritems(kwargs)])
             url = urljoin(url, '?' + query)
 
+        return url, service_check_tags
+
+    @contextmanager
+    def _handle_request_errors(self, url, service_check_tags):
+        """
+        Report the request errors with a critical service check
+        """
         try:
-            response = self.http.get(url)
-            response.raise_for_status()
-            response_json = response.json()
+            yield
 
         except Timeout as e:
             self.service_check(
@@ -369,16 +417,6 @@ class YarnCheck(AgentCheck):
             self.service_check(SERVICE_CHECK_NAME, AgentCheck.CRITICAL, tags=service_check_tags, message=str(e))
             raise
 
-        else:
-            self.service_check(
-                SERVICE_CHECK_NAME,
-                AgentCheck.OK,
-                tags=service_check_tags,
-                message="Connection to {} was successful".format(url),
-            )
-
-            return response_json
-
     def _join_url_dir(self, url, *args):
         """
         Join a URL with multiple directories
@@ -99,6 +99,14 @@ def requests_get_mock(*args, **kwargs):
         def raise_for_status(self):
             return True
 
+        def iter_content(self, chunk_size=1, decode_unicode=False):
+            data = self.json_data.encode('utf-8')
+            for i in range(0, len(data), chunk_size):
+                yield data[i : i + chunk_size]
+
+        def close(self):
+            pass
+
     if args[0] == YARN_CLUSTER_METRICS_URL:
         yarn_cluster_metrics = os.path.join(HERE, "fixtures", "cluster_metrics")
         with open(yarn_cluster_metrics, "r") as f: